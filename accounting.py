@@ -0,0 +1,397 @@
+"""
+Token, cost and latency accounting for the HALO Agent Interface.
+
+Every model call, tool call and embedding is recorded as a usage event with
+the user, session, agent and model it belongs to. Events are queued and
+written in batches by a background thread to ``tmp/halo_usage.db``, so
+recording never slows down a run. The Usage page aggregates them.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from agno.run.base import RunStatus
+from agno.utils.log import log_debug, logger
+
+cwd = Path(__file__).parent.resolve()
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
+tmp_dir.mkdir(exist_ok=True, parents=True)
+
+USAGE_DB_PATH = tmp_dir.joinpath("halo_usage.db")
+
+# USD per million tokens: input, cached input, output. Embeddings only have input.
+MODEL_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-5": {"input": 1.25, "cached_input": 0.125, "output": 10.0},
+    "gpt-5-mini": {"input": 0.25, "cached_input": 0.025, "output": 2.0},
+    "gpt-5-nano": {"input": 0.05, "cached_input": 0.005, "output": 0.4},
+    "gpt-4o": {"input": 2.5, "cached_input": 1.25, "output": 10.0},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.6},
+    "text-embedding-3-small": {"input": 0.02},
+    "text-embedding-3-large": {"input": 0.13},
+}
+
+# Group-by columns the Usage page may aggregate on
+DIMENSIONS = ("user_id", "session_id", "agent", "model", "kind", "name")
+
+_usage_context: contextvars.ContextVar[Dict[str, Optional[str]]] = contextvars.ContextVar(
+    "halo_usage_context", default={}
+)
+
+
+def load_model_prices() -> Dict[str, Dict[str, float]]:
+    """Return the price table, with overrides from ``HALO_MODEL_PRICES`` (JSON)."""
+    prices = dict(MODEL_PRICES)
+    overrides = os.getenv("HALO_MODEL_PRICES")
+    if overrides:
+        try:
+            prices.update(json.loads(overrides))
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid HALO_MODEL_PRICES: {e}")
+    return prices
+
+
+def estimate_cost(
+    model: Optional[str], input_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0
+) -> Optional[float]:
+    """Estimate the cost of a call in USD, or None if the model has no known price."""
+    if not model:
+        return None
+    prices = load_model_prices().get(model.split(":")[-1])
+    if prices is None:
+        return None
+    uncached = max(input_tokens - cached_tokens, 0)
+    cost = (
+        uncached * prices.get("input", 0.0)
+        + cached_tokens * prices.get("cached_input", prices.get("input", 0.0))
+        + output_tokens * prices.get("output", 0.0)
+    )
+    return cost / 1_000_000
+
+
+@dataclass
+class UsageEvent:
+    kind: str  # run, model, tool or embedding
+    name: Optional[str] = None
+    run_id: Optional[str] = None
+    parent_run_id: Optional[str] = None
+    user_id: Optional[str] = None
+    session_id: Optional[str] = None
+    agent: Optional[str] = None
+    model: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cached_tokens: int = 0
+    reasoning_tokens: int = 0
+    duration: Optional[float] = None
+    cost: Optional[float] = None
+    error: bool = False
+    created_at: float = 0.0
+
+
+class UsageRecorder:
+    """Queue usage events and write them to SQLite in batches.
+
+    Args:
+        path: SQLite file of the usage store
+        batch_size: Events written per transaction at most
+        flush_interval: Seconds a queued event waits at most before it is written
+    """
+
+    def __init__(self, path: Path = USAGE_DB_PATH, batch_size: int = 200, flush_interval: float = 2.0):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[UsageEvent]]" = queue.Queue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS usage_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    name TEXT,
+                    run_id TEXT,
+                    parent_run_id TEXT,
+                    user_id TEXT,
+                    session_id TEXT,
+                    agent TEXT,
+                    model TEXT,
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    cached_tokens INTEGER NOT NULL DEFAULT 0,
+                    reasoning_tokens INTEGER NOT NULL DEFAULT 0,
+                    duration REAL,
+                    cost REAL,
+                    error INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS usage_events_created ON usage_events (created_at)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._write_loop, name="usage-writer", daemon=True)
+                self._thread.start()
+
+    def record(self, event: UsageEvent) -> None:
+        """Queue an event; never blocks on the database."""
+        if not event.created_at:
+            event.created_at = time.time()
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(event)
+        self._ensure_writer()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch: List[UsageEvent] = []
+            event = self._queue.get()
+            if event is not None:
+                batch.append(event)
+            deadline = time.monotonic() + self.flush_interval
+            while event is not None and len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if event is not None:
+                    batch.append(event)
+            if batch:
+                self._write(batch)
+            with self._flushed:
+                self._pending -= len(batch)
+                self._flushed.notify_all()
+
+    def _write(self, batch: List[UsageEvent]) -> None:
+        rows = [asdict(event) for event in batch]
+        columns = list(rows[0])
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    f"INSERT INTO usage_events ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    [tuple(row[column] for column in columns) for row in rows],
+                )
+            log_debug(f"Wrote {len(batch)} usage events")
+        except Exception as e:
+            logger.warning(f"Could not write {len(batch)} usage events: {e}")
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Wait until all queued events are written."""
+        if self._thread is None:
+            return
+        # Wake the writer so it does not wait for the flush interval
+        self._queue.put(None)
+        with self._flushed:
+            self._flushed.wait_for(lambda: self._pending <= 0, timeout=timeout)
+
+    def summarize(
+        self, group_by: str = "agent", since: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Aggregate usage by one dimension.
+
+        Args:
+            group_by: One of ``DIMENSIONS``
+            since: Only events after this Unix timestamp
+
+        Returns:
+            List[Dict[str, Any]]: One row per group, most expensive first
+        """
+        if group_by not in DIMENSIONS:
+            raise ValueError(f"Cannot group usage by {group_by!r}")
+        where, params = ("WHERE created_at >= ?", [since]) if since else ("", [])
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                f"""
+                SELECT {group_by} AS "group",
+                    SUM(kind = 'run') AS runs,
+                    SUM(kind = 'model') AS model_calls,
+                    SUM(kind = 'tool') AS tool_calls,
+                    SUM(kind = 'embedding') AS embeddings,
+                    SUM(input_tokens) AS input_tokens,
+                    SUM(cached_tokens) AS cached_tokens,
+                    SUM(output_tokens) AS output_tokens,
+                    SUM(CASE WHEN kind != 'run' THEN duration END) AS call_time,
+                    SUM(CASE WHEN kind = 'run' THEN duration END) AS run_time,
+                    SUM(cost) AS cost,
+                    SUM(error) AS errors
+                FROM usage_events {where}
+                GROUP BY {group_by}
+                ORDER BY cost DESC, input_tokens DESC
+                """,
+                params,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent_events(self, limit: int = 200) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT * FROM usage_events ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+_recorder: Optional[UsageRecorder] = None
+_recorder_lock = threading.Lock()
+
+
+def get_usage_recorder() -> UsageRecorder:
+    """Return the process-wide usage recorder."""
+    global _recorder
+    if _recorder is None:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = UsageRecorder()
+                atexit.register(_recorder.flush)
+    return _recorder
+
+
+@contextmanager
+def usage_context(**context: Optional[str]) -> Iterator[None]:
+    """Attribute calls without their own run (e.g. embeddings) to a user and session."""
+    token = _usage_context.set({**_usage_context.get(), **context})
+    try:
+        yield
+    finally:
+        _usage_context.reset(token)
+
+
+def _metric(metrics: Any, name: str) -> int:
+    return getattr(metrics, name, 0) or 0
+
+
+def _run_events(run: Any, user_id: Optional[str], parent_run_id: Optional[str]) -> Iterator[UsageEvent]:
+    agent = getattr(run, "agent_name", None) or getattr(run, "team_name", None)
+    model = getattr(run, "model", None)
+    user_id = getattr(run, "user_id", None) or user_id
+    common = dict(
+        run_id=run.run_id,
+        user_id=user_id,
+        session_id=getattr(run, "session_id", None),
+        agent=agent,
+        model=model,
+    )
+
+    metrics = getattr(run, "metrics", None)
+    yield UsageEvent(
+        kind="run",
+        # Answers served from the semantic response cache cost no model calls
+        name="semantic_cache" if "semantic_cache" in (run.metadata or {}) else None,
+        parent_run_id=getattr(run, "parent_run_id", None) or parent_run_id,
+        duration=getattr(metrics, "duration", None),
+        error=getattr(run, "status", None) == RunStatus.error,
+        **common,
+    )
+
+    # One assistant message per model call, each with its own metrics
+    for message in getattr(run, "messages", None) or []:
+        if message.role != "assistant" or message.from_history or message.metrics is None:
+            continue
+        input_tokens = _metric(message.metrics, "input_tokens")
+        output_tokens = _metric(message.metrics, "output_tokens")
+        cached_tokens = _metric(message.metrics, "cache_read_tokens")
+        if not input_tokens and not output_tokens:
+            # e.g. the answer of a semantic cache hit
+            continue
+        yield UsageEvent(
+            kind="model",
+            name=model,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_tokens=cached_tokens,
+            reasoning_tokens=_metric(message.metrics, "reasoning_tokens"),
+            duration=message.metrics.duration,
+            cost=estimate_cost(model, input_tokens, output_tokens, cached_tokens),
+            **common,
+        )
+
+    for tool in getattr(run, "tools", None) or []:
+        yield UsageEvent(
+            kind="tool",
+            name=tool.tool_name,
+            duration=getattr(tool.metrics, "duration", None),
+            error=bool(tool.tool_call_error),
+            **common,
+        )
+
+    for member in getattr(run, "member_responses", None) or []:
+        yield from _run_events(member, user_id, run.run_id)
+
+
+def record_run(run_output: Any, user_id: Optional[str] = None) -> None:
+    """Record a finished agent or team run, its model and tool calls and its members.
+
+    Args:
+        run_output: The RunOutput/TeamRunOutput returned by ``run``
+        user_id: User of the run; team runs do not carry one themselves
+    """
+    if run_output is None or not getattr(run_output, "run_id", None):
+        return
+    try:
+        recorder = get_usage_recorder()
+        for event in _run_events(run_output, user_id or _usage_context.get().get("user_id"), None):
+            recorder.record(event)
+    except Exception as e:
+        logger.warning(f"Could not record usage of run {run_output.run_id}: {e}")
+
+
+def record_call(
+    kind: str,
+    name: Optional[str],
+    model: Optional[str] = None,
+    duration: Optional[float] = None,
+    input_tokens: int = 0,
+    output_tokens: int = 0,
+    cached_tokens: int = 0,
+    error: bool = False,
+) -> None:
+    """Record a single model or embedding call made outside of an agent run."""
+    try:
+        context = _usage_context.get()
+        get_usage_recorder().record(
+            UsageEvent(
+                kind=kind,
+                name=name,
+                user_id=context.get("user_id"),
+                session_id=context.get("session_id"),
+                agent=context.get("agent"),
+                model=model,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                cached_tokens=cached_tokens,
+                duration=duration,
+                cost=estimate_cost(model, input_tokens, output_tokens, cached_tokens),
+                error=error,
+            )
+        )
+    except Exception as e:
+        logger.warning(f"Could not record usage of {name}: {e}")
@@ -15,7 +15,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Set up environment
 cwd = Path(__file__).parent.resolve()
-tmp_dir = cwd.joinpath("tmp")
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
 tmp_dir.mkdir(exist_ok=True, parents=True)
 
 import dotenv
@@ -1,11 +1,9 @@
 """
 Agent module initialization file.
-This file dynamically exports all agent factory functions from the agents package.
+This file exports the agent factory functions from the agents package. Agent
+modules are listed in ``manifest.json`` and only imported when first used.
 """
 
-import os
-import importlib
-import inspect
 from typing import Optional
 
 from agno.agent import Agent
@@ -13,36 +11,22 @@ from agno.knowledge.knowledge import Knowledge
 from agno.memory import MemoryManager
 from agno.models.base import Model
 
-# Dynamically discover and import agent modules
-agent_modules = {}
-agent_factory_funcs = {}
-current_dir = os.path.dirname(os.path.abspath(__file__))
+from .registry import get_factory, get_factory_by_name, list_agents, load_manifest
 
-# Find all potential agent modules (files ending with _agent.py)
-for filename in os.listdir(current_dir):
-    if filename.endswith("_agent.py") and filename != "__init__.py":
-        module_name = filename[:-3]  # Remove .py extension
+# Factory function names are exported lazily through __getattr__
+__all__ = [entry["factory"].split(":")[1] for entry in load_manifest()] + [
+    "get_agent",
+    "list_agents",
+]
 
-        # Skip commented out modules
-        # if module_name == 'crawler_agent':
-        #    continue
 
-        try:
-            # Import the module
-            module = importlib.import_module(f".{module_name}", package="agents")
-            agent_modules[module_name] = module
-
-            # Find factory functions (those starting with create_)
-            for name, obj in inspect.getmembers(module):
-                if name.startswith("create_") and inspect.isfunction(obj):
-                    agent_factory_funcs[name] = obj
-                    # Make the function available at the package level
-                    globals()[name] = obj
-        except ImportError as e:
-            print(f"Warning: Could not import agent module {module_name}: {e}")
-
-# Dynamically build __all__ list from discovered factory functions
-__all__ = list(agent_factory_funcs.keys()) + ["get_agent"]
+def __getattr__(name: str):
+    # Make the factory functions available at the package level on first access
+    if name.startswith("create_"):
+        factory = get_factory_by_name(name)
+        if factory is not None:
+            return factory
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_agent(
@@ -65,19 +49,8 @@ def get_agent(
     Returns:
         An Agent instance if the agent_name is recognized, None otherwise
     """
-    # Dynamically build agent factories dictionary
-    agent_factories = {}
-
-    # Map agent names to their factory functions
-    for func_name, func in agent_factory_funcs.items():
-        # Extract agent name from function name (remove 'create_' and '_agent' if present)
-        name = func_name.replace("create_", "", 1)
-        if name.endswith("_agent"):
-            name = name[:-6]
-        agent_factories[name] = func
-
-    # Get the factory function for the requested agent
-    factory = agent_factories.get(agent_name)
+    # Get the factory function for the requested agent, importing it on first use
+    factory = get_factory(agent_name)
 
     # If the factory exists, create and return the agent
     if factory:
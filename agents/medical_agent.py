@@ -28,7 +28,9 @@ from agno.memory import MemoryManager
 from agno.models.base import Model
 
 # from agno.tools.searxng import Searxng
-from agno.tools.pubmed import PubmedTools
+from tools import ToolOutputTools, get_pubmed_toolkit
+from history import HISTORY_KEEP_LAST_RUNS
+from deadlines import STAGE_TIMEOUTS
 
 # from agno.tools.openai import OpenAITools
 # from copy import deepcopy
@@ -91,6 +93,7 @@ Using OpenAI web search:
 - Similar case studies
 - Technological advances in imaging/treatment
 - 2-3 authoritative medical references
+- If a literature search reports that literature is unavailable, write "Literature unavailable" here instead of citing references
 
 ### 6. Medical Disclaimer
 Always end with: "This analysis is for educational and demonstration purposes only. All medical imaging should be reviewed by qualified healthcare professionals for clinical decision-making."
@@ -99,13 +102,33 @@ REMEMBER: You are specifically designed to analyze medical images. Always provid
 Always answer in the same language as the user.
 """
 
-# Combine prompts for the final instruction
+# Combine prompts for the final instruction. Keep this free of dynamic content
+# (dates, user data): it is the static prefix served from the provider prompt cache.
 FULL_INSTRUCTIONS = BASE_PROMPT + ANALYSIS_TEMPLATE
 
+# Groups imaging requests on the provider side so they share the cached prefix
+PROMPT_CACHE_KEY = "medical-imaging"
+
 # Initialize the Medical Imaging Expert agent
 from agno.models.base import Model
 from agno.models.openai import OpenAIResponses
 
+# Optional provider:model override, e.g. mock:realistic for load tests
+IMAGING_MODEL_ID = os.getenv("MEDICAL_IMAGING_MODEL")
+
+
+def create_imaging_model() -> Model:
+    """Return the vision model of the imaging agent."""
+    if IMAGING_MODEL_ID:
+        from models import create_model
+
+        return create_model(IMAGING_MODEL_ID, prompt_cache_key=PROMPT_CACHE_KEY)
+    return OpenAIResponses(
+        id="gpt-5.2",
+        extra_body={"prompt_cache_key": PROMPT_CACHE_KEY},
+        timeout=STAGE_TIMEOUTS["model"],
+    )
+
 
 def create_medical_imaging_agent(
     model: Model, memory: MemoryManager, knowledge: Knowledge
@@ -127,7 +150,7 @@ def create_medical_imaging_agent(
     return Agent(
         name="Medical Imaging and Search Expert",
         role="Specialized medical imaging radiologist for educational analysis",
-        model=OpenAIResponses(id="gpt-5.2"),
+        model=create_imaging_model(),
         # Give the Agent the ability to update memories
         enable_agentic_memory=True,
         # OR - Run the MemoryManager automatically after each response
@@ -136,7 +159,8 @@ def create_medical_imaging_agent(
         instructions=FULL_INSTRUCTIONS,
         tools=[
             {"type": "web_search_preview"},
-            PubmedTools(),
+            get_pubmed_toolkit(),
+            ToolOutputTools(),
         ],  # Enable OpenAI tools for medical literature
         description="You are a highly skilled medical imaging expert with extensive knowledge in radiology and diagnostic imaging.",
         markdown=True,  # Enable markdown formatting for structured output
@@ -146,21 +170,22 @@ def create_medical_imaging_agent(
         # add_datetime_to_instructions=True,
         # add_history_to_messages=True,
         add_history_to_context=True,
+        # Older runs reach the agent only through the team's rolling summary
+        num_history_runs=HISTORY_KEEP_LAST_RUNS,
     )
 
 
 # Create default agent instance for backward compatibility
 # Note: This is deprecated - use create_medical_imaging_agent() factory function instead
-from agno.models.openai import OpenAIResponses
-
 agent = Agent(
     name="Medical Imaging and Search Expert",
     role="Specialized medical imaging radiologist for educational analysis",
-    model=OpenAIResponses(id="gpt-5.2"),  # Use GPT-4o for vision capabilities
+    model=create_imaging_model(),  # Vision model, or the MEDICAL_IMAGING_MODEL override
     instructions=FULL_INSTRUCTIONS,
     tools=[
         {"type": "web_search_preview"},
-        PubmedTools(),
+        get_pubmed_toolkit(),
+        ToolOutputTools(),
     ],  # Enable OpenAI tools for medical literature
     markdown=True,  # Enable markdown formatting for structured output
     debug_mode=True,
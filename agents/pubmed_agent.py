@@ -9,7 +9,7 @@ from agno.agent import Agent
 from agno.knowledge.knowledge import Knowledge
 from agno.memory import MemoryManager
 from agno.models.base import Model
-from agno.tools.pubmed import PubmedTools
+from tools import ToolOutputTools, get_pubmed_toolkit
 
 
 def create_pubmed_agent(
@@ -39,12 +39,12 @@ def create_pubmed_agent(
         # OR - Run the MemoryManager automatically after each response
         enable_user_memories=True,
         knowledge=knowledge,
-        tools=[PubmedTools()],
+        tools=[get_pubmed_toolkit(), ToolOutputTools()],
         description="You are a medical assistant that will give detailed answers based on real scientific research. For every user question, search PubMed for the most relevant and recent articles. Summarize the findings, cite the sources, and explain the evidence in clear, accessible language. If the evidence is inconclusive or limited, state this clearly. Do not provide personal medical advice or diagnosis.",
         instructions=[
             "Use the PubMed tool to search for and retrieve relevant scientific articles and abstracts when responding to queries.",
             "Prioritize the most recent and high-quality evidence, such as systematic reviews, meta-analyses, and clinical guidelines, unless otherwise specified by the user.",
-            "MANDATORY: First, display the raw PubMed tool output in a code block to show what data is available.",
+            "MANDATORY: First, list the articles the PubMed tool returned (PMID and title, one per line) in a code block to show what data is available. Do not repeat the full raw tool output.",
             "CRITICAL: Examine the PubMed tool response for ANY of these PMID indicators:",
             "- 'pmid', 'PMID', 'pubmed_id', 'id', 'uid', 'pubmed_uid'",
             "- URLs containing 'pubmed.ncbi.nlm.nih.gov/' followed by numbers",
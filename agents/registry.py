@@ -0,0 +1,138 @@
+"""
+Agent registry.
+Reads a lightweight manifest of agent ids, display names and factory paths and
+imports an agent module only when that agent is first requested.
+"""
+
+import ast
+import importlib
+import json
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+from agno.utils.log import logger
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.path.join(current_dir, "manifest.json")
+
+# Modules that are present in the package but should not be offered
+EXCLUDED_MODULES = ["crawler_agent"]
+
+# Display names that differ from the Title Case version of the agent id
+DISPLAY_NAME_OVERRIDES = {"gptimage1": "Image Agent"}
+
+_manifest: Optional[List[Dict[str, str]]] = None
+_factories: Dict[str, Callable] = {}
+_lock = threading.Lock()
+
+
+def _agent_id_from_factory(func_name: str) -> str:
+    # Extract agent name from function name (remove 'create_' and '_agent' if present)
+    agent_id = func_name.replace("create_", "", 1)
+    if agent_id.endswith("_agent"):
+        agent_id = agent_id[:-6]
+    return agent_id
+
+
+def generate_manifest() -> List[Dict[str, str]]:
+    """Build the manifest by parsing the agent modules, without importing them."""
+    entries: List[Dict[str, str]] = []
+    for filename in sorted(os.listdir(current_dir)):
+        if not filename.endswith("_agent.py"):
+            continue
+        module_name = filename[:-3]  # Remove .py extension
+        if module_name in EXCLUDED_MODULES:
+            continue
+
+        try:
+            with open(os.path.join(current_dir, filename), "r", encoding="utf-8") as f:
+                tree = ast.parse(f.read(), filename=filename)
+        except (OSError, SyntaxError) as e:
+            logger.warning(f"Could not parse agent module {module_name}: {e}")
+            continue
+
+        # Find top-level factory functions (those starting with create_)
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name.startswith("create_"):
+                agent_id = _agent_id_from_factory(node.name)
+                display_name = DISPLAY_NAME_OVERRIDES.get(
+                    agent_id,
+                    # Create a display name (convert snake_case to Title Case)
+                    " ".join(word.capitalize() for word in agent_id.split("_")),
+                )
+                entries.append(
+                    {
+                        "id": agent_id,
+                        "name": display_name,
+                        "factory": f"agents.{module_name}:{node.name}",
+                    }
+                )
+    return entries
+
+
+def write_manifest(entries: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+    """Regenerate and save the manifest file."""
+    entries = entries if entries is not None else generate_manifest()
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2)
+        f.write("\n")
+    return entries
+
+
+def load_manifest() -> List[Dict[str, str]]:
+    """Return the agent manifest, reading or generating it once per process."""
+    global _manifest
+    if _manifest is not None:
+        return _manifest
+
+    with _lock:
+        if _manifest is None:
+            try:
+                with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                    _manifest = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.info(f"Agent manifest unavailable ({e}), generating it")
+                _manifest = generate_manifest()
+    return _manifest
+
+
+def list_agents() -> Dict[str, str]:
+    """Map display names to agent ids without importing any agent module."""
+    return {entry["name"]: entry["id"] for entry in load_manifest()}
+
+
+def get_factory(agent_id: str) -> Optional[Callable]:
+    """Import and return the factory function of an agent on first use."""
+    factory = _factories.get(agent_id)
+    if factory is not None:
+        return factory
+
+    entry = next((e for e in load_manifest() if e["id"] == agent_id), None)
+    if entry is None:
+        return None
+
+    module_path, func_name = entry["factory"].split(":")
+    try:
+        module = importlib.import_module(module_path)
+        factory = getattr(module, func_name)
+    except (ImportError, AttributeError) as e:
+        logger.warning(f"Could not load agent {agent_id} from {entry['factory']}: {e}")
+        return None
+
+    _factories[agent_id] = factory
+    return factory
+
+
+def get_factory_by_name(func_name: str) -> Optional[Callable]:
+    """Return a factory by its function name, e.g. ``create_pubmed_agent``."""
+    for entry in load_manifest():
+        if entry["factory"].endswith(f":{func_name}"):
+            return get_factory(entry["id"])
+    return None
+
+
+if __name__ == "__main__":
+    # Regenerate the manifest: python -m agents.registry
+    for entry in write_manifest():
+        print(f"{entry['id']}: {entry['name']} -> {entry['factory']}")
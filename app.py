@@ -40,6 +40,7 @@ pages = [
     st.Page(
         "pages/Configuration.py", title="Configuration", icon=":material/settings:"
     ),
+    st.Page("pages/Usage.py", title="Usage", icon=":material/monitoring:"),
     st.Page(
         "pages/About.py",
         title="About",
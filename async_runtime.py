@@ -0,0 +1,75 @@
+"""
+Shared asyncio runtime for the HALO Agent Interface.
+
+Streamlit runs every page script in its own short-lived thread. Instead of
+blocking one OS thread per in-flight model or tool call, pages hand their
+coroutines to a single long-lived event loop running in a background thread,
+which multiplexes all ``arun`` calls, async OpenAI clients and async tools of
+the process.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Optional, TypeVar
+
+from agno.utils.log import logger
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared event loop, starting its thread on first use."""
+    global _loop
+    if _loop is None or _loop.is_closed():
+        with _loop_lock:
+            if _loop is None or _loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=_run_loop, args=(loop,), name="halo-event-loop", daemon=True
+                )
+                thread.start()
+                _loop = loop
+                logger.info("Started shared event loop")
+    return _loop
+
+
+def submit(coro: Awaitable[T]) -> "Future[T]":
+    """Schedule a coroutine on the shared loop and return a concurrent future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def run_async(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run a coroutine on the shared loop and wait for its result.
+
+    Args:
+        coro: The coroutine to run
+        timeout: Seconds to wait before the coroutine is cancelled
+
+    Returns:
+        The result of the coroutine
+    """
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_async cannot be called from the shared event loop; await instead")
+
+    future = asyncio.run_coroutine_threadsafe(coro, loop)
+    try:
+        return future.result(timeout=timeout)
+    except BaseException:
+        # Do not leave the coroutine running when the caller gives up
+        future.cancel()
+        raise
+
@@ -0,0 +1,326 @@
+"""
+Token-aware chunking for the HALO knowledge base.
+
+The readers' default chunkers cut every 5000 characters, ignoring markdown
+headings, tables and sentence boundaries. That gives oversize chunks (wasted
+prompt tokens when retrieved) and fragments that lose their context. The
+strategies here measure chunks in tokenizer tokens and keep structure intact:
+
+- ``markdown``: splits at headings, never inside tables or code blocks, and
+  prefixes each chunk with its heading path
+- ``sentences``: packs whole sentences into windows, overlapping by a sentence
+- ``fixed``: fixed token windows with overlap, for unstructured text
+
+The strategy of each format is configurable, and every chunk records the
+strategy, its token count and (for markdown) its section in its metadata.
+"""
+
+import json
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from agno.knowledge.chunking.strategy import ChunkingStrategy
+from agno.knowledge.document import Document
+from agno.utils.log import logger
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Target and overlap of a chunk in tokenizer tokens
+DEFAULT_CHUNK_TOKENS = int(os.getenv("HALO_CHUNK_TOKENS", "400"))
+DEFAULT_OVERLAP_TOKENS = 50
+
+# Strategy per file extension; override with e.g. HALO_CHUNKING='{".txt": "fixed"}'
+FORMAT_STRATEGIES: Dict[str, str] = {
+    ".md": "markdown",
+    ".txt": "sentences",
+    ".pdf": "sentences",
+    ".docx": "sentences",
+    ".csv": "fixed",
+}
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        # Tokenizer of the text-embedding-3 models
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokenizer tokens of a text, estimated if tiktoken is not installed."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1 if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_tokens(text: str, max_tokens: int, overlap: int = 0) -> List[str]:
+    """Split a text into windows of at most ``max_tokens`` tokens."""
+    encoding = _get_encoding()
+    step = max(max_tokens - overlap, 1)
+    if encoding is None:
+        # Without a tokenizer, windows of words approximate the token budget
+        words = text.split()
+        words_per_window = max(int(max_tokens * 0.75), 1)
+        word_step = max(int(step * 0.75), 1)
+        return [
+            " ".join(words[start : start + words_per_window])
+            for start in range(0, max(len(words) - (words_per_window - word_step), 1), word_step)
+        ]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [
+        encoding.decode(tokens[start : start + max_tokens])
+        for start in range(0, max(len(tokens) - overlap, 1), step)
+    ]
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])|\n{2,}")
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = " ".join(sentence.split())
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+class TokenChunking(ChunkingStrategy):
+    """Base of the token-aware strategies.
+
+    Args:
+        max_tokens: Upper bound of a chunk in tokens
+        overlap: Tokens (or for sentence windows, up to this many tokens of
+            whole sentences) repeated at the start of the next chunk
+    """
+
+    name = "token"
+
+    def __init__(self, max_tokens: int = DEFAULT_CHUNK_TOKENS, overlap: int = DEFAULT_OVERLAP_TOKENS):
+        if overlap >= max_tokens:
+            raise ValueError(f"Overlap ({overlap}) must be less than max_tokens ({max_tokens})")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+
+    @property
+    def signature(self) -> str:
+        """Identifies the chunking configuration; chunks change when it does."""
+        return f"{self.name}:{self.max_tokens}:{self.overlap}:{'tiktoken' if tiktoken else 'estimate'}"
+
+    def split(self, text: str) -> List[Tuple[str, Dict]]:
+        """Return the chunk texts with extra metadata of each."""
+        raise NotImplementedError
+
+    def chunk(self, document: Document) -> List[Document]:
+        chunks: List[Document] = []
+        for number, (content, extra) in enumerate(self.split(document.content), start=1):
+            meta_data = dict(document.meta_data or {})
+            meta_data.update(extra)
+            meta_data.update(chunk=number, chunk_tokens=count_tokens(content), chunking=self.name)
+            chunk_id = f"{document.id or document.name}_{number}" if (document.id or document.name) else None
+            chunks.append(Document(id=chunk_id, name=document.name, meta_data=meta_data, content=content))
+        return chunks
+
+    def _pack(
+        self, pieces: List[str], separator: str, max_tokens: Optional[int] = None, overlap: bool = True
+    ) -> List[str]:
+        """Join pieces into chunks of at most ``max_tokens``; oversize pieces are split."""
+        max_tokens = max(max_tokens or self.max_tokens, self.overlap + 1)
+        chunks: List[str] = []
+        current: List[str] = []
+        current_tokens = 0
+        for piece in pieces:
+            tokens = count_tokens(piece)
+            if tokens > max_tokens:
+                if current:
+                    chunks.append(separator.join(current))
+                    current, current_tokens = [], 0
+                chunks.extend(split_tokens(piece, max_tokens, self.overlap))
+                continue
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(separator.join(current))
+                # Carry whole trailing pieces that fit into the overlap
+                carried: List[str] = []
+                carried_tokens = 0
+                if overlap:
+                    for previous in reversed(current):
+                        previous_tokens = count_tokens(previous)
+                        if carried_tokens + previous_tokens > self.overlap:
+                            break
+                        carried.insert(0, previous)
+                        carried_tokens += previous_tokens
+                current, current_tokens = carried, carried_tokens
+            current.append(piece)
+            current_tokens += tokens
+        if current:
+            chunks.append(separator.join(current))
+        return chunks
+
+
+class FixedTokenChunking(TokenChunking):
+    """Fixed windows of ``max_tokens`` tokens overlapping by ``overlap`` tokens."""
+
+    name = "fixed"
+
+    def split(self, text: str) -> List[Tuple[str, Dict]]:
+        text = text.strip()
+        if not text:
+            return []
+        return [(chunk, {}) for chunk in split_tokens(text, self.max_tokens, self.overlap)]
+
+
+class SentenceWindowChunking(TokenChunking):
+    """Whole sentences packed into windows, overlapping by the last sentences."""
+
+    name = "sentences"
+
+    def split(self, text: str) -> List[Tuple[str, Dict]]:
+        return [(chunk, {}) for chunk in self._pack(split_sentences(text), " ")]
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def _markdown_blocks(text: str) -> List[Tuple[Optional[Tuple[int, str]], str]]:
+    """Split markdown into headings and blocks: paragraphs, lists, tables and code."""
+    blocks: List[Tuple[Optional[Tuple[int, str]], str]] = []
+    current: List[str] = []
+    kind: Optional[str] = None
+
+    def flush() -> None:
+        nonlocal current, kind
+        if current and any(line.strip() for line in current):
+            blocks.append((None, "\n".join(current).strip("\n")))
+        current, kind = [], None
+
+    for line in text.splitlines():
+        if kind == "code":
+            current.append(line)
+            if _FENCE.match(line):
+                flush()
+            continue
+        if _FENCE.match(line):
+            flush()
+            current, kind = [line], "code"
+            continue
+        heading = _HEADING.match(line)
+        if heading:
+            flush()
+            blocks.append(((len(heading.group(1)), heading.group(2)), line))
+            continue
+        is_table = line.lstrip().startswith("|")
+        if not line.strip() or (kind == "table") != is_table:
+            flush()
+        if line.strip():
+            current.append(line)
+            kind = "table" if is_table else "text"
+    flush()
+    return blocks
+
+
+class MarkdownHeadingChunking(TokenChunking):
+    """Chunks that follow the heading structure of markdown.
+
+    Sections are split at headings and small sections are not merged across
+    them. Tables and code blocks are kept whole where they fit; oversize
+    tables are split by rows with their header repeated. Each chunk starts
+    with the path of headings it belongs to, so it stays understandable when
+    retrieved on its own.
+    """
+
+    name = "markdown"
+
+    def _split_table(self, table: str, max_tokens: int) -> List[str]:
+        lines = table.splitlines()
+        # The header row and its |---| separator are repeated in every part
+        has_separator = len(lines) > 2 and set(lines[1].replace("|", "").strip()) <= set("-: ")
+        header = lines[:2] if has_separator else lines[:1]
+        rows = lines[len(header) :]
+        budget = max_tokens - count_tokens("\n".join(header))
+        chunks, current, current_tokens = [], [], 0
+        for row in rows:
+            tokens = count_tokens(row) + 1
+            if current and current_tokens + tokens > budget:
+                chunks.append("\n".join(header + current))
+                current, current_tokens = [], 0
+            current.append(row)
+            current_tokens += tokens
+        if current or not chunks:
+            chunks.append("\n".join(header + current))
+        return chunks
+
+    def split(self, text: str) -> List[Tuple[str, Dict]]:
+        chunks: List[Tuple[str, Dict]] = []
+        path: List[Tuple[int, str]] = []
+        section: List[str] = []
+
+        def flush_section() -> None:
+            if not section:
+                return
+            breadcrumb = " > ".join(title for _, title in path)
+            prefix = f"{breadcrumb}\n\n" if breadcrumb else ""
+            budget = self.max_tokens - count_tokens(prefix)
+            pieces: List[str] = []
+            for block in section:
+                if count_tokens(block) <= budget:
+                    pieces.append(block)
+                elif block.lstrip().startswith("|"):
+                    pieces.extend(self._split_table(block, budget))
+                else:
+                    pieces.extend(self._pack(split_sentences(block), " ", budget))
+            for content in self._pack(pieces, "\n\n", budget, overlap=False):
+                chunks.append((prefix + content, {"section": breadcrumb} if breadcrumb else {}))
+            section.clear()
+
+        for heading, block in _markdown_blocks(text):
+            if heading is not None:
+                flush_section()
+                level, title = heading
+                path[:] = [(other_level, other) for other_level, other in path if other_level < level]
+                path.append((level, title))
+                continue
+            section.append(block)
+        flush_section()
+        return chunks
+
+
+CHUNKING_STRATEGIES: Dict[str, Callable[..., TokenChunking]] = {
+    "markdown": MarkdownHeadingChunking,
+    "sentences": SentenceWindowChunking,
+    "fixed": FixedTokenChunking,
+}
+
+
+def load_format_strategies() -> Dict[str, str]:
+    """Return the strategy per format, with the HALO_CHUNKING overrides applied."""
+    strategies = dict(FORMAT_STRATEGIES)
+    overrides = os.getenv("HALO_CHUNKING")
+    if overrides:
+        try:
+            strategies.update(json.loads(overrides))
+        except ValueError as e:
+            logger.warning(f"Ignoring invalid HALO_CHUNKING: {e}")
+    return strategies
+
+
+def get_chunking_strategy(suffix: str) -> TokenChunking:
+    """Return the chunking strategy for a file extension such as ``.md``."""
+    name = load_format_strategies().get(suffix.lower(), "sentences")
+    if name not in CHUNKING_STRATEGIES:
+        logger.warning(f"Unknown chunking strategy {name!r} for {suffix}, using sentences")
+        name = "sentences"
+    return CHUNKING_STRATEGIES[name]()
+
+
+def chunking_signature(suffix: str) -> str:
+    """Signature of the chunking strategy of a file extension."""
+    return get_chunking_strategy(suffix).signature
@@ -0,0 +1,365 @@
+"""
+Request deadlines and hedged calls for the HALO Agent Interface.
+
+Every analysis gets an overall time budget. Each stage (triage, model calls,
+PubMed, embeddings) gets a timeout capped by what is left of that budget, so
+one slow dependency can no longer stretch a request to minutes. Idempotent
+calls are hedged: if the first attempt is slower than the recent p95 of its
+stage, a duplicate is started and whichever answers first wins.
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from agno.knowledge.embedder.base import Embedder
+from agno.utils.log import log_debug, logger
+
+from accounting import record_call
+
+T = TypeVar("T")
+
+# Overall budget of one image analysis in seconds
+REQUEST_BUDGET = float(os.getenv("HALO_REQUEST_BUDGET", "240"))
+
+# Upper bound per call of a stage; the remaining request budget may cut it shorter
+STAGE_TIMEOUTS: Dict[str, float] = {
+    "triage": 20.0,
+    "model": 120.0,
+    "pubmed": 15.0,
+    "embedding": 10.0,
+}
+
+# Hedge delay of a stage until enough latencies have been observed
+DEFAULT_HEDGE_DELAYS: Dict[str, float] = {
+    "pubmed": 4.0,
+    "embedding": 1.5,
+}
+
+# Threads per stage for hedged calls
+HEDGE_WORKERS = int(os.getenv("HALO_HEDGE_WORKERS", "8"))
+
+_current_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar(
+    "halo_deadline", default=None
+)
+
+
+class Deadline:
+    """Absolute point in time by which a request has to be answered."""
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def stage_timeout(self, stage: str) -> float:
+        """Timeout of a stage: its own cap, or less if the budget is nearly used up."""
+        return min(STAGE_TIMEOUTS.get(stage, self.budget), self.remaining())
+
+
+@contextmanager
+def request_deadline(budget: float = REQUEST_BUDGET) -> Iterator[Deadline]:
+    """Set the deadline of the current request (thread or asyncio task).
+
+    Nested calls keep the earlier of both deadlines.
+    """
+    deadline = Deadline(budget)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def stage_timeout(stage: str) -> float:
+    """Timeout for a call of a stage under the current deadline, if any."""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return STAGE_TIMEOUTS.get(stage, REQUEST_BUDGET)
+    return deadline.stage_timeout(stage)
+
+
+class StageLatencies:
+    """Recent call latencies per stage, used to derive hedge delays."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, stage: str, q: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def hedge_delay(self, stage: str) -> float:
+        p95 = self.percentile(stage, 0.95)
+        if p95 is None:
+            return DEFAULT_HEDGE_DELAYS.get(stage, STAGE_TIMEOUTS.get(stage, 10.0) / 2)
+        return max(p95, 0.05)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stages = list(self._samples)
+        return {
+            stage: {
+                "p50": self.percentile(stage, 0.5),
+                "p95": self.percentile(stage, 0.95),
+                "p99": self.percentile(stage, 0.99),
+            }
+            for stage in stages
+        }
+
+
+# Process-wide, so hedge delays follow the latency of the real dependencies
+stage_latencies = StageLatencies()
+
+
+class _StagePool:
+    """Threads of the hedged calls of one stage.
+
+    Attempts that lose the race or time out cannot be cancelled and keep their
+    thread until they return. Each stage therefore has its own pool, so a
+    stalled dependency only exhausts its own, and nothing is queued behind
+    busy threads: a saturated pool refuses new attempts.
+    """
+
+    def __init__(self, stage: str, max_workers: int = HEDGE_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedged-{stage}")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> Optional[Future]:
+        """Start an attempt on a free thread, None if all of them are busy."""
+        with self._lock:
+            if self._in_flight >= self.max_workers:
+                return None
+            self._in_flight += 1
+        # Attempts run on pool threads but keep the deadline of the caller
+        future = self._executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+
+_stage_pools: Dict[str, _StagePool] = {}
+_stage_pools_lock = threading.Lock()
+
+
+def _stage_pool(stage: str) -> _StagePool:
+    with _stage_pools_lock:
+        pool = _stage_pools.get(stage)
+        if pool is None:
+            pool = _stage_pools[stage] = _StagePool(stage)
+    return pool
+
+
+def hedged_call(
+    stage: str,
+    fn: Callable[..., T],
+    *args: Any,
+    timeout: Optional[float] = None,
+    hedge: bool = True,
+    **kwargs: Any,
+) -> T:
+    """Call an idempotent function with a timeout and one hedged duplicate.
+
+    Args:
+        stage: Stage of the call, for its timeout and latency statistics
+        fn: The function to call; must be safe to call twice
+        timeout: Seconds to wait. Defaults to the stage timeout under the current deadline.
+        hedge: Start a duplicate attempt once the first one is slower than the stage p95
+
+    Returns:
+        The result of the first attempt that succeeds
+
+    Raises:
+        TimeoutError: If no attempt succeeded in time
+
+    While all threads of the stage are busy with earlier attempts, the call
+    runs in the calling thread, bounded only by the timeout of its client,
+    and is not hedged.
+    """
+    timeout = stage_timeout(stage) if timeout is None else timeout
+    if timeout <= 0:
+        raise TimeoutError(f"No time left in the request budget for {stage}")
+
+    pool = _stage_pool(stage)
+    start = time.monotonic()
+    first = pool.try_submit(fn, *args, **kwargs)
+    if first is None:
+        logger.warning(f"All {stage} threads are busy; calling without hedging")
+        result = fn(*args, **kwargs)
+        stage_latencies.record(stage, time.monotonic() - start)
+        return result
+
+    expires_at = start + timeout
+    hedge_at = start + stage_latencies.hedge_delay(stage) if hedge else None
+    pending = {first}
+    attempts = 1
+    error: Optional[BaseException] = None
+
+    while pending:
+        now = time.monotonic()
+        if now >= expires_at:
+            break
+        wake_at = expires_at if hedge_at is None or attempts > 1 else min(expires_at, hedge_at)
+        done, pending = wait(pending, timeout=max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                stage_latencies.record(stage, time.monotonic() - start)
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            error = future.exception()
+        # Hedge a slow first attempt, or retry a failed one while there is time
+        if hedge_at is not None and attempts == 1 and (time.monotonic() >= hedge_at or not pending):
+            duplicate = pool.try_submit(fn, *args, **kwargs)
+            if duplicate is not None:
+                log_debug(f"Hedging {stage} call after {time.monotonic() - start:.2f}s")
+                pending.add(duplicate)
+            attempts += 1
+
+    if error is not None and not pending:
+        raise error
+    for future in pending:
+        future.cancel()
+    stage_latencies.record(stage, timeout)
+    logger.warning(f"{stage} call did not finish within {timeout:.1f}s")
+    raise TimeoutError(f"{stage} did not finish within {timeout:.1f}s")
+
+
+async def ahedged_call(
+    stage: str,
+    fn: Callable[..., Awaitable[T]],
+    *args: Any,
+    timeout: Optional[float] = None,
+    hedge: bool = True,
+    **kwargs: Any,
+) -> T:
+    """Async version of ``hedged_call`` for a coroutine function.
+
+    Attempts are tasks on the running loop, so those that lose the race or
+    time out are cancelled instead of holding a thread.
+    """
+    timeout = stage_timeout(stage) if timeout is None else timeout
+    if timeout <= 0:
+        raise TimeoutError(f"No time left in the request budget for {stage}")
+
+    start = time.monotonic()
+    expires_at = start + timeout
+    hedge_at = start + stage_latencies.hedge_delay(stage) if hedge else None
+    pending = {asyncio.ensure_future(fn(*args, **kwargs))}
+    attempts = 1
+    error: Optional[BaseException] = None
+
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= expires_at:
+                break
+            wake_at = expires_at if hedge_at is None or attempts > 1 else min(expires_at, hedge_at)
+            done, pending = await asyncio.wait(
+                pending, timeout=max(wake_at - now, 0), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    stage_latencies.record(stage, time.monotonic() - start)
+                    return task.result()
+                error = task.exception()
+            if hedge_at is not None and attempts == 1 and (time.monotonic() >= hedge_at or not pending):
+                log_debug(f"Hedging {stage} call after {time.monotonic() - start:.2f}s")
+                pending.add(asyncio.ensure_future(fn(*args, **kwargs)))
+                attempts += 1
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if error is not None and not pending:
+        raise error
+    stage_latencies.record(stage, timeout)
+    logger.warning(f"{stage} call did not finish within {timeout:.1f}s")
+    raise TimeoutError(f"{stage} did not finish within {timeout:.1f}s")
+
+
+@dataclass
+class HedgedEmbedder(Embedder):
+    """Embedder whose query embeddings are hedged and bounded by the deadline.
+
+    Sync and async calls alike; bulk embedding for ingestion is not hedged.
+    All calls are recorded for usage accounting.
+    """
+
+    embedder: Optional[Embedder] = None
+
+    def __post_init__(self):
+        if self.embedder is None:
+            raise ValueError("HedgedEmbedder needs an embedder to wrap")
+        self.dimensions = self.embedder.dimensions
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes the wrapper lacks, e.g. id or client
+        embedder = self.__dict__.get("embedder")
+        if embedder is None:
+            raise AttributeError(name)
+        return getattr(embedder, name)
+
+    def _record(self, start: float, usage: Optional[Dict]) -> None:
+        record_call(
+            "embedding",
+            name=self.id,
+            model=self.id,
+            duration=time.monotonic() - start,
+            input_tokens=(usage or {}).get("prompt_tokens", 0) or 0,
+        )
+
+    def get_embedding(self, text: str) -> List[float]:
+        embedding, _ = self.get_embedding_and_usage(text)
+        return embedding
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        start = time.monotonic()
+        embedding, usage = hedged_call("embedding", self.embedder.get_embedding_and_usage, text)
+        self._record(start, usage)
+        return embedding, usage
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        embedding, _ = await self.async_get_embedding_and_usage(text)
+        return embedding
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        start = time.monotonic()
+        embedding, usage = await ahedged_call("embedding", self.embedder.async_get_embedding_and_usage, text)
+        self._record(start, usage)
+        return embedding, usage
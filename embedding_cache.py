@@ -0,0 +1,312 @@
+"""
+Persistent embedding cache for the HALO Agent Interface.
+
+Chunks are re-embedded far more often than they change: recreated tables,
+duplicate uploads, re-scraped pages and re-synced files all send text that was
+embedded before. Vectors are cached in SQLite as float32 blobs, keyed by
+embedder id, dimensions and a hash of the whitespace-normalised chunk text,
+and looked up before any embedding API call.
+
+The cache is bounded: vectors not used for ``EMBEDDING_CACHE_TTL`` are
+pruned, and beyond ``EMBEDDING_CACHE_MAX_ROWS`` the least recently used go.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.base import Embedder
+from agno.utils.log import log_debug, logger
+
+cwd = Path(__file__).parent.resolve()
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
+tmp_dir.mkdir(exist_ok=True, parents=True)
+
+EMBEDDING_CACHE_PATH = tmp_dir.joinpath("halo_embeddings.db")
+
+# Vectors kept at most; about 6 KB each for 1536 dimensions
+EMBEDDING_CACHE_MAX_ROWS = int(os.getenv("HALO_EMBEDDING_CACHE_MAX_ROWS", "200000"))
+# Vectors not used for this long are pruned
+EMBEDDING_CACHE_TTL = float(os.getenv("HALO_EMBEDDING_CACHE_TTL", str(30 * 24 * 3600)))
+# Hits refresh the last use of a vector at most this often, to keep lookups read-only
+_TOUCH_INTERVAL = 24 * 3600
+# Stores between two prunes
+_PRUNE_EVERY = 1000
+
+# SQLite limits the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def chunk_hash(text: str) -> str:
+    """Hash of a chunk that ignores differences in unicode form and whitespace."""
+    normalized = " ".join(unicodedata.normalize("NFC", text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of embedding vectors.
+
+    ``last_used_at`` of a row is refreshed by hits at most once a day;
+    pruning drops the rows used longest ago.
+
+    Args:
+        path: SQLite file of the cache
+        max_rows: Vectors kept at most
+        ttl: Seconds after their last use vectors are pruned
+    """
+
+    def __init__(
+        self,
+        path: Path = EMBEDDING_CACHE_PATH,
+        max_rows: int = EMBEDDING_CACHE_MAX_ROWS,
+        ttl: float = EMBEDDING_CACHE_TTL,
+    ):
+        self.path = Path(path)
+        self.max_rows = max_rows
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "pruned": 0}
+        self._stores_since_prune = 0
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    embedder TEXT NOT NULL,
+                    dimensions INTEGER NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used_at REAL NOT NULL,
+                    PRIMARY KEY (embedder, dimensions, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+            self._migrate(conn)
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used_at ON embeddings (last_used_at)")
+        self.prune()
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Rename the ``created_at`` column of caches written by earlier versions."""
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+        if "created_at" in columns:
+            conn.execute("DROP INDEX IF EXISTS embeddings_created_at")
+            conn.execute("ALTER TABLE embeddings RENAME COLUMN created_at TO last_used_at")
+            log_debug("Renamed created_at to last_used_at in the embedding cache")
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "EmbeddingCache":
+        # Agents and knowledge bases are deep-copied per run; they share the cache
+        return self
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation: callers run on many threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_many(self, embedder_id: str, dimensions: int, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors of the given chunk hashes that exist."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                for start in range(0, len(unique), _LOOKUP_BATCH):
+                    batch = unique[start : start + _LOOKUP_BATCH]
+                    rows = conn.execute(
+                        f"""
+                        SELECT text_hash, vector, last_used_at FROM embeddings
+                        WHERE embedder = ? AND dimensions = ?
+                          AND text_hash IN ({",".join("?" * len(batch))})
+                        """,
+                        (embedder_id, dimensions, *batch),
+                    ).fetchall()
+                    stale = []
+                    for text_hash, blob, used_at in rows:
+                        found[text_hash] = np.frombuffer(blob, dtype=np.float32).tolist()
+                        if used_at < now - _TOUCH_INTERVAL:
+                            stale.append(text_hash)
+                    if stale:
+                        conn.execute(
+                            f"""
+                            UPDATE embeddings SET last_used_at = ?
+                            WHERE embedder = ? AND dimensions = ?
+                              AND text_hash IN ({",".join("?" * len(stale))})
+                            """,
+                            (now, embedder_id, dimensions, *stale),
+                        )
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+        with self._lock:
+            self._stats["hits"] += len(found)
+            self._stats["misses"] += len(unique) - len(found)
+        return found
+
+    def put_many(self, embedder_id: str, dimensions: int, items: Sequence[Tuple[str, List[float]]]) -> None:
+        """Store vectors by chunk hash; empty vectors of failed calls are skipped."""
+        now = time.time()
+        rows = [
+            (embedder_id, dimensions, text_hash, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text_hash, vector in items
+            if vector
+        ]
+        if not rows:
+            return
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store embeddings: {e}")
+            return
+        with self._lock:
+            self._stats["stores"] += len(rows)
+            self._stores_since_prune += len(rows)
+            due = self._stores_since_prune >= _PRUNE_EVERY
+            if due:
+                self._stores_since_prune = 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Delete vectors unused for longer than the TTL, then the least recently used over the row limit.
+
+        Returns:
+            int: Number of deleted vectors
+        """
+        try:
+            with self._connect() as conn:
+                deleted = conn.execute(
+                    "DELETE FROM embeddings WHERE last_used_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+                excess = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.max_rows
+                if excess > 0:
+                    deleted += conn.execute(
+                        """
+                        DELETE FROM embeddings WHERE (embedder, dimensions, text_hash) IN (
+                            SELECT embedder, dimensions, text_hash FROM embeddings ORDER BY last_used_at LIMIT ?
+                        )
+                        """,
+                        (excess,),
+                    ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Could not prune the embedding cache: {e}")
+            return 0
+        if deleted:
+            log_debug(f"Pruned {deleted} cached embeddings")
+            with self._lock:
+                self._stats["pruned"] += deleted
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# Shared by all embedders of the process
+_embedding_caches: Dict[str, EmbeddingCache] = {}
+_embedding_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: Path = EMBEDDING_CACHE_PATH) -> EmbeddingCache:
+    """Return the process-wide cache for a cache file."""
+    with _embedding_caches_lock:
+        cache = _embedding_caches.get(str(path))
+        if cache is None:
+            cache = EmbeddingCache(path)
+            _embedding_caches[str(path)] = cache
+    return cache
+
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """Embedder that answers from the embedding cache before calling the API.
+
+    Cache hits report no usage, so they are accounted as free calls.
+    """
+
+    embedder: Optional[Embedder] = None
+    cache: Optional[EmbeddingCache] = None
+
+    def __post_init__(self):
+        if self.embedder is None:
+            raise ValueError("CachedEmbedder needs an embedder to wrap")
+        if self.cache is None:
+            self.cache = get_embedding_cache()
+        self.dimensions = self.embedder.dimensions
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes the wrapper lacks, e.g. id or client
+        embedder = self.__dict__.get("embedder")
+        if embedder is None:
+            raise AttributeError(name)
+        return getattr(embedder, name)
+
+    @property
+    def cache_key(self) -> Tuple[str, int]:
+        return self.embedder.id, self.embedder.dimensions or 0
+
+    def _lookup(self, text: str) -> Tuple[str, Optional[List[float]]]:
+        text_hash = chunk_hash(text)
+        return text_hash, self.cache.get_many(*self.cache_key, [text_hash]).get(text_hash)
+
+    def get_embedding(self, text: str) -> List[float]:
+        embedding, _ = self.get_embedding_and_usage(text)
+        return embedding
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        text_hash, embedding = self._lookup(text)
+        if embedding is not None:
+            return embedding, None
+        embedding, usage = self.embedder.get_embedding_and_usage(text)
+        self.cache.put_many(*self.cache_key, [(text_hash, embedding)])
+        return embedding, usage
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        embedding, _ = await self.async_get_embedding_and_usage(text)
+        return embedding
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        text_hash, embedding = self._lookup(text)
+        if embedding is not None:
+            return embedding, None
+        embedding, usage = await self.embedder.async_get_embedding_and_usage(text)
+        self.cache.put_many(*self.cache_key, [(text_hash, embedding)])
+        return embedding, usage
+
+    def get_embeddings_batch(self, texts: List[str], batch_size: int = 100) -> List[List[float]]:
+        """Embed many texts, calling the API only for those not cached yet."""
+        hashes = [chunk_hash(text) for text in texts]
+        found = self.cache.get_many(*self.cache_key, hashes)
+
+        # Embed each missing chunk once, even if it occurs several times
+        missing = {text_hash: text for text_hash, text in zip(hashes, texts) if text_hash not in found}
+        if missing:
+            missing_texts = list(missing.values())
+            if hasattr(self.embedder, "get_embeddings_batch"):
+                vectors = self.embedder.get_embeddings_batch(missing_texts, batch_size=batch_size)
+            else:
+                vectors = [self.embedder.get_embedding(text) for text in missing_texts]
+            new = list(zip(missing, vectors))
+            self.cache.put_many(*self.cache_key, new)
+            found.update(new)
+        log_debug(f"Embedded {len(missing)} of {len(texts)} texts, {len(texts) - len(missing)} cached")
+        return [found[text_hash] for text_hash in hashes]
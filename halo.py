@@ -1,39 +1,56 @@
+import asyncio
+import copy
 import os
-from dataclasses import dataclass
+import threading
+import time
+from uuid import uuid4
+from dataclasses import dataclass, field
 from pathlib import Path
 from textwrap import dedent
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from agents import get_agent
 from agno.agent import Agent
-from agno.knowledge.embedder.openai import OpenAIEmbedder
 from agno.memory import MemoryManager
+from agno.models.message import Message
+from agno.run.base import RunStatus
+from agno.run.team import TeamRunOutput
 from agno.db.sqlite import SqliteDb
 
-# from agno.models.anthropic import Claude
-# from agno.models.google import Gemini
-# from agno.models.groq import Groq
-from agno.models.openai import OpenAIChat
 from agno.team import Team
 from agno.tools import Toolkit
 from agno.tools.reasoning import ReasoningTools
 from agno.utils.log import logger
-from agno.vectordb.lancedb import LanceDb, SearchType
-from knowledge import HaloKnowledge
-from tools import get_toolkit
+from agno.vectordb.lancedb import SearchType
+from accounting import record_run, usage_context
+from history import HISTORY_KEEP_LAST_RUNS, create_history_manager, format_summary
+from knowledge import KNOWLEDGE_PATH, KNOWLEDGE_TABLE, HaloKnowledge
+from knowledge_index import IndexedLanceDb
+from knowledge_schema import KnowledgeMigrator
+from models import create_embedder, create_model
+from reranking import KNOWLEDGE_TOP_K, create_reranker
+from response_cache import (
+    SemanticResponseCache,
+    get_response_cache,
+    is_cacheable_query,
+    semantic_cache_enabled,
+    used_personal_context,
+)
+from router import acreate_routed_halo, create_routed_halo
+from tools import ToolOutputTools, get_toolkit
+from tools.parallel_delegation import ParallelDelegationTools
 from config import config
 import base64
 import json
 
 cwd = Path(__file__).parent.resolve()
-tmp_dir = cwd.joinpath("tmp")
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
 tmp_dir.mkdir(exist_ok=True, parents=True)
 
 # Define paths for storage, memory and knowledge
 SESSIONS_PATH = tmp_dir.joinpath("halo_sessions.db")
 MEMORY_PATH = tmp_dir.joinpath("halo_memory.db")
-# Use a user-specific directory for knowledge to avoid permission issues
-KNOWLEDGE_PATH = Path(os.path.join(os.path.expanduser("~"), "halo_knowledge"))
 KNOWLEDGE_PATH.mkdir(exist_ok=True, parents=True)
 
 
@@ -43,6 +60,14 @@ class HaloConfig:
     model_id: str = "openai:gpt-5"
     tools: Optional[List[str]] = None
     agents: Optional[List[str]] = None
+    # Run independent member tasks concurrently (requires Team.arun)
+    parallel_delegation: bool = False
+    member_timeout: float = 120.0
+    # Answer repeated standalone questions from the semantic response cache;
+    # defaults to the switch on the Configuration page (or HALO_SEMANTIC_CACHE)
+    semantic_cache: bool = field(default_factory=semantic_cache_enabled)
+    # Tenant or group sharing cached answers; defaults to the user
+    cache_scope: Optional[str] = None
 
 
 # Setup memory database
@@ -58,181 +83,47 @@ halo_memory = MemoryManager(
 halo_sessions = SqliteDb(db_file=str(SESSIONS_PATH))
 
 # setup knowledge database
+# Created once; the table schema follows its vector size
+knowledge_embedder = create_embedder()
 try:
-    # First try to initialize with existing table
+    # Migrations rewrite the table and may re-embed it: they only run on request
+    migration_plan = KnowledgeMigrator(KNOWLEDGE_PATH, KNOWLEDGE_TABLE, knowledge_embedder).plan()
+    if migration_plan.needed:
+        logger.warning(
+            f"{migration_plan.report()}\nRun `python load_knowledge.py --migrate` to apply it"
+        )
+
     halo_knowledge = HaloKnowledge(
-        vector_db=LanceDb(
-            table_name="halo_knowledge",
+        vector_db=IndexedLanceDb(
+            table_name=KNOWLEDGE_TABLE,
             uri=str(KNOWLEDGE_PATH),
             search_type=SearchType.hybrid,
-            embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-        )
+            embedder=knowledge_embedder,
+        ),
+        # Few, reranked chunks instead of a padded top-k in every prompt
+        max_results=KNOWLEDGE_TOP_K,
+        reranker=create_reranker(),
     )
     logger.info("Successfully initialized LanceDb with existing table")
 except Exception as e:
-    logger.warning(f"Error initializing LanceDb: {e}")
-    try:
-        # Create a new LanceDb instance with schema definition
-        from lancedb import connect
-        import pyarrow as pa
-
-        # Create a connection to the database
-        logger.info(f"Creating new LanceDB connection to {KNOWLEDGE_PATH}")
-        connection = connect(str(KNOWLEDGE_PATH))
-
-        # Define schema for the table to match agno's LanceDB implementation
-        schema = pa.schema(
-            [
-                pa.field(
-                    "vector", pa.list_(pa.float32(), 1536)
-                ),  # Vector field for embeddings
-                pa.field("id", pa.string()),  # Document ID
-                pa.field(
-                    "payload", pa.string()
-                ),  # JSON string containing name, meta_data, content, usage
-            ]
-        )
-
-        # Create an empty table if it doesn't exist
-        if "halo_knowledge" not in connection.table_names():
-            logger.info("Creating new 'halo_knowledge' table with schema")
-            # Create empty DataFrame with the schema
-            import pandas as pd
-            import numpy as np
-
-            # Create a single empty row to initialize the table
-            empty_df = pd.DataFrame(
-                {
-                    "vector": [
-                        np.zeros(1536, dtype=np.float32)
-                    ],  # Vector field for embeddings
-                    "id": ["init"],
-                    "payload": [
-                        json.dumps(
-                            {
-                                "name": "initialization",
-                                "meta_data": {},
-                                "content": "initialization",
-                                "usage": {},
-                            }
-                        )
-                    ],
-                }
-            )
-
-            # Create the table
-            connection.create_table("halo_knowledge", data=empty_df)
-            logger.info("Successfully created new 'halo_knowledge' table")
-        else:
-            logger.info("Table 'halo_knowledge' already exists in the database")
-
-        # Initialize Knowledge with the new table
-        halo_knowledge = HaloKnowledge(
-            vector_db=LanceDb(
-                table_name="halo_knowledge",
-                uri=str(KNOWLEDGE_PATH),
-                search_type=SearchType.hybrid,
-                embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-            )
-        )
-        logger.info("Successfully initialized Knowledge with new table")
-    except Exception as inner_e:
-        logger.error(f"Failed to create LanceDB table: {inner_e}")
-        # Create a fallback by recreating the database directory
-        import shutil
-
-        logger.warning("Attempting to recreate the database directory as fallback")
-
-        # Backup the existing directory if it exists
-        if KNOWLEDGE_PATH.exists():
-            backup_path = KNOWLEDGE_PATH.with_name(f"{KNOWLEDGE_PATH.name}_backup")
-            logger.info(f"Backing up existing database to {backup_path}")
-            if backup_path.exists():
-                shutil.rmtree(backup_path)
-            shutil.copytree(KNOWLEDGE_PATH, backup_path)
-
-            # Remove the existing directory
-            logger.info(f"Removing existing database at {KNOWLEDGE_PATH}")
-            shutil.rmtree(KNOWLEDGE_PATH)
-
-        # Create a fresh directory
-        KNOWLEDGE_PATH.mkdir(exist_ok=True, parents=True)
-
-        # Try one more time with a fresh database
-        try:
-            from lancedb import connect
-            import pandas as pd
-            import numpy as np
-
-            # Create a connection to the fresh database
-            logger.info(f"Creating fresh LanceDB connection to {KNOWLEDGE_PATH}")
-            connection = connect(str(KNOWLEDGE_PATH))
-
-            # Create a single empty row to initialize the table with correct schema
-            empty_df = pd.DataFrame(
-                {
-                    "vector": [
-                        np.zeros(1536, dtype=np.float32)
-                    ],  # Vector field for embeddings
-                    "id": ["init"],
-                    "payload": [
-                        json.dumps(
-                            {
-                                "name": "initialization",
-                                "meta_data": {},
-                                "content": "initialization",
-                                "usage": {},
-                            }
-                        )
-                    ],
-                }
-            )
+    logger.error(f"Failed to initialize the knowledge base: {e}")
+    # Create a mock HaloKnowledge as absolute fallback; the database is left
+    # untouched, so it can be migrated with `python load_knowledge.py --migrate`
+    logger.warning("Creating mock HaloKnowledge instance as final fallback")
 
-            # Define schema for the table
-            schema = pa.schema(
-                [
-                    pa.field(
-                        "vector", pa.list_(pa.float32(), 1536)
-                    ),  # Vector field for embeddings
-                    pa.field("id", pa.string()),  # Document ID
-                    pa.field(
-                        "payload", pa.string()
-                    ),  # JSON string containing name, meta_data, content, usage
-                ]
-            )
+    # Create a minimal mock class that implements the required interface
+    class MockKnowledge:
+        def search(self, *args, **kwargs):
+            return []
 
-            # Create the table with explicit schema
-            connection.create_table("halo_knowledge", data=empty_df, schema=schema)
-            logger.info("Successfully created fresh 'halo_knowledge' table")
-
-            # Initialize Knowledge with the new table
-            halo_knowledge = HaloKnowledge(
-                vector_db=LanceDb(
-                    table_name="halo_knowledge",
-                    uri=str(KNOWLEDGE_PATH),
-                    search_type=SearchType.hybrid,
-                    embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-                )
-            )
-            logger.info("Successfully initialized HaloKnowledge with fresh table")
-        except Exception as final_e:
-            logger.error(f"All attempts to create LanceDB failed: {final_e}")
-            # Create a mock HaloKnowledge as absolute fallback
-            logger.warning("Creating mock HaloKnowledge instance as final fallback")
+        def add(self, *args, **kwargs):
+            logger.warning("Mock knowledge base cannot store data")
+            return True
 
-            # Create a minimal mock class that implements the required interface
-            class MockKnowledge:
-                def search(self, *args, **kwargs):
-                    return []
+        def delete(self, *args, **kwargs):
+            return True
 
-                def add(self, *args, **kwargs):
-                    logger.warning("Mock knowledge base cannot store data")
-                    return True
-
-                def delete(self, *args, **kwargs):
-                    return True
-
-            halo_knowledge = MockKnowledge()
+    halo_knowledge = MockKnowledge()
 
 
 # Function to show bot
@@ -297,33 +188,340 @@ def show_scotty(show=True):
     )
 
 
-def create_halo(
-    config: HaloConfig, session_id: Optional[str] = None, debug_mode: bool = True
-) -> Team:
-    """Returns an instance of the HALO Agent Interface (HALO)
+# Static team prompt. Kept at module level so the system prompt prefix is
+# byte-identical across sessions and can be served from the provider's prompt cache.
+HALO_DESCRIPTION = dedent("""\
+    You are an advanced AI System called `HALO Agent Interface` (HALO).
+    You provide a unified interface to a team of AI Agents, that you coordinate to assist the user in the best way possible.
 
-    Args:
-        config: HALO configuration
-        session_id: Session identifier
-        debug_mode: Enable debug logging
+    Keep your responses short and to the point, while maintaining a conversational tone.
+    You are able to handle easy conversations as well as complex requests by delegating tasks to the appropriate team members.
+    You are also capable of handling errors and edge cases and are able to provide helpful feedback to the user.\
+    """)
+
+HALO_INSTRUCTIONS: List[str] = [
+    "Your goal is to coordinate the team to assist the user in the best way possible.",
+    "If the user sends a conversational message like 'Hello', 'Hi', 'How are you', 'What is your name', etc., you should respond in a friendly and engaging manner.",
+    "If the user asks for something simple, like updating memory, you can do it directly without Thinking and Analyzing.",
+    "If the user says, he loves or likes something or dislikes something, you can update the memory directly without Thinking and Analyzing.",
+    "Keep your responses short and to the point, while maintaining a conversational tone.",
+    "If the user asks for something complex, **think** and determine if:\n"
+    " - You can answer by using a tool available to you\n"
+    " - You need to search the knowledge base\n"
+    " - You need to search the internet\n"
+    " - You need to delegate the task to a team member\n"
+    " - You need to ask a clarifying question",
+    "You also have to a knowledge base of information provided by the user. If the user asks about a topic that might be in the knowledge base, first ALWAYS search your knowledge base using the `search_knowledge_base` tool.",
+    "IMPORTANT: For domain-specific queries, delegate to specialized agents rather than using general search tools:",
+    "- For travel planning, Airbnb listings, or accommodation searches, ALWAYS delegate to the Airbnb Agent",
+    "- For LinkedIn-related queries or professional networking, delegate to the LinkedIn Agent",
+    "- For data analysis tasks, delegate to the Data Analyst agent",
+    "- For Python coding tasks, delegate to the Python Agent",
+    "- For research tasks, delegate to the Research Agent",
+    "Only if no specialized agent is available for the query, fall back to searching the knowledge base and then the internet.",
+    "If the users message is unclear, ask clarifying questions to get more information.",
+    "Based on the user request and the available team members, decide which member(s) should handle the task.",
+    "Coordinate the execution of the task among the selected team members.",
+    "Synthesize the results from the team members and provide a final, coherent answer to the user.",
+    "Do not use phrases like 'based on my knowledge' or 'depending on the information'.",
+]
+
+HALO_PARALLEL_INSTRUCTIONS: List[str] = [
+    "When a request needs several team members and their tasks are independent of each other, "
+    "use the `delegate_tasks_in_parallel` tool to run them at the same time instead of delegating one after another.",
+    "Results marked as 'timed_out' may be partial: use what is there and mention briefly which part is incomplete.",
+]
+
+
+class HaloTeam(Team):
+    """Team whose system message keeps all static content as a byte-stable prefix.
+
+    The default Team system message places attached media and user memories
+    before the description and instructions, so every new memory invalidates
+    the provider prompt cache for the whole prompt. Here they are appended
+    after the static part instead, together with the rolling history summary.
+
+    If a semantic response cache is attached, ``run`` answers repeated
+    standalone questions from it instead of running the team. Text messages
+    are triaged first: those the router can leave to the cheap model are run
+    by the session's team on that model instead.
     """
-    # Parse model provider and name
-    provider, model_name = config.model_id.split(":")
-
-    # Create model class based on provider
-    model = None
-    if provider == "openai":
-        model = OpenAIChat(id=model_name)
-    elif provider == "google":
-        model = Gemini(id=model_name)
-    elif provider == "anthropic":
-        model = Claude(id=model_name)
-    elif provider == "groq":
-        model = Groq(id=model_name)
-    else:
-        raise ValueError(f"Unsupported model provider: {provider}")
-    if model is None:
-        raise ValueError(f"Failed to create model instance for {config.model_id}")
+
+    # Set on templates built with HaloConfig.semantic_cache
+    response_cache: Optional[SemanticResponseCache] = None
+    cache_scope: Optional[str] = None
+    # Configuration of the session, for routing; None on teams that are routed already
+    halo_config: Optional[HaloConfig] = None
+
+    def _knowledge_version(self) -> str:
+        knowledge_version = getattr(self.knowledge, "knowledge_version", None)
+        return knowledge_version() if callable(knowledge_version) else "none"
+
+    def _cache_key(self, input, args, kwargs) -> Optional[tuple]:
+        cacheable = (
+            self.response_cache is not None
+            and not args
+            and not kwargs.get("stream", self.stream)
+            and not any(kwargs.get(name) for name in ("images", "audio", "videos", "files"))
+            and isinstance(input, str)
+            and is_cacheable_query(input)
+        )
+        if not cacheable:
+            return None
+        scope = self.cache_scope or kwargs.get("user_id") or self.user_id or "anonymous"
+        return scope, self._knowledge_version()
+
+    def _cache_lookup(self, input: str, cache_key: tuple, session_id: Optional[str]) -> Optional[TeamRunOutput]:
+        try:
+            hit = self.response_cache.lookup(input, *cache_key)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup failed: {e}")
+            return None
+        if hit is None:
+            return None
+        return TeamRunOutput(
+            run_id=str(uuid4()),
+            team_id=self.id,
+            team_name=self.name,
+            session_id=session_id or self.session_id,
+            content=hit.answer,
+            messages=[
+                Message(role="user", content=input),
+                Message(role="assistant", content=hit.answer),
+            ],
+            metadata={
+                "semantic_cache": {
+                    "similarity": hit.similarity,
+                    "cached_query": hit.query,
+                    "latency_saved": hit.latency_saved,
+                }
+            },
+            status=RunStatus.completed,
+        )
+
+    def _cache_store(self, input: str, cache_key: tuple, response: TeamRunOutput, latency: float) -> None:
+        if (
+            response.status != RunStatus.completed
+            or not isinstance(response.content, str)
+            or not response.content
+            # Answers built from user memories or the session summary are personalised
+            or used_personal_context(response)
+        ):
+            return
+        try:
+            self.response_cache.store(input, response.content, *cache_key, latency=latency)
+        except Exception as e:
+            logger.warning(f"Could not store answer in the semantic cache: {e}")
+
+    def _record_usage(self, response, kwargs) -> None:
+        # Streaming runs return an iterator; their usage is not recorded here
+        if isinstance(response, TeamRunOutput):
+            record_run(response, user_id=kwargs.get("user_id") or self.user_id)
+
+    def _usage_context(self, kwargs):
+        # Embeddings made during the run are attributed to its user and session
+        return usage_context(
+            user_id=kwargs.get("user_id") or self.user_id,
+            session_id=kwargs.get("session_id") or self.session_id,
+            agent=self.name,
+        )
+
+    def _routable(self, input, args, kwargs) -> bool:
+        return (
+            self.halo_config is not None
+            and isinstance(input, str)
+            and not args
+            and not any(kwargs.get(name) for name in ("images", "audio", "videos", "files"))
+        )
+
+    def _run_routed(self, input, args, kwargs):
+        if self._routable(input, args, kwargs):
+            routed, _ = create_routed_halo(self.halo_config, kwargs.get("session_id") or self.session_id, input)
+            if routed is not None:
+                # The routed team wrote this run to the session: reload it on the next run
+                self._team_session = None
+                # Team.run itself: caching and usage are handled by this run already
+                return Team.run(routed, input, **kwargs)
+        return super().run(input, *args, **kwargs)
+
+    async def _arun_routed(self, input, args, kwargs):
+        if self._routable(input, args, kwargs):
+            routed, _ = await acreate_routed_halo(
+                self.halo_config, kwargs.get("session_id") or self.session_id, input
+            )
+            if routed is not None:
+                self._team_session = None
+                return await Team.arun(routed, input, **kwargs)
+        return await super().arun(input, *args, **kwargs)
+
+    def run(self, input, *args, **kwargs):
+        """Run the team, serving near-identical standalone questions from the cache."""
+        with self._usage_context(kwargs):
+            cache_key = self._cache_key(input, args, kwargs)
+            cached = (
+                self._cache_lookup(input, cache_key, kwargs.get("session_id"))
+                if cache_key is not None
+                else None
+            )
+            if cached is not None:
+                response = cached
+            else:
+                start = time.perf_counter()
+                response = self._run_routed(input, args, kwargs)
+                if cache_key is not None:
+                    self._cache_store(input, cache_key, response, time.perf_counter() - start)
+            self._record_usage(response, kwargs)
+            return response
+
+    def arun(self, input, *args, **kwargs):
+        """Async version of ``run``.
+
+        Not a coroutine itself: streaming runs return the async iterator of
+        ``Team.arun`` unchanged, so they are not routed.
+        """
+        if kwargs.get("stream", self.stream):
+            return super().arun(input, *args, **kwargs)
+        cache_key = self._cache_key(input, args, kwargs)
+
+        async def _arun() -> TeamRunOutput:
+            with self._usage_context(kwargs):
+                cached = None
+                if cache_key is not None:
+                    # The cache does blocking SQLite and embedding calls
+                    cached = await asyncio.to_thread(
+                        self._cache_lookup, input, cache_key, kwargs.get("session_id")
+                    )
+                if cached is not None:
+                    response = cached
+                else:
+                    start = time.perf_counter()
+                    response = await self._arun_routed(input, args, kwargs)
+                    if cache_key is not None:
+                        await asyncio.to_thread(
+                            self._cache_store, input, cache_key, response, time.perf_counter() - start
+                        )
+                self._record_usage(response, kwargs)
+                return response
+
+        return _arun()
+
+    def get_system_message(
+        self,
+        session,
+        session_state=None,
+        user_id=None,
+        audio=None,
+        images=None,
+        videos=None,
+        files=None,
+        **kwargs,
+    ) -> Optional[Message]:
+        # Build the static part without per-run media
+        message = super().get_system_message(
+            session, session_state=session_state, user_id=user_id, **kwargs
+        )
+        if message is None or self.system_message is not None:
+            return message
+
+        dynamic_parts: List[str] = []
+        media = [
+            name
+            for name, items in (
+                ("Audio", audio),
+                ("Images", images),
+                ("Videos", videos),
+                ("Files", files),
+            )
+            if items
+        ]
+        if media:
+            dynamic_parts.append(
+                "<attached_media>\nYou have the following media attached to your message:\n"
+                + "".join(f" - {name}\n" for name in media)
+                + "</attached_media>"
+            )
+
+        if self.memory_manager is not None and (
+            self.enable_user_memories or self.enable_agentic_memory
+        ):
+            try:
+                user_memories = self.memory_manager.get_user_memories(
+                    user_id=user_id or self.user_id
+                )
+            except Exception as e:
+                logger.warning(f"Could not load user memories: {e}")
+                user_memories = None
+            if user_memories:
+                dynamic_parts.append(
+                    "You have access to memories from previous interactions with the user that you can use:\n\n"
+                    "<memories_from_previous_interactions>"
+                    + "".join(f"\n- {memory.memory}" for memory in user_memories)
+                    + "\n</memories_from_previous_interactions>\n\n"
+                    "Note: this information is from previous interactions and may be updated in this conversation. "
+                    "You should always prefer information from this conversation over the past memories."
+                )
+
+        summary = format_summary(session.summary) if session is not None else None
+        if summary:
+            dynamic_parts.append(summary)
+
+        if dynamic_parts:
+            message.content = f"{message.content}\n\n" + "\n\n".join(dynamic_parts)
+        return message
+
+    def _get_team_history_function(self, session):
+        """History tool limited to the rolling summary and the last runs.
+
+        The default tool returns the full transcript of the session.
+        """
+
+        def get_team_history(num_chats: Optional[int] = None) -> str:
+            """
+            Use this function to get the team chat history.
+
+            Args:
+                num_chats: The number of recent chats to return, at most the number kept verbatim.
+                    Older chats are only available as a summary.
+
+            Returns:
+                str: A JSON string with the summary of older chats and the list of recent messages.
+            """
+            last_n = min(num_chats or self.num_history_runs, self.num_history_runs)
+            messages = session.get_messages_from_last_n_runs(
+                team_id=self.id, last_n=last_n, skip_role="system"
+            )
+            return json.dumps(
+                {
+                    "summary_of_older_chats": (
+                        session.summary.summary if session.summary is not None else None
+                    ),
+                    "recent_messages": [message.to_dict() for message in messages],
+                }
+            )
+
+        return get_team_history
+
+
+# HALO team templates, built once per process and keyed by configuration
+_halo_templates: Dict[Tuple, Team] = {}
+_halo_templates_lock = threading.Lock()
+
+
+def _halo_template_key(config: HaloConfig, debug_mode: bool) -> Tuple:
+    return (
+        config.model_id,
+        tuple(sorted(set(config.tools or []))),
+        tuple(config.agents or []),
+        config.parallel_delegation,
+        config.member_timeout,
+        config.semantic_cache,
+        debug_mode,
+    )
+
+
+def _build_halo_template(config: HaloConfig, debug_mode: bool) -> Team:
+    """Build the session-independent HALO team (model, toolkits and members)."""
+    model = create_model(config.model_id, prompt_cache_key="halo-team")
 
     # Default tools that should always be available
     default_tools = []
@@ -338,6 +536,9 @@ def create_halo(
             tools.append(tool)
         else:
             logger.warning(f"Tool {tool_name} not found")
+    if len(tools) > 1:
+        # Lets the team page through results the tool-output gateway truncated
+        tools.append(ToolOutputTools())
 
     agents: List[Agent] = []
     if config.agents:
@@ -350,64 +551,98 @@ def create_halo(
             else:
                 logger.warning(f"Agent {agent_name} not found")
 
-    description = dedent("""\
-    You are an advanced AI System called `HALO Agent Interface` (HALO).
-    You provide a unified interface to a team of AI Agents, that you coordinate to assist the user in the best way possible.
-
-    Keep your responses short and to the point, while maintaining a conversational tone.
-    You are able to handle easy conversations as well as complex requests by delegating tasks to the appropriate team members.
-    You are also capable of handling errors and edge cases and are able to provide helpful feedback to the user.\
-    """)
-    instructions: List[str] = [
-        "Your goal is to coordinate the team to assist the user in the best way possible.",
-        "If the user sends a conversational message like 'Hello', 'Hi', 'How are you', 'What is your name', etc., you should respond in a friendly and engaging manner.",
-        "If the user asks for something simple, like updating memory, you can do it directly without Thinking and Analyzing.",
-        "If the user says, he loves or likes something or dislikes something, you can update the memory directly without Thinking and Analyzing.",
-        "Keep your responses short and to the point, while maintaining a conversational tone.",
-        "If the user asks for something complex, **think** and determine if:\n"
-        " - You can answer by using a tool available to you\n"
-        " - You need to search the knowledge base\n"
-        " - You need to search the internet\n"
-        " - You need to delegate the task to a team member\n"
-        " - You need to ask a clarifying question",
-        "You also have to a knowledge base of information provided by the user. If the user asks about a topic that might be in the knowledge base, first ALWAYS search your knowledge base using the `search_knowledge_base` tool.",
-        "IMPORTANT: For domain-specific queries, delegate to specialized agents rather than using general search tools:",
-        "- For travel planning, Airbnb listings, or accommodation searches, ALWAYS delegate to the Airbnb Agent",
-        "- For LinkedIn-related queries or professional networking, delegate to the LinkedIn Agent",
-        "- For data analysis tasks, delegate to the Data Analyst agent",
-        "- For Python coding tasks, delegate to the Python Agent",
-        "- For research tasks, delegate to the Research Agent",
-        "Only if no specialized agent is available for the query, fall back to searching the knowledge base and then the internet.",
-        "If the users message is unclear, ask clarifying questions to get more information.",
-        "Based on the user request and the available team members, decide which member(s) should handle the task.",
-        "Coordinate the execution of the task among the selected team members.",
-        "Synthesize the results from the team members and provide a final, coherent answer to the user.",
-        "Do not use phrases like 'based on my knowledge' or 'depending on the information'.",
-    ]
+    instructions = HALO_INSTRUCTIONS
+    if config.parallel_delegation and len(agents) > 1:
+        tools.append(ParallelDelegationTools(member_timeout=config.member_timeout))
+        instructions = HALO_INSTRUCTIONS + HALO_PARALLEL_INSTRUCTIONS
 
-    halo = Team(
+    halo = HaloTeam(
         name="HALO Agent Interface",
         model=model,
-        user_id=config.user_id,
-        session_id=session_id,
         tools=tools,
         members=agents,
         db=halo_sessions,
         knowledge=halo_knowledge,
-        description=description,
+        description=HALO_DESCRIPTION,
         instructions=instructions,
-        respond_directly=True,  # Team can respond directly without always delegating
+        # Team can respond directly without always delegating, except when it
+        # has to synthesise the results of parallel delegation
+        respond_directly=not config.parallel_delegation,
         delegate_task_to_all_members=False,  # Don't automatically delegate to all members
         determine_input_for_members=True,  # Team determines what input each member gets
         # enable_team_history=True,
         read_team_history=True,
         # num_of_interactions_from_history=3,
+        # Older runs are folded into a rolling summary stored with the session
+        num_history_runs=HISTORY_KEEP_LAST_RUNS,
+        session_summary_manager=create_history_manager(config.model_id, halo_sessions),
+        add_session_summary_to_context=False,  # Appended after the static prompt by HaloTeam
         show_members_responses=True,
         enable_user_memories=True,  # This enables memory functionality
+        add_memories_to_context=False,  # Memories are appended after the static prompt by HaloTeam
         markdown=True,
         debug_mode=debug_mode,
     )
 
+    if config.semantic_cache:
+        halo.response_cache = get_response_cache(create_embedder())
+
     agent_names = [a.name for a in agents] if agents else []
-    logger.info(f"HALO created with members: {agent_names}")
+    logger.info(f"HALO template created with members: {agent_names}")
+    return halo
+
+
+def get_halo_template(config: HaloConfig, debug_mode: bool = True) -> Team:
+    """Return the cached HALO template for this configuration, building it once."""
+    key = _halo_template_key(config, debug_mode)
+    template = _halo_templates.get(key)
+    if template is None:
+        with _halo_templates_lock:
+            template = _halo_templates.get(key)
+            if template is None:
+                template = _build_halo_template(config, debug_mode)
+                _halo_templates[key] = template
+    return template
+
+
+def clear_halo_templates() -> None:
+    """Drop all cached HALO templates, e.g. after the knowledge or model setup changed."""
+    with _halo_templates_lock:
+        _halo_templates.clear()
+
+
+def create_halo(
+    config: HaloConfig, session_id: Optional[str] = None, debug_mode: bool = True
+) -> Team:
+    """Returns an instance of the HALO Agent Interface (HALO)
+
+    The toolkits, knowledge and databases are shared through a per-process
+    template. Runs mutate the model and the member agents (the tools and
+    functions prepared for the model, the cached session), so each call gets
+    its own copies of those and binds the session and user. The member
+    copies are handed the template's database and knowledge, which
+    ``Agent.deep_copy`` would otherwise copy.
+
+    Args:
+        config: HALO configuration
+        session_id: Session identifier
+        debug_mode: Enable debug logging
+    """
+    template = get_halo_template(config, debug_mode=debug_mode)
+
+    # Shallow copy: toolkits and knowledge are shared, model, members and session state are not
+    halo = copy.copy(template)
+    halo.model = copy.deepcopy(template.model)
+    halo.members = [
+        member.deep_copy(update={"db": member.db, "knowledge": member.knowledge})
+        for member in template.members
+    ]
+    halo.user_id = config.user_id
+    halo.session_id = session_id
+    halo.session_state = copy.deepcopy(template.session_state)
+    halo._team_session = None
+    halo.cache_scope = config.cache_scope
+    halo.halo_config = config
+
+    logger.info(f"HALO session bound: {session_id}")
     return halo
@@ -0,0 +1,281 @@
+"""
+Conversation history management for the HALO Agent Interface.
+
+Only the last few runs of a session are sent to the model verbatim. Older
+runs are folded into a rolling summary, which is updated incrementally in the
+background and stored with the session in ``halo_sessions.db``. Oversized tool
+results in stored runs are compacted, so per-turn input stays bounded no
+matter how long a session gets.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from textwrap import dedent
+from typing import Any, Iterable, List, Optional, Set
+
+from agno.db.base import BaseDb
+from agno.models.message import Message
+from agno.run.base import RunStatus
+from agno.session.summary import SessionSummary, SessionSummaryManager
+from agno.utils.log import log_debug, logger
+
+from accounting import record_call, usage_context
+from models import create_model
+from router import triage_model_id
+from tools.tool_outputs import find_tool_output_handle
+
+# Runs sent verbatim; everything older is only available through the summary
+HISTORY_KEEP_LAST_RUNS = 3
+# Tool results longer than this are replaced by a short reference once stored
+MAX_TOOL_RESULT_CHARS = 2000
+# Model that folds old runs into the rolling summary; unset, it follows the team's provider
+HISTORY_SUMMARY_MODEL = os.getenv("HALO_SUMMARY_MODEL")
+
+# Key in the session_data of a session holding the summary bookkeeping
+SUMMARY_STATE_KEY = "history_summary"
+
+# One background worker is plenty: summaries are small, rare and not urgent
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-summary")
+
+
+def _compact_message(message: Message, max_chars: int) -> bool:
+    if message.role != "tool" or not isinstance(message.content, str):
+        return False
+    if len(message.content) <= max_chars:
+        return False
+    head = message.content[: max_chars // 4].rstrip()
+    handle = find_tool_output_handle(message.content)
+    message.content = (
+        f"[Result of {message.tool_name or 'tool'} compacted: "
+        f"{len(message.content)} characters, first part shown]\n{head}\n[...]"
+    )
+    if handle is not None:
+        # Keep the way back to the full result stored by the tool-output gateway
+        message.content += f"\n[Full output stored as tool_output:{handle}]"
+    return True
+
+
+def compact_tool_results(runs: Optional[Iterable[Any]], max_chars: int = MAX_TOOL_RESULT_CHARS) -> int:
+    """Shorten oversized tool results in stored runs, including member runs.
+
+    Args:
+        runs: Runs of a session
+        max_chars: Tool results longer than this are compacted
+
+    Returns:
+        int: Number of compacted tool results
+    """
+    compacted = 0
+    for run in runs or []:
+        for message in getattr(run, "messages", None) or []:
+            compacted += _compact_message(message, max_chars)
+        # Team runs keep the responses of their members as well
+        compacted += compact_tool_results(getattr(run, "member_responses", None), max_chars)
+    return compacted
+
+
+def get_summary_state(session: Any) -> dict:
+    """Return the summary bookkeeping stored in the session data."""
+    return dict((session.session_data or {}).get(SUMMARY_STATE_KEY) or {})
+
+
+def _main_runs(session: Any) -> List[Any]:
+    # Member runs are covered by the team run that started them
+    return [
+        run
+        for run in session.runs or []
+        if getattr(run, "parent_run_id", None) is None
+        and getattr(run, "status", None) == RunStatus.completed
+    ]
+
+
+def _run_text(run: Any, role: str) -> Optional[str]:
+    messages = [m for m in run.messages or [] if not m.from_history]
+    if role != "user":
+        messages = messages[::-1]
+    for message in messages:
+        if message.role == role and isinstance(message.content, str):
+            return message.content
+    return None
+
+
+@dataclass
+class RollingSummaryManager(SessionSummaryManager):
+    """Session summary manager that folds old runs into a rolling summary.
+
+    After each run, tool results are compacted and every run that has dropped
+    out of the last ``keep_last_runs`` is folded into the existing summary by a
+    background job. The run itself never waits for the summary.
+    """
+
+    db: Optional[BaseDb] = None
+    keep_last_runs: int = HISTORY_KEEP_LAST_RUNS
+    max_tool_result_chars: int = MAX_TOOL_RESULT_CHARS
+    # Each turn is cut to this length before it is summarised
+    max_turn_chars: int = 4000
+
+    _in_flight: Set[str] = field(default_factory=set, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def pending_runs(self, session: Any) -> List[Any]:
+        """Runs that left the verbatim window but are not in the summary yet."""
+        runs = _main_runs(session)
+        older = runs[: max(len(runs) - self.keep_last_runs, 0)]
+        last_run_id = get_summary_state(session).get("last_run_id")
+        for position, run in enumerate(older):
+            if run.run_id == last_run_id:
+                return older[position + 1 :]
+        return older
+
+    def create_session_summary(self, session: Any) -> Optional[SessionSummary]:
+        """Compact the session and schedule a summary update if runs are pending."""
+        if session is None:
+            return None
+        compacted = compact_tool_results(session.runs, self.max_tool_result_chars)
+        if compacted:
+            log_debug(f"Compacted {compacted} tool results in session {session.session_id}")
+
+        pending = self.pending_runs(session)
+        if pending and self.model is not None:
+            with self._lock:
+                if session.session_id in self._in_flight:
+                    return session.summary
+                self._in_flight.add(session.session_id)
+            _summary_executor.submit(self._update_summary, session, pending)
+        return session.summary
+
+    async def acreate_session_summary(self, session: Any) -> Optional[SessionSummary]:
+        return self.create_session_summary(session)
+
+    def _format_turns(self, runs: List[Any]) -> str:
+        turns = []
+        for run in runs:
+            for role, label in (("user", "User"), ("assistant", "Assistant")):
+                text = _run_text(run, role)
+                if text:
+                    turns.append(f"{label}: {text[: self.max_turn_chars]}")
+        return "\n".join(turns)
+
+    def _get_summary_messages(self, previous: Optional[SessionSummary], runs: List[Any]) -> List[Message]:
+        system_prompt = dedent("""\
+        You maintain a running summary of a conversation between a user and an assistant.
+        Update the existing summary with the new turns below and return the full updated summary and its topics.
+        Keep everything that matters for future turns: facts about the user, findings, decisions and open questions.
+        Be concise and do not make anything up.
+        """)
+        system_prompt += "\n<existing_summary>\n"
+        system_prompt += previous.summary if previous is not None else "(none yet)"
+        system_prompt += "\n</existing_summary>\n\n<new_turns>\n"
+        system_prompt += self._format_turns(runs)
+        system_prompt += "\n</new_turns>"
+        return [
+            Message(role="system", content=system_prompt),
+            Message(role="user", content="Provide the updated summary of the conversation."),
+        ]
+
+    def _update_summary(self, session: Any, runs: List[Any]) -> None:
+        try:
+            response_format = self.get_response_format(self.model)
+            start = time.monotonic()
+            response = self.model.response(
+                messages=self._get_summary_messages(session.summary, runs),
+                response_format=response_format,
+            )
+            usage = response.response_usage
+            with usage_context(session_id=session.session_id, user_id=getattr(session, "user_id", None)):
+                record_call(
+                    "model",
+                    name="history_summary",
+                    model=self.model.id,
+                    duration=time.monotonic() - start,
+                    input_tokens=getattr(usage, "input_tokens", 0) or 0,
+                    output_tokens=getattr(usage, "output_tokens", 0) or 0,
+                    cached_tokens=getattr(usage, "cache_read_tokens", 0) or 0,
+                )
+            summary = self._process_summary_response(response, self.model)
+            if summary is None:
+                return
+
+            state = {
+                "last_run_id": runs[-1].run_id,
+                "summarised_runs": get_summary_state(session).get("summarised_runs", 0) + len(runs),
+                "updated_at": datetime.now().isoformat(),
+            }
+            # Replace rather than mutate, so a concurrent save never sees a half-updated dict
+            session.session_data = {**(session.session_data or {}), SUMMARY_STATE_KEY: state}
+            session.summary = summary
+            self.summaries_updated = True
+            self._store(session.session_id, summary, state)
+            log_debug(f"Folded {len(runs)} runs into the summary of session {session.session_id}")
+        except Exception as e:
+            logger.warning(f"Could not update history summary: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.discard(session.session_id)
+
+    def _store(self, session_id: str, summary: SessionSummary, state: dict) -> None:
+        """Write only the summary fields, so runs saved in the meantime are kept."""
+        if self.db is None or not hasattr(self.db, "Session"):
+            return
+        from sqlalchemy import select, update
+
+        table = self.db._get_table(table_type="sessions")
+        if table is None:
+            return
+        with self.db.Session() as sess, sess.begin():
+            session_data = sess.execute(
+                select(table.c.session_data).where(table.c.session_id == session_id)
+            ).scalar()
+            # agno stores its JSON columns as serialized strings
+            if isinstance(session_data, str):
+                session_data = json.loads(session_data)
+            session_data = {**(session_data or {}), SUMMARY_STATE_KEY: state}
+            sess.execute(
+                update(table)
+                .where(table.c.session_id == session_id)
+                .values(
+                    summary=json.dumps(summary.to_dict()),
+                    session_data=json.dumps(session_data),
+                )
+            )
+
+
+def summary_model_id(team_model_id: str) -> str:
+    """Model that summarises the history of a team running on ``team_model_id``.
+
+    ``HALO_SUMMARY_MODEL`` wins if set. Otherwise the cheap triage model is
+    used if it belongs to the team's provider, else the team's own model, so
+    offline and mock teams never call another provider.
+    """
+    if HISTORY_SUMMARY_MODEL:
+        return HISTORY_SUMMARY_MODEL
+    triage_model = triage_model_id()
+    if triage_model.split(":")[0] == team_model_id.split(":")[0]:
+        return triage_model
+    return team_model_id
+
+
+def create_history_manager(team_model_id: str, db: Optional[BaseDb] = None) -> RollingSummaryManager:
+    """Create the history manager used by the HALO team and its agents.
+
+    Args:
+        team_model_id: Model of the team, which decides the summary model
+        db: Session database the rolling summary is stored in
+    """
+    return RollingSummaryManager(model=create_model(summary_model_id(team_model_id)), db=db)
+
+
+def format_summary(summary: Optional[SessionSummary]) -> Optional[str]:
+    """Render a rolling summary for the dynamic part of a system message."""
+    if summary is None or not summary.summary:
+        return None
+    return (
+        "Here is a summary of the earlier part of this conversation:\n\n"
+        f"<summary_of_previous_interactions>\n{summary.summary}\n</summary_of_previous_interactions>\n\n"
+        "Note: prefer information from the recent messages over this summary."
+    )
@@ -0,0 +1,327 @@
+"""
+Batched embedding pipeline for knowledge ingestion.
+
+Large documents produce thousands of chunks. Instead of one embedding call
+per chunk, chunks are grouped into token-bounded batches and several batches
+are embedded concurrently. All ingestion shares one rate limiter, and the
+batch size adapts to the observed latency and to rate limit responses.
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from agno.knowledge.document import Document
+from agno.knowledge.embedder.base import Embedder
+from agno.knowledge.embedder.openai import OpenAIEmbedder
+from agno.utils.log import log_debug, logger
+
+from accounting import record_call
+from embedding_cache import CachedEmbedder, chunk_hash
+from local_embedder import OnnxEmbedder
+
+# Batches embedded at the same time
+DEFAULT_CONCURRENCY = int(os.getenv("HALO_EMBEDDING_CONCURRENCY", "4"))
+# Limits of the embedding API shared by all ingestion threads
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("HALO_EMBEDDING_RPM", "3000"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("HALO_EMBEDDING_TPM", "1000000"))
+
+# The OpenAI embeddings endpoint accepts at most 2048 inputs per request
+MAX_BATCH_TEXTS = 2048
+# Timeout of one batch request; far longer than the query embedding timeout
+BATCH_TIMEOUT = 120.0
+
+
+def estimate_tokens(text: str) -> int:
+    # Close enough to BPE token counts for English text
+    return len(text) // 4 + 1
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute.
+
+    Args:
+        requests_per_minute: Requests allowed per minute
+        tokens_per_minute: Tokens allowed per minute
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int) -> None:
+        """Block until one request with this many tokens may be sent."""
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait_for = max(
+                    self._paused_until - now,
+                    (1 - self._requests) * 60 / self.requests_per_minute,
+                    (tokens - self._tokens) * 60 / self.tokens_per_minute,
+                )
+            time.sleep(min(max(wait_for, 0.01), 5.0))
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests, e.g. after the API answered with 429."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class AdaptiveBatchSize:
+    """Token budget of a batch that follows latency and rate limits.
+
+    Grows while batches finish faster than the target latency, shrinks when
+    they get slow and halves on rate limits and errors.
+    """
+
+    def __init__(
+        self,
+        initial_tokens: int = 8_000,
+        min_tokens: int = 100,
+        max_tokens: int = 250_000,
+        target_latency: float = 3.0,
+    ):
+        self.tokens = initial_tokens
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self.target_latency = target_latency
+        self._lock = threading.Lock()
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            if latency < self.target_latency:
+                self.tokens = min(self.max_tokens, int(self.tokens * 1.5))
+            elif latency > 2 * self.target_latency:
+                self.tokens = max(self.min_tokens, int(self.tokens * 0.75))
+
+    def on_failure(self) -> None:
+        with self._lock:
+            self.tokens = max(self.min_tokens, self.tokens // 2)
+
+
+# Shared by all ingestion of the process, so concurrent loads respect one limit
+embedding_rate_limiter = RateLimiter(EMBEDDING_REQUESTS_PER_MINUTE, EMBEDDING_TOKENS_PER_MINUTE)
+
+# Learned batch sizes per embedder, kept across files and syncs
+_batch_sizes: Dict[str, AdaptiveBatchSize] = {}
+_batch_sizes_lock = threading.Lock()
+
+
+def get_batch_size(embedder_id: str) -> AdaptiveBatchSize:
+    with _batch_sizes_lock:
+        if embedder_id not in _batch_sizes:
+            _batch_sizes[embedder_id] = AdaptiveBatchSize()
+        return _batch_sizes[embedder_id]
+
+
+def unwrap_embedder(embedder: Embedder) -> Tuple[Embedder, Optional[CachedEmbedder]]:
+    """Return the provider embedder below the wrappers and the caching layer, if any."""
+    cached = None
+    while True:
+        if isinstance(embedder, CachedEmbedder):
+            cached = embedder
+        inner = embedder.__dict__.get("embedder")
+        if not isinstance(inner, Embedder):
+            return embedder, cached
+        embedder = inner
+
+
+def embedder_signature(embedder: Embedder) -> Dict[str, Any]:
+    """Identity and vector size of the provider embedder below the caching and hedging wrappers."""
+    base, _ = unwrap_embedder(embedder)
+    return {"id": f"{type(base).__name__}:{base.id}", "dimensions": base.dimensions}
+
+
+def _embed_batch(embedder: Embedder, texts: List[str]) -> Tuple[List[List[float]], int]:
+    """Embed texts in one request where the provider supports it. Errors are raised."""
+    if isinstance(embedder, OpenAIEmbedder):
+        request = {"input": texts, "model": embedder.id, "encoding_format": "float"}
+        if embedder.user is not None:
+            request["user"] = embedder.user
+        if embedder.id.startswith("text-embedding-3"):
+            request["dimensions"] = embedder.dimensions
+        if embedder.request_params:
+            request.update(embedder.request_params)
+        response = embedder.client.with_options(timeout=BATCH_TIMEOUT).embeddings.create(**request)
+        return [data.embedding for data in response.data], response.usage.prompt_tokens
+    if isinstance(embedder, OnnxEmbedder):
+        return embedder.get_embeddings_batch(texts), 0
+    vectors, tokens = [], 0
+    for text in texts:
+        vector, usage = embedder.get_embedding_and_usage(text)
+        vectors.append(vector)
+        tokens += (usage or {}).get("prompt_tokens", 0) or 0
+    return vectors, tokens
+
+
+class EmbeddingPipeline:
+    """Embeds many texts in concurrent, token-bounded batches.
+
+    Texts already in the embedding cache are not sent again, and new vectors
+    are added to it.
+
+    Args:
+        embedder: Embedder of the vector db, possibly wrapped
+        concurrency: Batches in flight at the same time
+        rate_limiter: Limiter shared with other ingestion
+        max_retries: Attempts per text before ingestion fails
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate_limiter: RateLimiter = embedding_rate_limiter,
+        max_retries: int = 5,
+    ):
+        self.embedder, self.cached = unwrap_embedder(embedder)
+        # A local embedder runs its batches on its own thread pool, one per core
+        self.concurrency = 1 if isinstance(self.embedder, OnnxEmbedder) else max(concurrency, 1)
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.batch_size = get_batch_size(self.embedder.id)
+
+    def _next_batch(self, queue: Deque[int], tokens: List[int]) -> List[int]:
+        batch, batch_tokens = [], 0
+        while queue and len(batch) < MAX_BATCH_TEXTS:
+            if batch and batch_tokens + tokens[queue[0]] > self.batch_size.tokens:
+                break
+            index = queue.popleft()
+            batch.append(index)
+            batch_tokens += tokens[index]
+        return batch
+
+    def _call(self, texts: List[str], tokens: int) -> List[List[float]]:
+        if not isinstance(self.embedder, OnnxEmbedder):
+            self.rate_limiter.acquire(tokens)
+        start = time.monotonic()
+        try:
+            vectors, used_tokens = _embed_batch(self.embedder, texts)
+        except Exception:
+            record_call(
+                "embedding",
+                name="ingestion",
+                model=self.embedder.id,
+                duration=time.monotonic() - start,
+                error=True,
+            )
+            raise
+        latency = time.monotonic() - start
+        self.batch_size.on_success(latency)
+        record_call(
+            "embedding",
+            name="ingestion",
+            model=self.embedder.id,
+            duration=latency,
+            input_tokens=used_tokens,
+        )
+        if len(vectors) != len(texts) or not all(vectors):
+            raise ValueError(f"Embedding batch returned {len(vectors)} vectors for {len(texts)} texts")
+        return vectors
+
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        tokens = [estimate_tokens(text) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        attempts = [0] * len(texts)
+        queue: Deque[int] = deque(range(len(texts)))
+        in_flight: Dict[Future, List[int]] = {}
+
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="embedding-batch") as pool:
+            while queue or in_flight:
+                while queue and len(in_flight) < self.concurrency:
+                    batch = self._next_batch(queue, tokens)
+                    future = pool.submit(
+                        copy_context().run,
+                        self._call,
+                        [texts[index] for index in batch],
+                        sum(tokens[index] for index in batch),
+                    )
+                    in_flight[future] = batch
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        for index, vector in zip(batch, future.result()):
+                            results[index] = vector
+                        continue
+
+                    self.batch_size.on_failure()
+                    for index in batch:
+                        attempts[index] += 1
+                    if max(attempts[index] for index in batch) > self.max_retries:
+                        queue.clear()
+                        raise error
+                    backoff = min(2 ** attempts[batch[0]], 30) + random.random()
+                    if is_rate_limit_error(error):
+                        # Everyone backs off, not just this batch
+                        self.rate_limiter.pause(_retry_after(error) or backoff)
+                        logger.warning(f"Embedding rate limited, batch size now {self.batch_size.tokens} tokens")
+                    else:
+                        logger.warning(f"Embedding batch of {len(batch)} texts failed, retrying: {error}")
+                        time.sleep(backoff)
+                    # Retried first, in smaller batches
+                    queue.extendleft(reversed(batch))
+        return results
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return the embeddings of texts, in order."""
+        hashes = [chunk_hash(text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        if self.cached is not None:
+            found = self.cached.cache.get_many(*self.cached.cache_key, hashes)
+
+        # Each missing text is embedded once, even if it occurs several times
+        missing = {text_hash: text for text_hash, text in zip(hashes, texts) if text_hash not in found}
+        if missing:
+            start = time.monotonic()
+            new = list(zip(missing, self._embed_uncached(list(missing.values()))))
+            if self.cached is not None:
+                self.cached.cache.put_many(*self.cached.cache_key, new)
+            found.update(new)
+            log_debug(
+                f"Embedded {len(missing)} texts in {time.monotonic() - start:.1f}s "
+                f"({len(texts) - len(missing)} cached, batch size {self.batch_size.tokens} tokens)"
+            )
+        return [found[text_hash] for text_hash in hashes]
+
+    def embed_documents(self, documents: List[Document]) -> None:
+        """Set the embedding of each document."""
+        vectors = self.embed([document.content for document in documents])
+        for document, vector in zip(documents, vectors):
+            document.embedding = vector
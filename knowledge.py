@@ -2,24 +2,146 @@
 Custom knowledge implementation for the HALO Agent Interface
 """
 
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from hashlib import md5
 from pathlib import Path
-from typing import Iterator, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from agno.knowledge.document import Document
 from agno.knowledge.reader.text_reader import TextReader
 from agno.knowledge.knowledge import Knowledge
-from agno.utils.log import logger
+from agno.utils.log import log_debug, logger
+
+from chunking import chunking_signature
+from ingestion import EmbeddingPipeline, embedder_signature
+from parsing import STREAM_PDF_MIN_PAGES, SUPPORTED_FORMATS, DocumentParser, pdf_page_count
+from reranking import KnowledgeReranker
+
+# Manifest entries are written to disk after this many changed files
+MANIFEST_CHECKPOINT_EVERY = 50
+# Rows per append to the vector table
+INSERT_BATCH_ROWS = 5000
+
+
+def _file_sha256(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Layout of the rows and payloads of the vector table; see knowledge_schema.py
+SCHEMA_VERSION = 2
+
+# Use a user-specific directory for knowledge to avoid permission issues
+KNOWLEDGE_PATH = Path(os.path.join(os.path.expanduser("~"), "halo_knowledge"))
+KNOWLEDGE_TABLE = "halo_knowledge"
+
+
+def row_id(content: str) -> str:
+    """Id of the row of a chunk: the same LanceDb derives, so chunks can be deleted by id."""
+    return md5(content.replace("\x00", "\ufffd").encode()).hexdigest()
+
+
+def _chunk_id(document: Document) -> str:
+    return row_id(document.content)
+
+
+class KnowledgeManifest:
+    """Record of the knowledge files that are embedded and the chunks they produced.
+
+    Stored as JSON beside the vector table. Each entry maps a file name to its
+    size, mtime, content hash, chunking configuration and chunk ids. Streamed files that are not
+    completely embedded yet are kept in ``partial`` with the pages done so far. ``embedder``
+    records the embedder of the table, so vectors of different models are never mixed, and
+    ``schema_version`` the layout of its rows.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.partial: Dict[str, Dict[str, Any]] = {}
+        self.embedder: Optional[Dict[str, Any]] = None
+        self.schema_version: Optional[int] = None
+        if self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self.files = data.get("files", {})
+                self.partial = data.get("partial", {})
+                self.embedder = data.get("embedder")
+                self.schema_version = data.get("schema_version")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable knowledge manifest {self.path}: {e}")
+
+    def save(self) -> None:
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    "version": 1,
+                    "schema_version": self.schema_version,
+                    "embedder": self.embedder,
+                    "files": self.files,
+                    "partial": self.partial,
+                }
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        self.files = {}
+        self.partial = {}
+        self.embedder = None
+        self.schema_version = None
+        if self.path.exists():
+            self.path.unlink()
+
+    def chunk_refs(self, exclude: Optional[str] = None) -> set:
+        """Chunk ids referenced by all files except ``exclude``."""
+        return {
+            chunk_id
+            for entries in (self.files, self.partial)
+            for name, entry in entries.items()
+            if name != exclude
+            for chunk_id in entry.get("chunk_ids", [])
+        }
+
+
+@dataclass
+class SyncReport:
+    added: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    failed: List[str] = field(default_factory=list)
+    # Index maintenance done after the sync, e.g. ["fts", "optimize"]
+    index_actions: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.updated or self.removed)
 
 
 class HaloKnowledge(Knowledge):
     """Custom knowledge implementation for the HALO Agent Interface."""
 
     knowledge_dir: Optional[Path] = None
-    formats: List[str] = [".txt", ".md"]
+    formats: List[str] = SUPPORTED_FORMATS
     reader: TextReader = TextReader()
+    # Narrows over-fetched search candidates to max_results; None returns search results as they are
+    reranker: Optional[KnowledgeReranker] = None
 
-    def __init__(self, **kwargs):
+    def __init__(self, reranker: Optional[KnowledgeReranker] = None, **kwargs):
         super().__init__(**kwargs)
+        self.reranker = reranker
         # Always set a knowledge directory
         if "uri" in kwargs:
             self.knowledge_dir = Path(kwargs["uri"]).parent / "knowledge_docs"
@@ -33,23 +155,467 @@ class HaloKnowledge(Knowledge):
 
     @property
     def document_lists(self) -> Iterator[List[Document]]:
-        """Iterate over knowledge documents and yield lists of documents."""
+        """Iterate over knowledge documents and yield lists of documents.
+
+        Files are parsed in worker processes and yielded as they complete.
+        """
         if not self.knowledge_dir or not self.knowledge_dir.exists():
             logger.warning(f"Knowledge directory does not exist: {self.knowledge_dir}")
             return
 
-        # Process all supported files in the knowledge directory
-        for file_format in self.formats:
-            for file_path in self.knowledge_dir.glob(f"*{file_format}"):
-                try:
-                    logger.info(f"Reading knowledge document: {file_path}")
-                    documents = self.reader.read(file=file_path)
-                    if documents:
-                        yield documents
-                    else:
-                        logger.warning(f"No documents were read from file: {file_path}")
-                except Exception as e:
-                    logger.exception(f"Failed to read document {file_path}: {e}")
+        for file_path, documents, error in DocumentParser().parse(self._knowledge_files()):
+            if error is not None:
+                logger.error(f"Failed to read document {file_path}: {error}")
+            elif documents:
+                yield documents
+            else:
+                logger.warning(f"No documents were read from file: {file_path}")
+
+    def _knowledge_files(self) -> List[Path]:
+        if not self.knowledge_dir or not self.knowledge_dir.exists():
+            return []
+        return sorted(
+            file_path
+            for file_format in self.formats
+            for file_path in self.knowledge_dir.glob(f"*{file_format}")
+        )
+
+    @property
+    def manifest_path(self) -> Path:
+        table_name = getattr(self.vector_db, "table_name", None) or "knowledge"
+        uri = getattr(self.vector_db, "uri", None)
+        base = Path(uri) if uri else self.knowledge_dir
+        return base / f"{table_name}.manifest.json"
+
+    def _open_manifest(self) -> KnowledgeManifest:
+        """Create the table if needed and load its manifest.
+
+        Raises:
+            ValueError: If the table holds vectors of another embedder
+        """
+        created = not self.vector_db.exists()
+        self.vector_db.create()
+        manifest = KnowledgeManifest(self.manifest_path)
+        table = self.vector_db.table
+        if manifest.schema_version is None and not manifest.files and not manifest.partial:
+            # LanceDb creates missing tables when opened: an empty table of the current layout is new
+            created = created or (
+                table is not None
+                and table.schema.names == [self.vector_db._vector_col, self.vector_db._id, "payload"]
+                and table.count_rows() == 0
+            )
+        if created:
+            manifest.schema_version = SCHEMA_VERSION
+        current = embedder_signature(self.vector_db.embedder)
+        table_dimensions = (
+            table.schema.field(self.vector_db._vector_col).type.list_size if table is not None else None
+        )
+        # Tables from before embedders were recorded are accepted if the dimensions match
+        if (manifest.embedder and manifest.embedder != current) or (
+            table_dimensions and table_dimensions != current["dimensions"]
+        ):
+            embedded_with = (manifest.embedder or {}).get("id", f"{table_dimensions}-dimensional vectors")
+            raise ValueError(
+                f"Knowledge table {self.vector_db.table_name} was embedded with {embedded_with}, "
+                f"not {current['id']}; re-embed it with `python load_knowledge.py --migrate`"
+            )
+        manifest.embedder = current
+        return manifest
+
+    def _delete_chunks(self, chunk_ids: List[str]) -> int:
+        table = getattr(self.vector_db, "table", None)
+        if not chunk_ids or table is None:
+            return 0
+        for start in range(0, len(chunk_ids), 500):
+            ids = ", ".join(f"'{chunk_id}'" for chunk_id in chunk_ids[start : start + 500])
+            table.delete(f"id IN ({ids})")
+        return len(chunk_ids)
+
+    def _existing_chunk_ids(self, chunk_ids: List[str]) -> set:
+        table = self.vector_db.table
+        existing = set()
+        for start in range(0, len(chunk_ids), 500):
+            batch = chunk_ids[start : start + 500]
+            ids = ", ".join(f"'{chunk_id}'" for chunk_id in batch)
+            rows = table.search().where(f"id IN ({ids})").select(["id"]).limit(len(batch)).to_list()
+            existing.update(row["id"] for row in rows)
+        return existing
+
+    def _insert_documents(self, content_hash: str, documents: List[Document]) -> int:
+        """Embed new chunks in concurrent batches and append them to the table at once.
+
+        Returns:
+            int: Number of rows written
+        """
+        if self.vector_db.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return 0
+        existing = self._existing_chunk_ids([_chunk_id(document) for document in documents])
+        new: Dict[str, Document] = {}
+        for document in documents:
+            chunk_id = _chunk_id(document)
+            if chunk_id not in existing and chunk_id not in new:
+                new[chunk_id] = document
+        if not new:
+            return 0
+
+        EmbeddingPipeline(self.vector_db.embedder).embed_documents(list(new.values()))
+        rows = [
+            {
+                "id": chunk_id,
+                "vector": self.vector_db._prepare_vector(document.embedding),
+                "payload": json.dumps(
+                    {
+                        "name": document.name,
+                        "meta_data": document.meta_data,
+                        "content": document.content.replace("\x00", "\ufffd"),
+                        "usage": document.usage,
+                        "content_id": document.content_id,
+                        "content_hash": content_hash,
+                    }
+                ),
+            }
+            for chunk_id, document in new.items()
+        ]
+        # Same row layout as LanceDb.insert, written in a few large appends
+        for start in range(0, len(rows), INSERT_BATCH_ROWS):
+            batch = rows[start : start + INSERT_BATCH_ROWS]
+            if self.vector_db.on_bad_vectors is not None:
+                self.vector_db.table.add(
+                    batch,
+                    on_bad_vectors=self.vector_db.on_bad_vectors,
+                    fill_value=self.vector_db.fill_value,
+                )
+            else:
+                self.vector_db.table.add(batch)
+        log_debug(f"Inserted {len(rows)} of {len(documents)} chunks")
+        return len(rows)
+
+    def _check_file(
+        self,
+        manifest: KnowledgeManifest,
+        file_path: Path,
+        report: SyncReport,
+        metadata: Optional[dict] = None,
+    ) -> Tuple[bool, Optional[str]]:
+        """Compare a file with its manifest entry.
+
+        Returns:
+            Whether the manifest entry was updated, and the content hash if the
+            file is new or changed and has to be parsed
+        """
+        stat = file_path.stat()
+        entry = manifest.files.get(file_path.name)
+        if metadata is None and entry is not None:
+            metadata = entry.get("meta_data")
+        # A file is chunked again when its chunking configuration changed
+        same_chunking = (
+            entry is not None
+            and entry.get("meta_data") == metadata
+            and entry.get("chunking") == chunking_signature(file_path.suffix)
+        )
+        if same_chunking and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            report.unchanged += 1
+            return False, None
+
+        content_hash = _file_sha256(file_path)
+        if same_chunking and entry["sha256"] == content_hash:
+            # Touched but not changed
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            report.unchanged += 1
+            return True, None
+        return False, content_hash
+
+    def _store_file(
+        self,
+        manifest: KnowledgeManifest,
+        file_path: Path,
+        content_hash: str,
+        documents: List[Document],
+        report: SyncReport,
+        metadata: Optional[dict] = None,
+    ) -> None:
+        """Replace the chunks of a parsed file in the table and the manifest."""
+        name = file_path.name
+        stat = file_path.stat()
+        entry = manifest.files.get(name)
+        if metadata is None and entry is not None:
+            metadata = entry.get("meta_data")
+        if not documents:
+            logger.warning(f"No documents were read from file: {file_path}")
+        if metadata:
+            for document in documents:
+                document.meta_data.update(metadata)
+
+        chunk_ids = list(dict.fromkeys(_chunk_id(document) for document in documents))
+        reused = set()
+        if entry:
+            # Chunks that other files share are kept, and so are unchanged chunks
+            # of this file unless its metadata (stored in the rows) changed
+            if entry.get("meta_data") == metadata:
+                reused = set(entry["chunk_ids"]) & set(chunk_ids)
+            keep = manifest.chunk_refs(exclude=name) | reused
+            report.chunks_removed += self._delete_chunks(
+                [chunk_id for chunk_id in entry["chunk_ids"] if chunk_id not in keep]
+            )
+        if documents:
+            # Rows that still exist are skipped, so only new chunks are embedded
+            self._insert_documents(content_hash, documents)
+        (report.updated if entry else report.added).append(name)
+        report.chunks_added += len(chunk_ids) - len(reused)
+        manifest.files[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": content_hash,
+            "chunk_ids": chunk_ids,
+            "meta_data": metadata,
+            "chunking": chunking_signature(file_path.suffix),
+        }
+
+    def _stream_pdf(
+        self,
+        manifest: KnowledgeManifest,
+        parser: DocumentParser,
+        file_path: Path,
+        content_hash: str,
+        pages: int,
+        report: SyncReport,
+        metadata: Optional[dict] = None,
+    ) -> None:
+        """Embed a large PDF window by window, resuming where an earlier run stopped.
+
+        Progress is written to the manifest after every window, so at most one
+        window is embedded again after a crash.
+        """
+        name = file_path.name
+        entry = manifest.files.get(name)
+        partial = manifest.partial.get(name)
+        existed = entry is not None
+        if metadata is None:
+            metadata = (entry or partial or {}).get("meta_data")
+        if entry and entry.get("meta_data") != metadata:
+            # Rows carry the metadata and unchanged chunks keep their ids: drop
+            # them first, and the entry with them, so a crash embeds the file again
+            keep = manifest.chunk_refs(exclude=name)
+            report.chunks_removed += self._delete_chunks(
+                [chunk_id for chunk_id in entry["chunk_ids"] if chunk_id not in keep]
+            )
+            entry = manifest.files.pop(name)
+            entry["chunk_ids"] = []
+        if partial is not None and (partial["sha256"] != content_hash or partial.get("meta_data") != metadata):
+            # The file changed since the interrupted run; its chunks are stale
+            stale = manifest.partial.pop(name)
+            keep = manifest.chunk_refs()
+            report.chunks_removed += self._delete_chunks(
+                [chunk_id for chunk_id in stale["chunk_ids"] if chunk_id not in keep]
+            )
+            partial = None
+        if partial is None:
+            partial = {"sha256": content_hash, "pages_done": 0, "chunk_ids": [], "meta_data": metadata}
+        elif partial["pages_done"]:
+            logger.info(f"Resuming {name} at page {partial['pages_done'] + 1} of {pages}")
+
+        chunk_ids = dict.fromkeys(partial["chunk_ids"])
+        for pages_done, documents in parser.iter_pdf_pages(file_path, start=partial["pages_done"], pages=pages):
+            if metadata:
+                for document in documents:
+                    document.meta_data.update(metadata)
+            self._insert_documents(content_hash, documents)
+            chunk_ids.update(dict.fromkeys(_chunk_id(document) for document in documents))
+            partial.update(pages_done=pages_done, chunk_ids=list(chunk_ids))
+            manifest.partial[name] = partial
+            manifest.save()
+            log_debug(f"Streamed {name}: {pages_done} of {pages} pages")
+
+        # Old chunks stay searchable until the new version is complete
+        if entry:
+            keep = manifest.chunk_refs(exclude=name) | set(chunk_ids)
+            report.chunks_removed += self._delete_chunks(
+                [chunk_id for chunk_id in entry["chunk_ids"] if chunk_id not in keep]
+            )
+        (report.updated if existed else report.added).append(name)
+        report.chunks_added += len(set(chunk_ids) - set(entry["chunk_ids"] if entry else ()))
+        stat = file_path.stat()
+        manifest.files[name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": content_hash,
+            "chunk_ids": list(chunk_ids),
+            "meta_data": metadata,
+            "chunking": chunking_signature(file_path.suffix),
+        }
+        manifest.partial.pop(name, None)
+
+    def _sync_files(
+        self,
+        manifest: KnowledgeManifest,
+        files: List[Path],
+        report: SyncReport,
+        metadata: Optional[dict] = None,
+    ) -> None:
+        """Parse new and changed files in worker processes and store each as soon as it is parsed."""
+        pending_checkpoint = 0
+
+        def checkpoint() -> None:
+            nonlocal pending_checkpoint
+            pending_checkpoint += 1
+            if pending_checkpoint >= MANIFEST_CHECKPOINT_EVERY:
+                manifest.save()
+                pending_checkpoint = 0
+
+        to_parse: Dict[Path, str] = {}
+        for file_path in files:
+            try:
+                touched, content_hash = self._check_file(manifest, file_path, report, metadata)
+            except OSError as e:
+                logger.error(f"Failed to check document {file_path}: {e}")
+                report.failed.append(file_path.name)
+                continue
+            if touched:
+                checkpoint()
+            if content_hash is not None:
+                to_parse[file_path] = content_hash
+
+        parser = DocumentParser()
+        for file_path in [path for path in to_parse if path.suffix.lower() == ".pdf"]:
+            try:
+                pages = pdf_page_count(file_path)
+            except Exception:
+                # Left to the parser, which reports the error
+                continue
+            if pages < STREAM_PDF_MIN_PAGES:
+                continue
+            content_hash = to_parse.pop(file_path)
+            try:
+                self._stream_pdf(manifest, parser, file_path, content_hash, pages, report, metadata)
+            except Exception as e:
+                logger.exception(f"Failed to sync document {file_path}: {e}")
+                report.failed.append(file_path.name)
+                continue
+            checkpoint()
+
+        for file_path, documents, error in parser.parse(to_parse):
+            if error is not None:
+                logger.error(f"Failed to parse document {file_path}: {error}")
+                report.failed.append(file_path.name)
+                continue
+            logger.info(f"Syncing knowledge document: {file_path}")
+            try:
+                self._store_file(manifest, file_path, to_parse[file_path], documents, report, metadata)
+            except Exception as e:
+                logger.exception(f"Failed to sync document {file_path}: {e}")
+                report.failed.append(file_path.name)
+                continue
+            checkpoint()
+
+    def sync(self, recreate: bool = False) -> SyncReport:
+        """Bring the vector table in line with the knowledge directory.
+
+        Only new or changed files are read and embedded; chunks of changed and
+        removed files are deleted. Files whose size and mtime are unchanged are
+        not even hashed, so a sync without changes only costs a directory scan.
+
+        Args:
+            recreate: Drop the table and embed every file again
+
+        Returns:
+            SyncReport: What was added, updated and removed
+        """
+        if recreate:
+            self.vector_db.drop()
+            KnowledgeManifest(self.manifest_path).clear()
+        manifest = self._open_manifest()
+
+        report = SyncReport()
+        files = self._knowledge_files()
+        self._sync_files(manifest, files, report)
+
+        present = {file_path.name for file_path in files}
+        for name in sorted(set(manifest.partial) - present):
+            # Interrupted ingest of a file that is gone
+            entry = manifest.partial.pop(name)
+            keep = manifest.chunk_refs()
+            report.chunks_removed += self._delete_chunks(
+                [chunk_id for chunk_id in entry["chunk_ids"] if chunk_id not in keep]
+            )
+        for name in sorted(set(manifest.files) - present):
+            entry = manifest.files.pop(name)
+            keep = manifest.chunk_refs()
+            report.chunks_removed += self._delete_chunks(
+                [chunk_id for chunk_id in entry["chunk_ids"] if chunk_id not in keep]
+            )
+            report.removed.append(name)
+
+        manifest.save()
+        report.index_actions = self.update_indexes()
+        log_debug(
+            f"Knowledge sync: {len(report.added)} added, {len(report.updated)} updated, "
+            f"{len(report.removed)} removed, {report.unchanged} unchanged"
+        )
+        return report
+
+    def update_indexes(self) -> List[str]:
+        """Build or update the search indexes after chunks were written or deleted.
+
+        Returns:
+            List[str]: What the index manager did, empty if nothing was needed
+        """
+        index_manager = getattr(self.vector_db, "index_manager", None)
+        if index_manager is None:
+            return []
+        try:
+            return index_manager.update()
+        except Exception as e:
+            # Searches still work without indexes, only slower
+            logger.warning(f"Could not update knowledge indexes: {e}")
+            return []
+
+    def search(
+        self, query: str, max_results: Optional[int] = None, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Search the knowledge base, reranking several times more candidates than returned.
+
+        Args:
+            query: The search query
+            max_results: Chunks to return, the knowledge base's ``max_results`` if not set
+            filters: Metadata the chunks have to match
+
+        Returns:
+            List[Document]: The most relevant chunks, best first
+        """
+        top_k = max_results or self.max_results
+        if self.reranker is None:
+            return super().search(query, max_results=top_k, filters=filters)
+        candidates = super().search(query, max_results=self.reranker.candidates(top_k), filters=filters)
+        return self.reranker.rerank(query, candidates, top_k)
+
+    async def async_search(
+        self, query: str, max_results: Optional[int] = None, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        top_k = max_results or self.max_results
+        if self.reranker is None:
+            return await super().async_search(query, max_results=top_k, filters=filters)
+        candidates = await super().async_search(
+            query, max_results=self.reranker.candidates(top_k), filters=filters
+        )
+        # A cross-encoder would block the event loop
+        return await asyncio.to_thread(self.reranker.rerank, query, candidates, top_k)
+
+    def knowledge_version(self) -> str:
+        """Version of the knowledge table; every insert, upsert and delete bumps it.
+
+        Covers chunks written through ``add_document`` and ``load_documents``
+        and by other processes, without touching the knowledge files.
+        """
+        connection = getattr(self.vector_db, "connection", None)
+        table_name = getattr(self.vector_db, "table_name", None)
+        if connection is None or table_name is None:
+            return "none"
+        try:
+            return str(connection.open_table(table_name).version)
+        except Exception:
+            # Not created yet
+            return "none"
 
     def add_document(
         self, content: str, filename: str, metadata: Optional[dict] = None
@@ -68,8 +634,8 @@ class HaloKnowledge(Knowledge):
             logger.error("Knowledge directory not set")
             return False
 
-        # Ensure the filename has a supported extension
-        if not any(filename.endswith(fmt) for fmt in self.formats):
+        # Ensure the filename has a text extension
+        if not filename.endswith((".txt", ".md")):
             filename = f"{filename}.txt"
 
         file_path = self.knowledge_dir / filename
@@ -79,21 +645,15 @@ class HaloKnowledge(Knowledge):
             with open(file_path, "w", encoding="utf-8") as f:
                 f.write(content)
 
-            # Load the document into the vector database
-            documents = self.reader.read(file=file_path)
-
-            if metadata:
-                for doc in documents:
-                    doc.meta_data.update(metadata)
-
-            # Process and index the documents
-            self.process_documents(
-                documents=documents,
-                metadata=metadata,
-                upsert=True,
-                skip_existing=False,
-                source_info=str(file_path),
-            )
+            # Embed only this document
+            manifest = self._open_manifest()
+            report = SyncReport()
+            self._sync_files(manifest, [file_path], report, metadata=metadata)
+            manifest.save()
+            if report.failed:
+                return False
+            if report.changed:
+                self.update_indexes()
 
             logger.info(f"Added document to knowledge base: {file_path}")
             return True
@@ -101,3 +661,44 @@ class HaloKnowledge(Knowledge):
         except Exception as e:
             logger.exception(f"Failed to add document {filename}: {e}")
             return False
+
+    def add_file(self, name: str, data: bytes, metadata: Optional[dict] = None) -> SyncReport:
+        """Save an uploaded file to the knowledge directory and embed it.
+
+        Args:
+            name: File name including its extension, e.g. ``guideline.pdf``
+            data: Raw file content
+            metadata: Optional metadata to associate with the file's chunks
+
+        Returns:
+            SyncReport: Whether the file was added, updated or failed
+        """
+        file_path = self.knowledge_dir / Path(name).name
+        if file_path.suffix.lower() not in self.formats:
+            raise ValueError(f"Unsupported file type: {file_path.suffix}")
+        file_path.write_bytes(data)
+
+        manifest = self._open_manifest()
+        report = SyncReport()
+        self._sync_files(manifest, [file_path], report, metadata=metadata)
+        manifest.save()
+        if report.changed:
+            report.index_actions = self.update_indexes()
+        return report
+
+    def load_documents(self, documents: List[Document], upsert: bool = True) -> int:
+        """Embed documents that have no file in the knowledge directory, e.g. scraped pages.
+
+        Chunks that are already stored are skipped, so loading again is cheap.
+
+        Returns:
+            int: Number of chunks written
+        """
+        self._open_manifest()
+        content_hash = hashlib.sha256(
+            "\n".join(document.content for document in documents).encode("utf-8")
+        ).hexdigest()
+        written = self._insert_documents(content_hash, documents)
+        if written:
+            self.update_indexes()
+        return written
@@ -0,0 +1,540 @@
+"""
+ANN and full-text indexes of the knowledge table.
+
+LanceDB scans every row of a table that has no index, so search time grows
+linearly with the corpus. The index manager builds a vector index once the
+table is large enough to need one (HNSW with scalar quantization, or IVF-PQ
+for tables too large to keep HNSW graphs in memory) and the native full-text
+index hybrid search needs. Rows added later are merged into the indexes
+incrementally; the vector index is retrained only when the table has grown
+well beyond the data it was trained on. After each build, the search
+parameters (nprobes, refine factor, ef) are tuned to the cheapest setting
+that reaches the target recall against an exact search.
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import lancedb
+from agno.knowledge.document import Document
+from agno.utils.log import log_debug, logger
+from agno.vectordb.lancedb import LanceDb
+from lancedb.index import FTS, HnswSq, IvfPq
+
+from deadlines import stage_latencies
+from retrieval_cache import get_retrieval_cache, result_key
+
+# Tables with fewer rows are searched exactly; a scan is fast enough there
+VECTOR_INDEX_MIN_ROWS = int(os.getenv("HALO_VECTOR_INDEX_MIN_ROWS", "20000"))
+# Larger tables get IVF-PQ, whose compressed vectors stay small in memory
+HNSW_MAX_ROWS = int(os.getenv("HALO_HNSW_MAX_ROWS", "2000000"))
+# Rows not in the indexes are scanned; merge them in once there are this many...
+OPTIMIZE_MIN_UNINDEXED_ROWS = 1000
+# ...or this fraction of the indexed rows
+OPTIMIZE_UNINDEXED_FRACTION = 0.05
+# Retrain the vector index once the table has grown by this factor since training
+RETRAIN_GROWTH = 2.0
+# Recall@k against exact search the tuned search parameters have to reach
+TARGET_RECALL = float(os.getenv("HALO_TARGET_RECALL", "0.95"))
+
+VECTOR_INDEX_NAME = "vector_idx"
+FTS_INDEX_NAME = "payload_idx"
+
+# LanceDB names of agno's distance metrics
+_DISTANCE_TYPES = {"cosine": "cosine", "l2": "l2", "max_inner_product": "dot"}
+
+
+def _distance_type(distance: Any) -> str:
+    return _DISTANCE_TYPES.get(getattr(distance, "value", distance), "cosine")
+
+
+class IndexManager:
+    """Builds, updates and tunes the indexes of one LanceDB table.
+
+    The index state (what the vector index was trained on, the tuned search
+    parameters and the measured recall) is stored as JSON beside the table.
+
+    Args:
+        uri: Directory of the LanceDB database
+        table_name: Table to index
+        distance: Distance metric of the vector index, as named by agno or LanceDB
+    """
+
+    def __init__(self, uri: str, table_name: str, distance: Any = "cosine"):
+        self.uri = str(uri)
+        self.table_name = table_name
+        self.distance_type = _distance_type(distance)
+        self.state_path = Path(self.uri) / f"{table_name}.index.json"
+        self.state: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        if self.state_path.exists():
+            try:
+                self.state = json.loads(self.state_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable index state {self.state_path}: {e}")
+
+    def _save_state(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.state), encoding="utf-8")
+        os.replace(tmp_path, self.state_path)
+
+    def _open_table(self) -> Optional[Any]:
+        connection = lancedb.connect(self.uri)
+        if self.table_name not in connection.table_names():
+            return None
+        return connection.open_table(self.table_name)
+
+    @staticmethod
+    def _indices(table: Any) -> Dict[str, Any]:
+        return {index.name: index for index in table.list_indices()}
+
+    def search_params(self) -> Dict[str, Any]:
+        """Tuned parameters of vector searches: nprobes, refine_factor and ef."""
+        return dict(self.state.get("search", {}))
+
+    # ------------------------------------------------------------------ build
+
+    def _build_vector_index(self, table: Any, rows: int) -> None:
+        dimensions = table.schema.field("vector").type.list_size
+        if rows <= HNSW_MAX_ROWS:
+            # A few large partitions, each searched through its HNSW graph
+            partitions = max(1, rows // 500_000)
+            config = HnswSq(distance_type=self.distance_type, num_partitions=partitions)
+            index_type = "IVF_HNSW_SQ"
+        else:
+            partitions = int(math.sqrt(rows))
+            # 16 dimensions per PQ code keeps 1536-d vectors at 96 bytes
+            sub_vectors = dimensions // 16 if dimensions % 16 == 0 else dimensions // 8
+            config = IvfPq(
+                distance_type=self.distance_type,
+                num_partitions=partitions,
+                num_sub_vectors=max(sub_vectors, 1),
+            )
+            index_type = "IVF_PQ"
+        start = time.monotonic()
+        table.create_index("vector", config=config, replace=True, name=VECTOR_INDEX_NAME)
+        self.state["vector_index"] = {
+            "type": index_type,
+            "partitions": partitions,
+            "trained_rows": rows,
+            "built_at": time.time(),
+            "build_seconds": round(time.monotonic() - start, 2),
+        }
+        logger.info(
+            f"Built {index_type} index of {self.table_name} on {rows} rows "
+            f"in {time.monotonic() - start:.1f}s"
+        )
+
+    def _default_search_params(self) -> Dict[str, Any]:
+        vector_index = self.state.get("vector_index", {})
+        partitions = vector_index.get("partitions", 1)
+        if vector_index.get("type") == "IVF_PQ":
+            # PQ distances are approximate; re-rank candidates with the full vectors
+            return {"nprobes": min(partitions, max(20, partitions // 20)), "refine_factor": 10}
+        return {"nprobes": partitions, "ef": 100}
+
+    def ensure_fts_index(self) -> None:
+        """Create the full-text index if it is missing, e.g. on a table loaded before indexing."""
+        with self._lock:
+            table = self._open_table()
+            if table is not None and FTS_INDEX_NAME not in self._indices(table):
+                table.create_index("payload", config=FTS(), replace=True, name=FTS_INDEX_NAME)
+
+    def update(self) -> List[str]:
+        """Bring the indexes in line with the table after rows were added or deleted.
+
+        Creates missing indexes once the table is large enough, merges new rows
+        into existing indexes and retrains the vector index after large growth.
+        The search parameters are tuned whenever the vector index was (re)built.
+
+        Returns:
+            List[str]: What was done, e.g. ``["fts", "vector:IVF_HNSW_SQ", "optimize"]``
+        """
+        with self._lock:
+            table = self._open_table()
+            if table is None:
+                return []
+            rows = table.count_rows()
+            if rows == 0:
+                return []
+            actions: List[str] = []
+            indices = self._indices(table)
+
+            if FTS_INDEX_NAME not in indices:
+                # Native, so new rows can be merged in by optimize()
+                table.create_index("payload", config=FTS(), replace=True, name=FTS_INDEX_NAME)
+                actions.append("fts")
+
+            if VECTOR_INDEX_NAME not in indices and "vector_index" in self.state:
+                # The table was dropped and recreated
+                for key in ("vector_index", "search", "recall"):
+                    self.state.pop(key, None)
+                self._save_state()
+            trained_rows = self.state.get("vector_index", {}).get("trained_rows")
+            if VECTOR_INDEX_NAME in indices and trained_rows is None:
+                # Index built without a state file; count it as trained on what it holds
+                stats = table.index_stats(VECTOR_INDEX_NAME)
+                trained_rows = stats.num_indexed_rows if stats else rows
+            if VECTOR_INDEX_NAME not in indices:
+                if rows >= VECTOR_INDEX_MIN_ROWS:
+                    self._build_vector_index(table, rows)
+                    actions.append(f"vector:{self.state['vector_index']['type']}")
+            elif rows >= trained_rows * RETRAIN_GROWTH or (
+                # Crossed into the size range of the other index type
+                (rows > HNSW_MAX_ROWS) != (trained_rows > HNSW_MAX_ROWS)
+            ):
+                self._build_vector_index(table, rows)
+                actions.append(f"retrain:{self.state['vector_index']['type']}")
+
+            unindexed = 0
+            for name in self._indices(table):
+                stats = table.index_stats(name)
+                unindexed = max(unindexed, stats.num_unindexed_rows if stats else 0)
+            threshold = max(OPTIMIZE_MIN_UNINDEXED_ROWS, int(rows * OPTIMIZE_UNINDEXED_FRACTION))
+            if unindexed >= threshold:
+                # Adds new rows to the indexes as delta segments and compacts small fragments
+                start = time.monotonic()
+                table.optimize()
+                actions.append("optimize")
+                log_debug(f"Merged {unindexed} rows into the indexes in {time.monotonic() - start:.1f}s")
+
+            if any(action.startswith(("vector", "retrain")) for action in actions):
+                self.state["search"] = self._default_search_params()
+                self.tune(table)
+            if actions:
+                self._save_state()
+            return actions
+
+    # ------------------------------------------------------------------- tune
+
+    def _query(self, table: Any, vector: List[float], limit: int, params: Optional[Dict[str, Any]]) -> Any:
+        query = (
+            table.search(vector)
+            .distance_type(self.distance_type)
+            .limit(limit)
+            .select(["id", "_distance"])
+        )
+        if params is None:
+            return query.bypass_vector_index()
+        if params.get("nprobes"):
+            query = query.nprobes(params["nprobes"])
+        if params.get("refine_factor"):
+            query = query.refine_factor(params["refine_factor"])
+        if params.get("ef"):
+            query = query.ef(params["ef"])
+        return query
+
+    def _sample_vectors(self, table: Any, samples: int) -> List[List[float]]:
+        rows = table.count_rows()
+        offsets = random.sample(range(rows), min(samples, rows))
+        vectors = table.take_offsets(offsets).select(["vector"]).to_list()
+        # Perturbed, so a query does not trivially find the row it was taken from
+        noise = random.Random(0)
+        return [
+            [value + noise.gauss(0, 0.01) for value in row["vector"]] for row in vectors
+        ]
+
+    def measure_recall(
+        self,
+        table: Optional[Any] = None,
+        params: Optional[Dict[str, Any]] = None,
+        samples: int = 20,
+        k: int = 10,
+        vectors: Optional[List[List[float]]] = None,
+    ) -> Tuple[float, float]:
+        """Compare indexed searches against exact ones.
+
+        Args:
+            table: The table, opened if not given
+            params: Search parameters to measure; the tuned ones if not given
+            samples: Number of sample queries, taken from the table's own vectors
+            k: Results compared per query
+            vectors: Sample query vectors, drawn if not given
+
+        Returns:
+            Tuple[float, float]: Mean recall@k and mean latency of the indexed search in seconds
+        """
+        table = table if table is not None else self._open_table()
+        if table is None or VECTOR_INDEX_NAME not in self._indices(table):
+            return 1.0, 0.0
+        params = params if params is not None else self.search_params()
+        vectors = vectors if vectors is not None else self._sample_vectors(table, samples)
+        recalls, latencies = [], []
+        for vector in vectors:
+            exact = {row["id"] for row in self._query(table, vector, k, None).to_list()}
+            start = time.monotonic()
+            found = {row["id"] for row in self._query(table, vector, k, params).to_list()}
+            latencies.append(time.monotonic() - start)
+            recalls.append(len(found & exact) / len(exact) if exact else 1.0)
+        if not recalls:
+            return 1.0, 0.0
+        return sum(recalls) / len(recalls), sum(latencies) / len(latencies)
+
+    def tune(self, table: Optional[Any] = None, samples: int = 20, k: int = 10) -> Dict[str, Any]:
+        """Pick the cheapest search parameters that reach ``TARGET_RECALL``.
+
+        Candidates are tried from cheap to expensive; if none reaches the
+        target, the most accurate one is kept.
+
+        Returns:
+            Dict[str, Any]: The chosen search parameters
+        """
+        table = table if table is not None else self._open_table()
+        if table is None or VECTOR_INDEX_NAME not in self._indices(table):
+            return {}
+        base = self._default_search_params()
+        partitions = self.state.get("vector_index", {}).get("partitions", 1)
+        if "refine_factor" in base:
+            candidates = [
+                {"nprobes": min(partitions, base["nprobes"] * scale), "refine_factor": refine}
+                for scale, refine in ((1, 5), (1, 10), (2, 10), (4, 10), (8, 20), (16, 40))
+            ]
+        else:
+            candidates = [{"nprobes": base["nprobes"], "ef": ef} for ef in (50, 100, 200, 400, 800)]
+
+        vectors = self._sample_vectors(table, samples)
+        chosen, recall, latency = candidates[-1], 0.0, 0.0
+        for params in candidates:
+            recall, latency = self.measure_recall(table, params, k=k, vectors=vectors)
+            log_debug(f"Search parameters {params}: recall@{k} {recall:.3f}, {latency * 1000:.1f}ms")
+            if recall >= TARGET_RECALL:
+                chosen = params
+                break
+        self.state["search"] = chosen
+        self.state["recall"] = {
+            "recall_at_k": round(recall, 4),
+            "k": k,
+            "latency": latency,
+            "measured_at": time.time(),
+        }
+        self._save_state()
+        logger.info(f"Tuned search of {self.table_name}: {chosen}, recall@{k} {recall:.3f}")
+        return chosen
+
+    # ------------------------------------------------------------------ stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Row counts, indexes, tuned parameters and recall of the table."""
+        stats: Dict[str, Any] = {"table": self.table_name, "rows": 0, "indexes": {}}
+        table = self._open_table()
+        if table is not None:
+            stats["rows"] = table.count_rows()
+            for name in self._indices(table):
+                index_stats = table.index_stats(name)
+                if index_stats is not None:
+                    stats["indexes"][name] = {
+                        "type": index_stats.index_type,
+                        "indexed_rows": index_stats.num_indexed_rows,
+                        "unindexed_rows": index_stats.num_unindexed_rows,
+                    }
+        stats["search"] = self.search_params()
+        stats["recall"] = self.state.get("recall")
+        stats["latency"] = stage_latencies.get_stats().get("knowledge_search")
+        return stats
+
+
+# Shared by all LanceDb instances of a table in the process
+_index_managers: Dict[Tuple[str, str], IndexManager] = {}
+_index_managers_lock = threading.Lock()
+
+
+def get_index_manager(uri: str, table_name: str, distance: Any = "cosine") -> IndexManager:
+    """Return the process-wide index manager of a table."""
+    key = (str(uri), table_name)
+    with _index_managers_lock:
+        manager = _index_managers.get(key)
+        if manager is None:
+            manager = IndexManager(uri, table_name, distance)
+            _index_managers[key] = manager
+    return manager
+
+
+def get_index_stats() -> List[Dict[str, Any]]:
+    """Stats of every table indexed by this process."""
+    with _index_managers_lock:
+        managers = list(_index_managers.values())
+    return [manager.get_stats() for manager in managers]
+
+
+class IndexedLanceDb(LanceDb):
+    """LanceDb that searches with the tuned index parameters and records search latency.
+
+    The full-text index is the native one kept up to date by the index
+    manager, instead of a tantivy index rebuilt by every new instance. Query
+    embeddings and ranked results are cached in the retrieval cache, keyed by
+    the table version, so repeated questions neither embed nor scan again.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("use_tantivy", False)
+        super().__init__(*args, **kwargs)
+        self.index_manager = get_index_manager(self.uri, self.table_name, self.distance)
+        self.retrieval_cache = get_retrieval_cache()
+
+    @property
+    def _embedder_key(self) -> Tuple[str, int]:
+        return getattr(self.embedder, "id", type(self.embedder).__name__), self.dimensions or 0
+
+    def _query_embedding(self, query: str) -> Optional[List[float]]:
+        embedding = self.retrieval_cache.get_query_embedding(self._embedder_key, query)
+        if embedding is None:
+            embedding = self.embedder.get_embedding(query)
+            self.retrieval_cache.put_query_embedding(self._embedder_key, query, embedding)
+        return embedding
+
+    def _vector_query(self, query_builder: Any) -> Any:
+        params = self.index_manager.search_params()
+        query_builder = query_builder.distance_type(self.index_manager.distance_type)
+        nprobes = self.nprobes or params.get("nprobes")
+        if nprobes:
+            query_builder = query_builder.nprobes(nprobes)
+        if params.get("refine_factor"):
+            query_builder = query_builder.refine_factor(params["refine_factor"])
+        if params.get("ef"):
+            query_builder = query_builder.ef(params["ef"])
+        return query_builder
+
+    def _ensure_fts_index(self) -> None:
+        if not self.fts_index_exists:
+            self.index_manager.ensure_fts_index()
+            self.fts_index_exists = True
+
+    def _build_search_results(self, results: Any) -> List[Document]:
+        documents = super()._build_search_results(results)
+        # Chunk ids identify the results in the retrieval cache
+        if len(documents) == len(results) and self._id in results:
+            for document, chunk_id in zip(documents, results[self._id]):
+                document.id = chunk_id
+        return documents
+
+    def _read_chunks(self, chunk_ids: List[str]) -> Optional[List[Document]]:
+        """Read chunks by id in the given order, None if any of them is gone."""
+        if not chunk_ids:
+            return []
+        ids = ", ".join("'{}'".format(chunk_id.replace("'", "''")) for chunk_id in chunk_ids)
+        rows = self.table.search().where(f"{self._id} IN ({ids})").limit(len(chunk_ids)).to_pandas()
+        documents = {document.id: document for document in self._build_search_results(rows)}
+        if len(documents) < len(set(chunk_ids)):
+            return None
+        return [documents[chunk_id] for chunk_id in chunk_ids]
+
+    def _cached_search(
+        self, query: str, limit: int, filters: Optional[Dict[str, Any]]
+    ) -> Tuple[Optional[List[Document]], Optional[str], int]:
+        """Look a search up in the retrieval cache.
+
+        Returns:
+            The cached documents (None on a miss), the cache key and the table version
+        """
+        if self.connection is None:
+            return None, None, 0
+        start = time.monotonic()
+        try:
+            # The latest version, including writes of other processes
+            self.table = self.connection.open_table(name=self.table_name)
+        except Exception:
+            # Not created yet; the search itself reports it
+            return None, None, 0
+        version = self.table.version
+        scope = f"{self._embedder_key}|{type(self.reranker).__name__ if self.reranker else ''}"
+        search_type = getattr(self.search_type, "value", self.search_type)
+        key = result_key(f"{self.uri}/{self.table_name}", version, search_type, query, limit, filters, scope)
+        cached = self.retrieval_cache.get_results(key)
+        if cached is None:
+            return None, key, version
+        if cached.documents is None:
+            # Persisted by an earlier process: only the ranking is stored
+            documents = self._read_chunks(cached.ids)
+            if documents is None:
+                return None, key, version
+            self.retrieval_cache.put_results(key, f"{self.uri}/{self.table_name}", version, cached.ids, documents)
+        else:
+            documents = cached.documents
+        stage_latencies.record("knowledge_search_cached", time.monotonic() - start)
+        log_debug(f"Knowledge search answered from the retrieval cache ({len(documents)} documents)")
+        # Callers may modify the documents, e.g. add reranking scores
+        return [replace(document, meta_data=dict(document.meta_data or {})) for document in documents], key, version
+
+    def _store_search(self, key: Optional[str], version: int, documents: List[Document]) -> None:
+        if key is None or any(document.id is None for document in documents):
+            return
+        self.retrieval_cache.put_results(
+            key,
+            f"{self.uri}/{self.table_name}",
+            version,
+            [document.id for document in documents],
+            [replace(document, meta_data=dict(document.meta_data or {})) for document in documents],
+        )
+
+    def search(self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        documents, key, version = self._cached_search(query, limit, filters)
+        if documents is not None:
+            return documents
+        documents = super().search(query, limit=limit, filters=filters)
+        self._store_search(key, version, documents)
+        return documents
+
+    async def async_search(
+        self, query: str, limit: int = 5, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        documents, key, version = self._cached_search(query, limit, filters)
+        if documents is not None:
+            return documents
+        documents = await super().async_search(query, limit=limit, filters=filters)
+        self._store_search(key, version, documents)
+        return documents
+
+    def vector_search(self, query: str, limit: int = 5) -> List[Document]:
+        query_embedding = self._query_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return None
+        if self.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return None  # type: ignore
+
+        start = time.monotonic()
+        results = self._vector_query(
+            self.table.search(query=query_embedding, vector_column_name=self._vector_col).limit(limit)
+        ).to_pandas()
+        stage_latencies.record("knowledge_search", time.monotonic() - start)
+        return results
+
+    def hybrid_search(self, query: str, limit: int = 5) -> List[Document]:
+        query_embedding = self._query_embedding(query)
+        if query_embedding is None:
+            logger.error(f"Error getting embedding for Query: {query}")
+            return []
+        if self.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return []
+
+        self._ensure_fts_index()
+        start = time.monotonic()
+        results = self._vector_query(
+            self.table.search(vector_column_name=self._vector_col, query_type="hybrid")
+            .vector(query_embedding)
+            .text(query)
+            .limit(limit)
+        ).to_pandas()
+        stage_latencies.record("knowledge_search", time.monotonic() - start)
+        return results
+
+    def keyword_search(self, query: str, limit: int = 5) -> List[Document]:
+        if self.table is None:
+            logger.error("Table not initialized. Please create the table first")
+            return []
+
+        self._ensure_fts_index()
+        start = time.monotonic()
+        results = self.table.search(query=query, query_type="fts").limit(limit).to_pandas()
+        stage_latencies.record("knowledge_search", time.monotonic() - start)
+        return results
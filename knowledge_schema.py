@@ -0,0 +1,385 @@
+"""
+Versioned schema of the knowledge table and its migrations.
+
+A knowledge table written by an older version of the app, or by another
+embedder, used to be deleted and rebuilt from scratch: hours of parsing and
+embedding on a large corpus. The migrator brings such a table up to date
+instead. Columns are renamed or cast in place, legacy payload fields are
+renamed, rows are rewritten only where the layout requires it, and chunks
+are re-embedded only when the embedder changed (mostly from the embedding
+cache if they were embedded by that embedder before). ``plan`` reports what
+would change without changing anything; ``apply`` carries the plan out.
+
+Schema versions:
+
+1. Columns ``vector`` (fixed-size float32 list), ``id`` and ``payload``, in
+   that order; payload JSON with ``name``, ``meta_data``, ``content`` and ``usage``
+2. Payloads also carry ``content_id`` and ``content_hash``; no placeholder row
+"""
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import lancedb
+import pyarrow as pa
+from agno.knowledge.embedder.base import Embedder
+from agno.utils.log import log_debug, logger
+
+from ingestion import EmbeddingPipeline, estimate_tokens
+from knowledge import SCHEMA_VERSION, KnowledgeManifest, embedder_signature, row_id
+from knowledge_index import get_index_manager
+
+COLUMNS = ["vector", "id", "payload"]
+# Keys of the payload JSON; rows written by agno need the first four
+PAYLOAD_FIELDS = ["name", "meta_data", "content", "usage", "content_id", "content_hash"]
+# Payload keys of older versions and their current names
+PAYLOAD_RENAMES = {"text": "content", "metadata": "meta_data", "meta": "meta_data", "document_name": "name"}
+# Id of the initialisation row older versions inserted into new tables
+PLACEHOLDER_ID = "init"
+
+# Rows read, transformed and written at a time
+MIGRATION_BATCH_ROWS = 5000
+
+
+@dataclass
+class MigrationStep:
+    """One change a migration makes.
+
+    Args:
+        name: Short identifier, e.g. ``cast_vector``
+        description: What the step does, for the dry-run report
+        rows: Rows the step touches; 0 for schema-only changes
+        rewrite: The rows are copied into a new table instead of changed in place
+    """
+
+    name: str
+    description: str
+    rows: int = 0
+    rewrite: bool = False
+
+
+@dataclass
+class MigrationPlan:
+    table_name: str
+    from_version: Optional[int]
+    to_version: int = SCHEMA_VERSION
+    steps: List[MigrationStep] = field(default_factory=list)
+    # Tokens sent to the embedder if nothing is cached
+    reembed_tokens: int = 0
+
+    @property
+    def needed(self) -> bool:
+        return bool(self.steps)
+
+    @property
+    def needs_reembedding(self) -> bool:
+        return any(step.name == "reembed" for step in self.steps)
+
+    @property
+    def rewrite(self) -> bool:
+        return any(step.rewrite for step in self.steps)
+
+    def report(self) -> str:
+        """Human-readable summary of the plan, as shown for a dry run."""
+        if not self.steps:
+            return f"Knowledge table {self.table_name} is up to date (schema version {self.to_version})"
+        lines = [
+            f"Migration of knowledge table {self.table_name} "
+            f"from schema version {self.from_version or 'unknown'} to {self.to_version}:"
+        ]
+        for number, step in enumerate(self.steps, start=1):
+            rows = f" ({step.rows:,} rows)" if step.rows else ""
+            how = "rewrite" if step.rewrite else "in place"
+            lines.append(f"  {number}. {step.description}{rows} [{how}]")
+        if self.needs_reembedding:
+            lines.append(f"  Re-embedding sends up to ~{self.reembed_tokens:,} tokens to the embedder")
+        return "\n".join(lines)
+
+
+def normalize_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a payload with legacy keys renamed and missing keys added."""
+    payload = dict(payload)
+    for old, new in PAYLOAD_RENAMES.items():
+        if old in payload and new not in payload:
+            payload[new] = payload.pop(old)
+    for key in PAYLOAD_FIELDS:
+        payload.setdefault(key, {} if key == "meta_data" else None)
+    payload["content"] = payload["content"] or ""
+    return payload
+
+
+def _is_placeholder(row: Dict[str, Any], payload: Dict[str, Any]) -> bool:
+    # Tables without an id column have the placeholder's payload only
+    return row.get("id") == PLACEHOLDER_ID or (
+        payload.get("name") == "initialization" and payload.get("content") == "initialization"
+    )
+
+
+class KnowledgeMigrator:
+    """Plans and applies migrations of one knowledge table.
+
+    Args:
+        uri: Directory of the LanceDB database
+        table_name: The knowledge table
+        embedder: Embedder the table should be embedded with
+    """
+
+    def __init__(self, uri: Any, table_name: str, embedder: Embedder):
+        self.uri = str(uri)
+        self.table_name = table_name
+        self.embedder = embedder
+        self.copy_name = f"{table_name}__migration"
+        # Exists while a complete copy is replacing the table
+        self.copy_done_path = Path(self.uri) / f"{self.copy_name}.done"
+        self.connection = lancedb.connect(self.uri)
+        # Same place as HaloKnowledge.manifest_path
+        self.manifest_path = Path(self.uri) / f"{table_name}.manifest.json"
+
+    def _batches(self, table: Any, columns: Optional[List[str]] = None) -> Iterator[pa.RecordBatch]:
+        query = table.search().limit(None)
+        if columns:
+            query = query.select(columns)
+        yield from query.to_batches(MIGRATION_BATCH_ROWS)
+
+    @staticmethod
+    def _vector_column(schema: pa.Schema) -> Optional[str]:
+        if "vector" in schema.names:
+            return "vector"
+        # Older tables named it e.g. "embedding"; it is the only list column
+        for schema_field in schema:
+            if pa.types.is_list(schema_field.type) or pa.types.is_fixed_size_list(schema_field.type):
+                return schema_field.name
+        return None
+
+    def plan(self) -> MigrationPlan:
+        """Work out what a migration would change, without changing anything.
+
+        A table whose manifest records the current schema version and embedder
+        is not scanned, so this is cheap enough to run at startup.
+
+        Raises:
+            ValueError: If the table has no vector or payload column to migrate from
+        """
+        manifest = KnowledgeManifest(self.manifest_path)
+        plan = MigrationPlan(table_name=self.table_name, from_version=manifest.schema_version)
+        names = self.connection.table_names()
+        if self.copy_name in names and self.copy_done_path.exists():
+            # Interrupted while the old table was replaced by the complete copy
+            plan.steps.append(
+                MigrationStep("finish_copy", "Replace the table by the copy of an interrupted migration", rewrite=True)
+            )
+            return plan
+        if self.table_name not in names:
+            return plan
+        if self.copy_name in names:
+            plan.steps.append(MigrationStep("drop_copy", "Drop the partial copy of an interrupted migration"))
+
+        table = self.connection.open_table(self.table_name)
+        schema = table.schema
+        current = embedder_signature(self.embedder)
+        vector_column = self._vector_column(schema)
+        if vector_column is None or "payload" not in schema.names:
+            raise ValueError(
+                f"Knowledge table {self.table_name} has columns {schema.names}; "
+                "it needs a vector and a payload column to be migrated"
+            )
+        if vector_column != "vector":
+            plan.steps.append(
+                MigrationStep("rename_vector", f"Rename column {vector_column!r} to 'vector'")
+            )
+
+        vector_type = schema.field(vector_column).type
+        if pa.types.is_fixed_size_list(vector_type):
+            dimensions = vector_type.list_size
+        else:
+            first = next(self._batches(table, [vector_column]), None)
+            dimensions = len(first.column(0)[0]) if first is not None and first.num_rows else None
+        reembed = (manifest.embedder is not None and manifest.embedder != current) or (
+            dimensions is not None and dimensions != current["dimensions"]
+        )
+        if not reembed and not (
+            pa.types.is_fixed_size_list(vector_type) and pa.types.is_float32(vector_type.value_type)
+        ):
+            plan.steps.append(
+                MigrationStep(
+                    "cast_vector", f"Cast column 'vector' from {vector_type} to {dimensions} float32 values"
+                )
+            )
+
+        if manifest.schema_version == SCHEMA_VERSION and not plan.steps and not reembed:
+            return plan
+
+        # Structure of the columns and the rows
+        rows = table.count_rows()
+        expected = ["vector" if name == vector_column else name for name in schema.names]
+        if expected[: len(COLUMNS)] != COLUMNS:
+            plan.steps.append(
+                MigrationStep(
+                    "restructure",
+                    f"Rewrite columns {expected} as {COLUMNS} with ids derived from the content",
+                    rows=rows,
+                    rewrite=True,
+                )
+            )
+        columns = ["id", "payload"] if "id" in schema.names else ["payload"]
+        legacy_payloads = placeholders = tokens = 0
+        for batch in self._batches(table, columns):
+            batch_rows = batch.to_pylist()
+            for row in batch_rows:
+                try:
+                    payload = json.loads(row["payload"])
+                except (TypeError, ValueError):
+                    payload = {}
+                if _is_placeholder(row, payload):
+                    placeholders += 1
+                elif normalize_payload(payload) != payload:
+                    legacy_payloads += 1
+                if reembed:
+                    tokens += estimate_tokens(normalize_payload(payload)["content"])
+        # Done while copying if the rows are rewritten anyway
+        rewrite = reembed or plan.rewrite
+        if placeholders:
+            plan.steps.append(
+                MigrationStep(
+                    "drop_placeholder", "Delete the initialisation row", rows=placeholders, rewrite=rewrite
+                )
+            )
+        if legacy_payloads:
+            plan.steps.append(
+                MigrationStep(
+                    "payload_fields",
+                    "Rename legacy payload fields and add missing ones",
+                    rows=legacy_payloads,
+                    rewrite=rewrite,
+                )
+            )
+        if reembed:
+            embedded_with = (manifest.embedder or {}).get("id", f"{dimensions}-dimensional vectors")
+            plan.steps.append(
+                MigrationStep(
+                    "reembed",
+                    f"Re-embed all chunks: embedded with {embedded_with}, configured is {current['id']}",
+                    rows=rows - placeholders,
+                    rewrite=True,
+                )
+            )
+            plan.reembed_tokens = tokens
+        if manifest.schema_version != SCHEMA_VERSION and not plan.steps:
+            plan.steps.append(MigrationStep("record_version", f"Record schema version {SCHEMA_VERSION}"))
+        return plan
+
+    def _transform(self, batch: pa.RecordBatch, vector_column: str, reembed: bool) -> List[Dict[str, Any]]:
+        rows, contents = [], []
+        for row in batch.to_pylist():
+            try:
+                payload = json.loads(row["payload"])
+            except (TypeError, ValueError):
+                logger.warning(f"Dropping knowledge row with unreadable payload: {row.get('id')}")
+                continue
+            if _is_placeholder(row, payload):
+                continue
+            payload = normalize_payload(payload)
+            rows.append(
+                {
+                    "vector": row[vector_column],
+                    "id": row_id(payload["content"]),
+                    "payload": json.dumps(payload),
+                }
+            )
+            contents.append(payload["content"])
+        if reembed and rows:
+            vectors = EmbeddingPipeline(self.embedder).embed(contents)
+            for row, vector in zip(rows, vectors):
+                row["vector"] = vector
+        return rows
+
+    def _schema(self) -> pa.Schema:
+        dimensions = embedder_signature(self.embedder)["dimensions"]
+        return pa.schema(
+            [
+                pa.field("vector", pa.list_(pa.float32(), dimensions)),
+                pa.field("id", pa.string()),
+                pa.field("payload", pa.string()),
+            ]
+        )
+
+    def _rewrite(self, table: Any, reembed: bool) -> None:
+        """Copy all rows, transformed, into a new table that then replaces the old one."""
+        vector_column = self._vector_column(table.schema)
+        copy = self.connection.create_table(self.copy_name, schema=self._schema(), mode="overwrite")
+        copied = 0
+        for batch in self._batches(table):
+            rows = self._transform(batch, vector_column, reembed)
+            if rows:
+                copy.add(rows)
+                copied += len(rows)
+                log_debug(f"Migrated {copied} rows of {self.table_name}")
+        self.copy_done_path.touch()
+        self._replace_with_copy()
+
+    def _replace_with_copy(self) -> None:
+        # LanceDB OSS cannot rename tables; until the copy is back, plan() finds it and resumes
+        copy = self.connection.open_table(self.copy_name)
+        self.connection.drop_table(self.table_name, ignore_missing=True)
+        table = self.connection.create_table(self.table_name, schema=copy.schema)
+        for batch in self._batches(copy):
+            table.add(batch)
+        self.connection.drop_table(self.copy_name)
+        self.copy_done_path.unlink()
+
+    def _update_payloads(self, table: Any) -> None:
+        """Rewrite legacy payloads in place, keyed by row id."""
+        for batch in self._batches(table, ["id", "payload"]):
+            updates = []
+            for row in batch.to_pylist():
+                payload = json.loads(row["payload"])
+                normalized = normalize_payload(payload)
+                if normalized != payload:
+                    updates.append({"id": row["id"], "payload": json.dumps(normalized)})
+            if updates:
+                table.merge_insert("id").when_matched_update_all().execute(
+                    pa.Table.from_pylist(updates)
+                )
+
+    def apply(self, plan: Optional[MigrationPlan] = None) -> MigrationPlan:
+        """Carry out a migration plan, by default a fresh one.
+
+        Returns:
+            MigrationPlan: The plan that was applied
+        """
+        plan = plan if plan is not None else self.plan()
+        if not plan.needed:
+            return plan
+        logger.info(plan.report())
+        steps = {step.name for step in plan.steps}
+        manifest = KnowledgeManifest(self.manifest_path)
+
+        if "finish_copy" in steps:
+            self._replace_with_copy()
+        else:
+            if "drop_copy" in steps:
+                self.connection.drop_table(self.copy_name, ignore_missing=True)
+            table = self.connection.open_table(self.table_name)
+            vector_column = self._vector_column(table.schema)
+            if "rename_vector" in steps:
+                table.alter_columns({"path": vector_column, "rename": "vector"})
+            if "cast_vector" in steps:
+                table.alter_columns({"path": "vector", "data_type": self._schema().field("vector").type})
+            if plan.rewrite:
+                # Placeholder rows and legacy payloads are dealt with while copying
+                self._rewrite(table, reembed="reembed" in steps)
+            else:
+                if "drop_placeholder" in steps:
+                    table.delete(f"id = '{PLACEHOLDER_ID}'")
+                if "payload_fields" in steps:
+                    self._update_payloads(table)
+
+        manifest.schema_version = SCHEMA_VERSION
+        manifest.embedder = embedder_signature(self.embedder)
+        manifest.save()
+        # Indexes of a rewritten table are gone, and in-place changes leave them stale
+        get_index_manager(self.uri, self.table_name).update()
+        logger.info(f"Migrated knowledge table {self.table_name} to schema version {SCHEMA_VERSION}")
+        return plan
@@ -0,0 +1,122 @@
+"""
+Speculative PubMed prefetching for the HALO Agent Interface.
+
+As soon as the modality and body part of a study are known (from the DICOM
+header or the triage pass), likely literature queries are searched in the
+background while the main analysis runs. The imaging agent's Evidence-Based
+Context searches then hit the warm PubMed search cache.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Iterable, List, Optional, Tuple
+
+from agno.utils.log import log_debug
+
+from tools.pubmed_cache import CachedPubmedTools
+
+# DICOM modality codes and the wording PubMed articles use for them
+MODALITY_NAMES = {
+    "CR": "radiography",
+    "DX": "radiography",
+    "RG": "radiography",
+    "CT": "computed tomography",
+    "MR": "magnetic resonance imaging",
+    "US": "ultrasonography",
+    "MG": "mammography",
+    "PT": "positron emission tomography",
+    "NM": "nuclear medicine imaging",
+    "XA": "angiography",
+    "RF": "fluoroscopy",
+    "OT": "",
+}
+
+# Bounded pool shared by all sessions, so prefetching never floods PubMed
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pubmed-prefetch")
+
+
+def _dicom_text(ds: Any, keyword: str) -> str:
+    value = getattr(ds, keyword, "") or ""
+    return " ".join(str(value).replace("_", " ").split())
+
+
+def describe_dicom(ds: Any) -> Tuple[Optional[str], Optional[str]]:
+    """Read modality and body part from a DICOM dataset.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: Modality name and body part, if present
+    """
+    code = _dicom_text(ds, "Modality").upper()
+    modality = MODALITY_NAMES.get(code, code.lower()) or None
+    body_part = _dicom_text(ds, "BodyPartExamined").lower() or None
+    if body_part is None:
+        # Fall back to the free-text study description, e.g. "CT THORAX W/O"
+        body_part = _dicom_text(ds, "StudyDescription").lower() or None
+    return modality, body_part
+
+
+def build_literature_queries(
+    modality: Optional[str], body_part: Optional[str], max_queries: int = 3
+) -> List[str]:
+    """Build the PubMed queries an analysis of this study is likely to run."""
+    if not modality and not body_part:
+        return []
+    subject = " ".join(part for part in (body_part, modality) if part)
+    queries = [
+        f"{subject} diagnostic accuracy",
+        f"{subject} common findings differential diagnosis",
+        f"{subject} imaging guidelines",
+    ]
+    return queries[:max_queries]
+
+
+def find_pubmed_toolkit(tools: Optional[Iterable[Any]]) -> Optional[CachedPubmedTools]:
+    """Return the cached PubMed toolkit of an agent, if it has one."""
+    for tool in tools or []:
+        if isinstance(tool, CachedPubmedTools):
+            return tool
+    return None
+
+
+class LiteraturePrefetcher:
+    """Prefetch likely PubMed searches for one analysis run.
+
+    Call ``cancel`` once the analysis has finished: prefetches that have not
+    started yet are cancelled, finished ones stay in the bounded cache.
+    """
+
+    def __init__(
+        self,
+        toolkit: Optional[CachedPubmedTools],
+        max_queries: int = 3,
+        max_results: int = 10,
+    ):
+        self.toolkit = toolkit
+        self.max_queries = max_queries
+        self.max_results = max_results
+        self._prefetched: List[Tuple[str, Future]] = []
+
+    def start(self, modality: Optional[str], body_part: Optional[str]) -> List[str]:
+        """Start prefetching in the background.
+
+        Returns:
+            List[str]: The queries being prefetched, to suggest them to the model
+        """
+        if self.toolkit is None:
+            return []
+        queries = build_literature_queries(modality, body_part, self.max_queries)
+        for query in queries:
+            future = self.toolkit.prefetch(
+                query, _prefetch_executor, max_results=self.max_results
+            )
+            if future is not None:
+                self._prefetched.append((query, future))
+        if queries:
+            log_debug(f"Prefetching PubMed queries: {queries}")
+        return queries
+
+    def cancel(self) -> None:
+        """Cancel the prefetches that have not started yet."""
+        for query, future in self._prefetched:
+            if future.cancel():
+                self.toolkit.cache.discard(query)
+        self._prefetched = []
@@ -2,13 +2,13 @@
 Load the Knowledge Base for the Halo Agent Interface
 """
 
-import os
-from pathlib import Path
-
 from rich.console import Console
 from rich.panel import Panel
 from rich.progress import Progress, SpinnerColumn, TextColumn
-from halo import halo_knowledge
+from knowledge import KNOWLEDGE_PATH, KNOWLEDGE_TABLE, SyncReport
+from knowledge_schema import KnowledgeMigrator
+from models import create_embedder
+from response_cache import RESPONSE_CACHE_PATH, get_response_cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,14 +17,65 @@ load_dotenv()
 console = Console()
 
 
+def print_sync_report(report: SyncReport) -> None:
+    """Print what a knowledge sync changed."""
+    for label, names, style in (
+        ("Added", report.added, "green"),
+        ("Updated", report.updated, "yellow"),
+        ("Removed", report.removed, "red"),
+        ("Failed", report.failed, "bold red"),
+    ):
+        for name in names:
+            console.print(f"[{style}]{label}: {name}")
+    console.print(
+        f"{len(report.added)} added, {len(report.updated)} updated, "
+        f"{len(report.removed)} removed, {report.unchanged} unchanged "
+        f"({report.chunks_added} chunks embedded, {report.chunks_removed} deleted)"
+    )
+    if report.index_actions:
+        console.print(f"[cyan]Search indexes updated: {', '.join(report.index_actions)}")
+
+
+def migrate_knowledge(dry_run: bool = False) -> bool:
+    """
+    Migrate the knowledge table to the current schema and embedder.
+
+    The plan is always printed first; chunks are only re-embedded if the
+    configured embedder differs from the one the table was built with.
+
+    Args:
+        dry_run (bool, optional): Only print what would change. Defaults to False.
+
+    Returns:
+        bool: Whether the table is up to date afterwards
+    """
+    # Not through halo: importing it opens the table the migration may replace
+    migrator = KnowledgeMigrator(KNOWLEDGE_PATH, KNOWLEDGE_TABLE, create_embedder())
+    plan = migrator.plan()
+    console.print(Panel.fit(plan.report(), title="Dry run" if dry_run else "Migration plan"))
+    if dry_run or not plan.needed:
+        return not plan.needed
+    with Progress(
+        SpinnerColumn(), TextColumn("[bold blue]{task.description}"), console=console
+    ) as progress:
+        task = progress.add_task("Migrating HALO knowledge...", total=None)
+        migrator.apply(plan)
+        progress.update(task, completed=True)
+    console.print("[green]Knowledge table migrated")
+    return True
+
+
 def load_knowledge(recreate: bool = False):
     """
     Load the Halo Agent Interface knowledge base.
 
     Args:
         recreate (bool, optional): Whether to recreate the knowledge base.
-            Defaults to False.
+            Defaults to False, which only embeds new or changed documents.
     """
+    # Imported here: it opens the knowledge table, which --dry-run and --migrate must not
+    from halo import halo_knowledge
+
     with Progress(
         SpinnerColumn(), TextColumn("[bold blue]{task.description}"), console=console
     ) as progress:
@@ -85,49 +136,29 @@ agents based on their capabilities. The system includes:
 
                 console.print("Sample document created successfully")
 
-            # Load the knowledge base with proper error handling
-            console.print("Loading knowledge base")
-            # Force recreate if we're explicitly asked to
-            halo_knowledge.load(recreate=recreate)
+            # Embed only new or changed documents, drop chunks of removed ones
+            console.print("Syncing knowledge base")
+            report = halo_knowledge.sync(recreate=recreate)
             progress.update(task, completed=True)
+            print_sync_report(report)
+
+            # Cached answers were given with the previous knowledge
+            if (
+                report.changed
+                and RESPONSE_CACHE_PATH.exists()
+                and hasattr(halo_knowledge, "knowledge_version")
+            ):
+                get_response_cache(create_embedder()).invalidate(
+                    keep_version=halo_knowledge.knowledge_version()
+                )
 
         except ValueError as ve:
             if "Field 'vector' not found in target schema" in str(ve):
-                console.print("[red]Schema mismatch detected. Attempting to fix...")
-                # Try to fix by manually deleting the database files and recreating
-                try:
-                    # Find and remove the LanceDB database files
-                    import shutil
-                    import os
-
-                    # Common locations for LanceDB files
-                    possible_db_paths = [
-                        Path.home() / "halo_knowledge",
-                        Path.cwd() / "halo_knowledge",
-                        Path(os.environ.get("USERPROFILE", "")) / "halo_knowledge",
-                    ]
-
-                    for db_path in possible_db_paths:
-                        if db_path.exists():
-                            console.print(
-                                f"[yellow]Removing database directory: {db_path}"
-                            )
-                            try:
-                                shutil.rmtree(db_path)
-                                console.print(f"[green]Successfully removed {db_path}")
-                            except Exception as rm_err:
-                                console.print(
-                                    f"[red]Failed to remove {db_path}: {rm_err}"
-                                )
-
-                    # Now try loading again with recreate=True
-                    console.print("[yellow]Attempting to reload knowledge base...")
-                    halo_knowledge.load(recreate=True)
-                    progress.update(task, completed=True)
-                    console.print("[green]Knowledge base recreated successfully!")
-                except Exception as inner_e:
-                    console.print(f"[red]Failed to recreate knowledge base: {inner_e}")
-                    raise
+                console.print(
+                    "[red]The knowledge table has an older schema. "
+                    "Run `python load_knowledge.py --migrate` to migrate it."
+                )
+                raise
             else:
                 console.print(f"[red]Error loading knowledge base: {ve}")
                 raise
@@ -154,7 +185,22 @@ if __name__ == "__main__":
     parser.add_argument(
         "--recreate", action="store_true", help="Recreate the knowledge base"
     )
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Migrate the knowledge table to the current schema and embedder first",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report what --migrate would change",
+    )
     args = parser.parse_args()
 
-    # Load the knowledge base with the specified options
-    load_knowledge(recreate=args.recreate)
+    if args.dry_run:
+        migrate_knowledge(dry_run=True)
+    else:
+        if args.migrate and not args.recreate:
+            migrate_knowledge()
+        # Load the knowledge base with the specified options
+        load_knowledge(recreate=args.recreate)
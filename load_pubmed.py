@@ -0,0 +1,112 @@
+"""
+Load PubMed baseline/update files into the local PubMed index
+"""
+
+from pathlib import Path
+from typing import List
+
+from rich.console import Console
+from rich.panel import Panel
+from rich.progress import Progress, SpinnerColumn, TextColumn
+from dotenv import load_dotenv
+
+from pubmed_index import PUBMED_INDEX_PATH, PubmedIndex
+
+load_dotenv()
+
+# Create a Rich console for enhanced output
+console = Console()
+
+
+def load_pubmed(
+    paths: List[str],
+    index_path: str = str(PUBMED_INDEX_PATH),
+    embed: bool = False,
+    batch_size: int = 1000,
+):
+    """
+    Load PubMed XML files into the local PubMed index.
+
+    Args:
+        paths (List[str]): Files or directories with ``.xml``/``.xml.gz`` files.
+            Files are processed in name order, so update files are applied
+            after the baseline they supersede.
+        index_path (str, optional): Directory of the local index.
+        embed (bool, optional): Also build the vector index. Defaults to False.
+        batch_size (int, optional): Records written per batch. Defaults to 1000.
+    """
+    embedder = None
+    if embed:
+        from models import create_embedder
+
+        embedder = create_embedder()
+
+    index = PubmedIndex(path=index_path, embedder=embedder)
+
+    files: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(path.glob("*.xml")) + sorted(path.glob("*.xml.gz")))
+        elif path.exists():
+            files.append(path)
+        else:
+            console.print(f"[red]Skipping missing path: {path}")
+    files.sort(key=lambda p: p.name)
+
+    totals = {"upserted": 0, "deleted": 0}
+    with Progress(
+        SpinnerColumn(), TextColumn("[bold blue]{task.description}"), console=console
+    ) as progress:
+        task = progress.add_task("Loading PubMed files...", total=len(files))
+        for file_path in files:
+            progress.update(task, description=f"Loading {file_path.name}")
+            try:
+                stats = index.ingest_file(file_path, batch_size=batch_size)
+            except Exception as e:
+                console.print(f"[red]Error loading {file_path}: {e}")
+                continue
+            totals["upserted"] += stats["upserted"]
+            totals["deleted"] += stats["deleted"]
+            progress.advance(task)
+
+        progress.update(task, description="Optimizing full-text index...")
+        index.optimize()
+
+    console.print(
+        Panel.fit(
+            f"[bold green]{totals['upserted']} articles upserted, "
+            f"{totals['deleted']} deleted, {index.count()} in index",
+            title="PubMed Index Loaded",
+        )
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Load PubMed baseline/update XML files into the local index"
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="PubMed .xml/.xml.gz files or directories"
+    )
+    parser.add_argument(
+        "--index-path",
+        default=str(PUBMED_INDEX_PATH),
+        help="Directory of the local PubMed index",
+    )
+    parser.add_argument(
+        "--embed", action="store_true", help="Also build the vector index"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="Records written per batch"
+    )
+    args = parser.parse_args()
+
+    load_pubmed(
+        args.paths,
+        index_path=args.index_path,
+        embed=args.embed,
+        batch_size=args.batch_size,
+    )
@@ -0,0 +1,180 @@
+"""
+CPU-local embedder for the HALO Agent Interface.
+
+Runs a (preferably quantised) ONNX export of a sentence embedding model, such
+as bge-small or all-MiniLM, with onnxruntime on the CPU. Ingestion and
+knowledge search then work without network access. Select it with an
+``onnx:<model>`` embedder id; the model is loaded from
+``$HALO_LOCAL_MODELS_DIR/<model>``, a directory with the ONNX file and the
+``tokenizer.json`` of the model (the layout of Hugging Face ONNX exports).
+
+Batches are sorted by length, so little compute goes into padding, and run
+on a thread pool: onnxruntime releases the GIL, and one single-threaded
+session run per core beats one run spread over all cores for small models.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.base import Embedder
+from agno.utils.log import log_debug, logger
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:
+    onnxruntime = None
+    Tokenizer = None
+
+LOCAL_MODELS_DIR = Path(os.getenv("HALO_LOCAL_MODELS_DIR", str(Path.home() / "halo_models")))
+# Inference threads; each runs one batch at a time
+LOCAL_EMBEDDING_THREADS = int(os.getenv("HALO_LOCAL_EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+
+# Quantised exports first: several times faster on CPU at nearly the same quality
+MODEL_FILES = [
+    "model_quantized.onnx",
+    "model_int8.onnx",
+    "model_qint8_avx512_vnni.onnx",
+    "model.onnx",
+]
+
+
+def find_model_file(model_dir: Path) -> Path:
+    for directory in (model_dir, model_dir / "onnx"):
+        for name in MODEL_FILES:
+            if directory.joinpath(name).exists():
+                return directory / name
+    raise FileNotFoundError(f"No ONNX model ({', '.join(MODEL_FILES)}) found in {model_dir}")
+
+
+@dataclass
+class OnnxEmbedder(Embedder):
+    """Embedder running a local ONNX sentence embedding model on the CPU.
+
+    Args:
+        id: Model name, also the directory name below ``LOCAL_MODELS_DIR``
+        model_path: Directory of the model, if not below ``LOCAL_MODELS_DIR``
+        dimensions: Vector size; read from the model's ``config.json`` if not set
+        max_length: Tokens per text; longer texts are truncated
+        batch_size: Texts per inference batch
+        num_threads: Batches run in parallel
+        pooling: ``mean`` over the tokens, or ``cls`` for models trained on the first token
+    """
+
+    id: str = "bge-small-en-v1.5"
+    model_path: Optional[str] = None
+    dimensions: Optional[int] = None
+    max_length: int = 512
+    batch_size: int = 32
+    num_threads: int = LOCAL_EMBEDDING_THREADS
+    pooling: str = "mean"
+
+    def __post_init__(self):
+        if onnxruntime is None or Tokenizer is None:
+            raise ImportError(
+                "`onnxruntime` and `tokenizers` not installed. "
+                "Please install using `pip install onnxruntime tokenizers`"
+            )
+        self.model_dir = Path(self.model_path) if self.model_path else LOCAL_MODELS_DIR / self.id
+        self.model_file = find_model_file(self.model_dir)
+        config_path = self.model_dir / "config.json"
+        if self.dimensions is None and config_path.exists():
+            self.dimensions = json.loads(config_path.read_text(encoding="utf-8")).get("hidden_size")
+        self._session = None
+        self._tokenizer = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        if self.dimensions is None:
+            # No config: run the model once to learn its output size
+            self.dimensions = len(self._embed_batch(["dimensions"])[0])
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "OnnxEmbedder":
+        # Agents are deep-copied per run; they share the loaded model
+        return self
+
+    def _load(self) -> Tuple[Any, Any]:
+        with self._lock:
+            if self._session is None:
+                options = onnxruntime.SessionOptions()
+                # Parallelism comes from running batches on several threads
+                options.intra_op_num_threads = 1
+                options.inter_op_num_threads = 1
+                options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self._session = onnxruntime.InferenceSession(
+                    str(self.model_file), options, providers=["CPUExecutionProvider"]
+                )
+                tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+                tokenizer.enable_truncation(max_length=self.max_length)
+                tokenizer.enable_padding()
+                self._tokenizer = tokenizer
+                logger.info(f"Loaded local embedding model {self.model_file}")
+        return self._session, self._tokenizer
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(self.num_threads, 1), thread_name_prefix="onnx-embedding"
+                )
+        return self._executor
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        session, tokenizer = self._load()
+        encodings = tokenizer.encode_batch(texts)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        feed = {model_input.name: inputs[model_input.name] for model_input in session.get_inputs()}
+        output = session.run(None, feed)[0]
+        if output.ndim == 3:
+            if self.pooling == "cls":
+                output = output[:, 0]
+            else:
+                mask = attention_mask[:, :, None].astype(output.dtype)
+                output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        return (output / np.clip(norms, 1e-12, None)).tolist()
+
+    def get_embeddings_batch(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Embed texts in parallel batches of similar length, returned in input order."""
+        if not texts:
+            return []
+        batch_size = batch_size or self.batch_size
+        # Similar lengths in a batch keep padding, and so wasted compute, low
+        order = sorted(range(len(texts)), key=lambda index: len(texts[index]))
+        batches = [order[start : start + batch_size] for start in range(0, len(order), batch_size)]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        if len(batches) == 1:
+            vectors_per_batch = [self._embed_batch([texts[index] for index in batches[0]])]
+        else:
+            vectors_per_batch = self._get_executor().map(
+                lambda batch: self._embed_batch([texts[index] for index in batch]), batches
+            )
+        for batch, vectors in zip(batches, vectors_per_batch):
+            for index, vector in zip(batch, vectors):
+                results[index] = vector
+        log_debug(f"Embedded {len(texts)} texts locally in {len(batches)} batches")
+        return results
+
+    def get_embedding(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        # Local inference has no billed usage
+        return self.get_embedding(text), None
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.get_embedding, text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return await asyncio.to_thread(self.get_embedding_and_usage, text)
@@ -0,0 +1,397 @@
+"""
+Deterministic mock model provider for the HALO Agent Interface.
+
+Select it with a ``mock:<profile>`` model id (e.g. ``mock:fast``) wherever a
+``provider:model`` id is accepted, and with ``mock:<name>`` as embedder id.
+Responses, latencies, tool calls, token usage and injected errors follow the
+selected profile and are reproducible for the same sequence of calls, so load
+and performance tests run without API quota or network access.
+
+Extra profiles can be defined in a JSON file referenced by the
+``MOCK_MODEL_PROFILES`` environment variable, e.g.::
+
+    {"pubmed": {"tool_calls": [{"name": "search_pubmed", "arguments": {"query": "{input}"}}],
+                "first_token_latency": {"distribution": "lognormal", "median": 1.2, "sigma": 0.4}}}
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Literal, Optional, Tuple, Type, Union, get_args, get_origin
+
+from agno.exceptions import ModelProviderError
+from agno.knowledge.embedder.base import Embedder
+from agno.models.base import Model
+from agno.models.message import Message
+from agno.models.metrics import Metrics
+from agno.models.response import ModelResponse
+from agno.utils.log import log_debug, logger
+from pydantic import BaseModel
+
+# Latency specs: {"distribution": "fixed", "value": s}, {"distribution": "uniform", "low": s, "high": s}
+# or {"distribution": "lognormal", "median": s, "sigma": x}
+NO_LATENCY = {"distribution": "fixed", "value": 0.0}
+
+MOCK_PROFILES: Dict[str, Dict[str, Any]] = {
+    # No latency at all: for CI and functional tests
+    "fast": {},
+    # Roughly the shape of a hosted frontier model
+    "realistic": {
+        "first_token_latency": {"distribution": "lognormal", "median": 0.8, "sigma": 0.4},
+        "token_latency": {"distribution": "uniform", "low": 0.01, "high": 0.03},
+        "cached_ratio": 0.5,
+    },
+    "slow": {
+        "first_token_latency": {"distribution": "lognormal", "median": 6.0, "sigma": 0.5},
+        "token_latency": {"distribution": "fixed", "value": 0.05},
+    },
+    # Realistic latencies with a share of rate limit and server errors
+    "flaky": {
+        "first_token_latency": {"distribution": "lognormal", "median": 0.8, "sigma": 0.6},
+        "token_latency": {"distribution": "uniform", "low": 0.01, "high": 0.03},
+        "error_rate": 0.2,
+    },
+}
+
+DEFAULT_RESPONSE_TEMPLATE = "Mock response from {model} to: {input}"
+
+
+def load_mock_profiles() -> Dict[str, Dict[str, Any]]:
+    """Return the built-in profiles, extended by the MOCK_MODEL_PROFILES file if set."""
+    profiles = dict(MOCK_PROFILES)
+    profiles_path = os.getenv("MOCK_MODEL_PROFILES")
+    if profiles_path:
+        try:
+            with open(profiles_path, "r") as f:
+                profiles.update(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"Could not load mock model profiles from {profiles_path}: {e}")
+    return profiles
+
+
+def sample_latency(spec: Optional[Dict[str, Any]], rng: random.Random) -> float:
+    """Draw a latency in seconds from a latency spec."""
+    spec = spec or NO_LATENCY
+    distribution = spec.get("distribution", "fixed")
+    if distribution == "uniform":
+        return rng.uniform(spec.get("low", 0.0), spec.get("high", 0.0))
+    if distribution == "lognormal":
+        median = spec.get("median", 0.0)
+        if median <= 0:
+            return 0.0
+        return rng.lognormvariate(math.log(median), spec.get("sigma", 0.0))
+    return float(spec.get("value", 0.0))
+
+
+def estimate_tokens(text: str) -> int:
+    # Close enough to BPE token counts for English text
+    return max(1, len(text) // 4) if text else 0
+
+
+def _message_text(message: Message) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    if message.content is None:
+        return ""
+    return json.dumps(message.content, default=str)
+
+
+def _example_value(annotation: Any) -> Any:
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Literal:
+        return args[0]
+    if origin is Union:
+        if type(None) in args:
+            return None
+        return _example_value(args[0])
+    if origin in (list, List, tuple, Tuple, set):
+        return []
+    if origin in (dict, Dict):
+        return {}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return example_for_schema(annotation)
+    return {bool: False, int: 0, float: 0.0, str: "mock"}.get(annotation)
+
+
+def example_for_schema(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Build the fields of a minimal valid instance of an output schema."""
+    example = {}
+    for name, model_field in schema.model_fields.items():
+        if model_field.is_required():
+            example[name] = _example_value(model_field.annotation)
+        else:
+            example[name] = model_field.get_default(call_default_factory=True)
+    return json.loads(schema.model_validate(example).model_dump_json())
+
+
+@dataclass
+class MockModel(Model):
+    """Model that replays a mock profile instead of calling a provider."""
+
+    id: str = "fast"
+    name: str = "MockModel"
+    provider: str = "Mock"
+    # Output schemas are answered with a valid instance, like native structured outputs
+    supports_native_structured_outputs: bool = True
+
+    # Profile settings; unset values come from the profile named by ``id``
+    response_template: Optional[str] = None
+    first_token_latency: Optional[Dict[str, Any]] = None
+    token_latency: Optional[Dict[str, Any]] = None
+    # Tool calls made on the first model call of a run, if the tools are offered
+    tool_calls: Optional[List[Dict[str, Any]]] = None
+    error_rate: Optional[float] = None
+    cached_ratio: Optional[float] = None
+    seed: int = 0
+
+    _calls: Any = field(default_factory=itertools.count, init=False, repr=False)
+
+    def __post_init__(self):
+        super().__post_init__()
+        profile = load_mock_profiles().get(self.id)
+        if profile is None:
+            raise ValueError(f"Unknown mock model profile: {self.id}")
+        for key, value in profile.items():
+            if getattr(self, key, None) is None:
+                setattr(self, key, value)
+        self.response_template = self.response_template or DEFAULT_RESPONSE_TEMPLATE
+        self.error_rate = self.error_rate or 0.0
+        self.cached_ratio = self.cached_ratio or 0.0
+        self.tool_calls = self.tool_calls or []
+
+    def _rng(self, messages: List[Message]) -> random.Random:
+        # Same calls in the same order give the same latencies and errors
+        digest = hashlib.sha256("\n".join(_message_text(m) for m in messages).encode()).hexdigest()
+        return random.Random(f"{self.seed}:{next(self._calls)}:{digest}")
+
+    def _plan(
+        self,
+        messages: List[Message],
+        response_format: Optional[Union[Dict, Type[BaseModel]]],
+        tools: Optional[List[Dict[str, Any]]],
+        rng: random.Random,
+    ) -> Dict[str, Any]:
+        """Decide the full response of one model call."""
+        if self.error_rate and rng.random() < self.error_rate:
+            status_code = rng.choice([429, 500, 503])
+            raise ModelProviderError(
+                message=f"Injected mock error ({status_code})",
+                status_code=status_code,
+                model_name=self.name,
+                model_id=self.id,
+            )
+
+        user_input = next((_message_text(m) for m in reversed(messages) if m.role == "user"), "")
+        tool_results = [_message_text(m) for m in messages if m.role == "tool"]
+        offered = {
+            tool.get("function", {}).get("name") for tool in tools or [] if tool.get("type") == "function"
+        }
+
+        tool_calls = []
+        if messages and messages[-1].role != "tool":
+            for index, call in enumerate(self.tool_calls):
+                if call.get("name") not in offered:
+                    continue
+                arguments = {
+                    key: value.format(input=user_input[:200]) if isinstance(value, str) else value
+                    for key, value in (call.get("arguments") or {}).items()
+                }
+                tool_calls.append(
+                    {
+                        "id": f"call_mock_{rng.getrandbits(32):08x}_{index}",
+                        "type": "function",
+                        "function": {"name": call["name"], "arguments": json.dumps(arguments)},
+                    }
+                )
+
+        content = None
+        parsed = None
+        if not tool_calls:
+            if isinstance(response_format, type) and issubclass(response_format, BaseModel):
+                parsed = response_format.model_validate(example_for_schema(response_format))
+                content = parsed.model_dump_json()
+            else:
+                content = self.response_template.format(
+                    model=self.id,
+                    input=user_input[:200],
+                    tool_results=" ".join(tool_results)[:1000],
+                )
+
+        input_tokens = sum(estimate_tokens(_message_text(m)) for m in messages)
+        output_tokens = estimate_tokens(content or json.dumps(tool_calls))
+        return {
+            "content": content,
+            "parsed": parsed,
+            "tool_calls": tool_calls,
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "cached_tokens": int(input_tokens * self.cached_ratio),
+            },
+            "first_token_latency": sample_latency(self.first_token_latency, rng),
+            "token_latencies": [
+                sample_latency(self.token_latency, rng) for _ in range(output_tokens)
+            ],
+        }
+
+    @staticmethod
+    def _chunks(content: Optional[str]) -> List[str]:
+        return re.findall(r"\S+\s*|\s+", content) if content else []
+
+    def _get_metrics(self, usage: Dict[str, int]) -> Metrics:
+        metrics = Metrics()
+        metrics.input_tokens = usage["input_tokens"]
+        metrics.output_tokens = usage["output_tokens"]
+        metrics.total_tokens = usage["input_tokens"] + usage["output_tokens"]
+        metrics.cache_read_tokens = usage["cached_tokens"]
+        return metrics
+
+    def _parse_provider_response(self, response: Dict[str, Any], **kwargs) -> ModelResponse:
+        model_response = ModelResponse(role="assistant")
+        model_response.content = response.get("content")
+        model_response.parsed = response.get("parsed")
+        model_response.tool_calls = response.get("tool_calls") or []
+        if response.get("usage"):
+            model_response.response_usage = self._get_metrics(response["usage"])
+        return model_response
+
+    def _parse_provider_response_delta(self, response: Dict[str, Any]) -> ModelResponse:
+        return self._parse_provider_response(response)
+
+    def _deltas(self, plan: Dict[str, Any]) -> Iterator[Tuple[float, Dict[str, Any]]]:
+        """Yield (delay, delta) pairs; usage is sent with the last delta."""
+        chunks = self._chunks(plan["content"])
+        token_latencies = plan["token_latencies"]
+        per_chunk = sum(token_latencies) / len(chunks) if chunks else 0.0
+        deltas: List[Dict[str, Any]] = [{"content": chunk} for chunk in chunks]
+        if plan["parsed"] is not None and deltas:
+            deltas[-1]["parsed"] = plan["parsed"]
+        if plan["tool_calls"]:
+            deltas.append({"tool_calls": plan["tool_calls"]})
+        if not deltas:
+            deltas.append({})
+        deltas[-1]["usage"] = plan["usage"]
+        for index, delta in enumerate(deltas):
+            yield (plan["first_token_latency"] if index == 0 else per_chunk), delta
+
+    def invoke(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[Any] = None,
+    ) -> ModelResponse:
+        if run_response and run_response.metrics:
+            run_response.metrics.set_time_to_first_token()
+        assistant_message.metrics.start_timer()
+        plan = self._plan(messages, response_format, tools, self._rng(messages))
+        time.sleep(plan["first_token_latency"] + sum(plan["token_latencies"]))
+        assistant_message.metrics.stop_timer()
+        log_debug(f"Mock model {self.id} responded")
+        return self._parse_provider_response(plan)
+
+    async def ainvoke(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[Any] = None,
+    ) -> ModelResponse:
+        if run_response and run_response.metrics:
+            run_response.metrics.set_time_to_first_token()
+        assistant_message.metrics.start_timer()
+        plan = self._plan(messages, response_format, tools, self._rng(messages))
+        await asyncio.sleep(plan["first_token_latency"] + sum(plan["token_latencies"]))
+        assistant_message.metrics.stop_timer()
+        return self._parse_provider_response(plan)
+
+    def invoke_stream(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[Any] = None,
+    ) -> Iterator[ModelResponse]:
+        if run_response and run_response.metrics:
+            run_response.metrics.set_time_to_first_token()
+        assistant_message.metrics.start_timer()
+        plan = self._plan(messages, response_format, tools, self._rng(messages))
+        for delay, delta in self._deltas(plan):
+            time.sleep(delay)
+            yield self._parse_provider_response_delta(delta)
+        assistant_message.metrics.stop_timer()
+
+    async def ainvoke_stream(
+        self,
+        messages: List[Message],
+        assistant_message: Message,
+        response_format: Optional[Union[Dict, Type[BaseModel]]] = None,
+        tools: Optional[List[Dict[str, Any]]] = None,
+        tool_choice: Optional[Union[str, Dict[str, Any]]] = None,
+        run_response: Optional[Any] = None,
+    ) -> AsyncIterator[ModelResponse]:
+        if run_response and run_response.metrics:
+            run_response.metrics.set_time_to_first_token()
+        assistant_message.metrics.start_timer()
+        plan = self._plan(messages, response_format, tools, self._rng(messages))
+        for delay, delta in self._deltas(plan):
+            await asyncio.sleep(delay)
+            yield self._parse_provider_response_delta(delta)
+        assistant_message.metrics.stop_timer()
+
+
+@dataclass
+class MockEmbedder(Embedder):
+    """Deterministic embedder based on feature hashing of the words of a text.
+
+    Texts sharing words get similar vectors, so retrieval and caching behave
+    plausibly without an embedding API.
+    """
+
+    id: str = "mock"
+    dimensions: Optional[int] = 1536
+    latency: Optional[Dict[str, Any]] = None
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for word in re.findall(r"\w+", text.lower()):
+            digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    def _usage(self, text: str) -> Dict[str, int]:
+        tokens = estimate_tokens(text)
+        return {"prompt_tokens": tokens, "total_tokens": tokens}
+
+    def _delay(self, text: str) -> float:
+        return sample_latency(self.latency, random.Random(text))
+
+    def get_embedding(self, text: str) -> List[float]:
+        time.sleep(self._delay(text))
+        return self._embed(text)
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), self._usage(text)
+
+    async def async_get_embedding(self, text: str) -> List[float]:
+        await asyncio.sleep(self._delay(text))
+        return self._embed(text)
+
+    async def async_get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return await self.async_get_embedding(text), self._usage(text)
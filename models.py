@@ -0,0 +1,87 @@
+"""
+Model factory for the HALO Agent Interface
+"""
+
+import os
+from typing import Optional
+
+from agno.knowledge.embedder.base import Embedder
+from agno.knowledge.embedder.openai import OpenAIEmbedder
+
+# from agno.models.anthropic import Claude
+# from agno.models.google import Gemini
+# from agno.models.groq import Groq
+from agno.models.base import Model
+from agno.models.openai import OpenAIChat
+
+from deadlines import STAGE_TIMEOUTS, HedgedEmbedder
+from embedding_cache import CachedEmbedder
+
+# Embedder used for the knowledge base and the PubMed index, e.g. onnx:bge-small-en-v1.5
+# for a local model or mock:hash for tests
+DEFAULT_EMBEDDER_ID = os.getenv("HALO_EMBEDDER", "openai:text-embedding-3-small")
+
+
+def create_model(model_id: str, prompt_cache_key: Optional[str] = None) -> Model:
+    """Create a model instance from a ``provider:model`` identifier.
+
+    Args:
+        model_id: Model identifier, e.g. ``openai:gpt-5``
+        prompt_cache_key: Optional key that groups requests sharing a static
+            prompt prefix, so the provider can serve them from its prompt cache
+    """
+    # Parse model provider and name
+    provider, model_name = model_id.split(":")
+
+    # Create model class based on provider
+    model = None
+    if provider == "openai":
+        model = OpenAIChat(
+            id=model_name,
+            timeout=STAGE_TIMEOUTS["model"],
+            extra_body=(
+                {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else None
+            ),
+        )
+    elif provider == "google":
+        model = Gemini(id=model_name)
+    elif provider == "anthropic":
+        model = Claude(id=model_name)
+    elif provider == "groq":
+        model = Groq(id=model_name)
+    elif provider == "mock":
+        from mock_models import MockModel
+
+        model = MockModel(id=model_name)
+    else:
+        raise ValueError(f"Unsupported model provider: {provider}")
+    if model is None:
+        raise ValueError(f"Failed to create model instance for {model_id}")
+    return model
+
+
+def create_embedder(embedder_id: str = DEFAULT_EMBEDDER_ID) -> Embedder:
+    """Create an embedder from a ``provider:model`` identifier.
+
+    Args:
+        embedder_id: Embedder identifier, e.g. ``openai:text-embedding-3-small``
+    """
+    provider, model_name = embedder_id.split(":")
+    if provider == "openai":
+        embedder = OpenAIEmbedder(
+            id=model_name, client_params={"timeout": STAGE_TIMEOUTS["embedding"]}
+        )
+    elif provider == "onnx":
+        # Runs on the CPU without network access, e.g. onnx:bge-small-en-v1.5
+        from local_embedder import OnnxEmbedder
+
+        embedder = OnnxEmbedder(id=model_name)
+    elif provider == "mock":
+        from mock_models import MockEmbedder
+
+        embedder = MockEmbedder(id=model_name)
+    else:
+        raise ValueError(f"Unsupported embedder provider: {provider}")
+    # Chunks and queries embedded before are served from the local cache; the
+    # remaining query embeddings sit on the request path: bound and hedge them
+    return HedgedEmbedder(embedder=CachedEmbedder(embedder=embedder))
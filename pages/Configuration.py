@@ -104,8 +104,58 @@ def main():
             key="model_selector_config",
         )
 
+        # Triage model routing
+        st.subheader("Triage Model")
+        st.write(
+            "A fast model classifies each request first. Small talk, memory updates and unusable images "
+            "are handled by it; everything else is escalated to the default model."
+        )
+        router_enabled = st.checkbox(
+            "Enable triage routing",
+            value=model_config.get("router_enabled", True),
+            key="router_enabled_config",
+        )
+        current_triage = model_config.get("triage_model", "gpt-5-mini")
+        triage_options = ["gpt-5-mini", "gpt-4o-mini"]
+        selected_triage_model = st.selectbox(
+            "Select a triage model",
+            options=triage_options,
+            index=(
+                triage_options.index(current_triage)
+                if current_triage in triage_options
+                else 0
+            ),
+            key="triage_model_selector_config",
+            disabled=not router_enabled,
+        )
+        router_threshold = st.slider(
+            "Minimum triage confidence",
+            min_value=0.5,
+            max_value=1.0,
+            value=float(model_config.get("router_confidence_threshold", 0.8)),
+            step=0.05,
+            key="router_threshold_config",
+            disabled=not router_enabled,
+        )
+
+        # Semantic response cache
+        st.subheader("Response Cache")
+        st.write(
+            "Answer repeated standalone questions from earlier answers instead of running the team again. "
+            "Applies to new sessions."
+        )
+        semantic_cache = st.checkbox(
+            "Enable response cache",
+            value=model_config.get("semantic_cache", False),
+            key="semantic_cache_config",
+        )
+
         # Save model configuration
         if st.button("Save Model Configuration", type="primary"):
+            model_config["semantic_cache"] = semantic_cache
+            model_config["router_enabled"] = router_enabled
+            model_config["triage_model"] = selected_triage_model
+            model_config["router_confidence_threshold"] = router_threshold
             model_config["default_model"] = selected_model_key
             save_model_config(model_config)
             st.success(f"Default model set to {selected_model_key}")
@@ -1,3 +1,4 @@
+import asyncio
 import os
 import io
 import streamlit as st
@@ -7,7 +8,18 @@ from agno.media import Image as AgnoImage
 from agents.medical_agent import agent
 from PIL import Image as PILImage
 from config import config
+from router import aroute_image_request
+from async_runtime import run_async
+from deadlines import request_deadline
+from literature_prefetch import (
+    LiteraturePrefetcher,
+    describe_dicom,
+    find_pubmed_toolkit,
+)
+from telemetry import report_prompt_cache_usage
+from accounting import record_run
 import datetime
+from typing import Optional
 
 
 def load_default_model() -> str:
@@ -92,6 +104,51 @@ st.set_page_config(
 st.logo(config.LOGO_TEXT_PATH, size="large", icon_image=config.LOGO_ICON_PATH)
 
 
+async def analyze_image(
+    prompt: str,
+    agno_image: AgnoImage,
+    model: str,
+    modality: Optional[str] = None,
+    body_part: Optional[str] = None,
+):
+    """Triage and analyse an image on the shared event loop.
+
+    The whole analysis shares one request budget; a late analysis is cut off
+    instead of running for minutes.
+    """
+    with request_deadline() as deadline:
+        # Warm the PubMed cache for the Evidence-Based Context section
+        prefetcher = LiteraturePrefetcher(find_pubmed_toolkit(agent.tools))
+        queries = prefetcher.start(modality, body_part)
+        try:
+            # Cheap triage first: unusable images are rejected without the heavy model
+            decision = await aroute_image_request(prompt, [agno_image], model)
+            if decision.reply is not None:
+                return decision.reply
+            if not queries:
+                queries = prefetcher.start(decision.modality, decision.body_part)
+            if queries:
+                prompt += (
+                    "\n\nSuggested PubMed queries for the Evidence-Based Context section: "
+                    + "; ".join(queries)
+                )
+            try:
+                response = await asyncio.wait_for(
+                    agent.arun(prompt, images=[agno_image], model=model),
+                    timeout=deadline.remaining(),
+                )
+            except asyncio.TimeoutError:
+                return (
+                    f"The analysis did not finish within {deadline.budget:.0f} seconds. "
+                    "Please try again."
+                )
+            report_prompt_cache_usage(response, agent.name)
+            record_run(response)
+            return response
+        finally:
+            prefetcher.cancel()
+
+
 def main():
     with st.sidebar:
         st.info(
@@ -144,6 +201,7 @@ def main():
         with image_container:
             # Check if file is DICOM or regular image
             file_extension = uploaded_file.name.split(".")[-1].lower()
+            modality, body_part = None, None
 
             if (
                 file_extension in ["dicom", "dcm"]
@@ -158,6 +216,7 @@ def main():
                         if anonymize_dicom_locally
                         else dicom_data
                     )
+                    modality, body_part = describe_dicom(dicom_for_use)
 
                     img_array = dicom_for_use.pixel_array
                     img_array = img_array / img_array.max() * 255
@@ -301,7 +360,9 @@ def main():
                             + "Answer in the language of the user. If it is not given, answer English."
                         )
                         model = load_default_model()
-                        response = agent.run(prompt, images=[agno_image], model=model)
+                        response = run_async(
+                            analyze_image(prompt, agno_image, model, modality, body_part)
+                        )
                         st.markdown("### :material/diagnosis: Analysis Results")
                         st.markdown("---")
                         if hasattr(response, "content"):
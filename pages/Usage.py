@@ -0,0 +1,186 @@
+import os
+import sys
+import time
+
+import pandas as pd
+import streamlit as st
+
+# Add the parent directory to the path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import config
+from accounting import DIMENSIONS, get_usage_recorder
+from deadlines import stage_latencies
+from knowledge_index import get_index_stats
+from response_cache import get_response_cache_stats
+from retrieval_cache import get_retrieval_cache
+
+# Page config
+st.set_page_config(
+    page_title=f"{config.APP_NAME} - Usage",
+    page_icon=config.APP_ICON,
+    layout="wide",
+    menu_items=config.MENU_ITEMS,
+)
+
+# Logo in sidebar
+st.logo(config.LOGO_TEXT_PATH, size="large", icon_image=config.LOGO_ICON_PATH)
+
+# Page title
+one_cola = st.columns([1])[0]
+with one_cola:
+    col1a, col2a = st.columns([1, 5])
+
+    with col1a:
+        st.image(config.LOGO_TEAM_PATH, width=100)
+    with col2a:
+        st.markdown(
+            """
+        # Corpus Analyzer
+        ## Usage
+        """,
+            unsafe_allow_html=True,
+        )
+
+TIME_WINDOWS = {
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 24 * 3600,
+    "Last 30 days": 30 * 24 * 3600,
+    "All time": None,
+}
+
+GROUP_LABELS = {
+    "agent": "Agent",
+    "model": "Model",
+    "user_id": "User",
+    "session_id": "Session",
+    "kind": "Call type",
+    "name": "Tool / call",
+}
+
+
+def main():
+    recorder = get_usage_recorder()
+    # Show events recorded moments ago, not only the last written batch
+    recorder.flush(timeout=2.0)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        window = st.selectbox("Time window", list(TIME_WINDOWS), index=1)
+    with col2:
+        group_by = st.selectbox(
+            "Group by",
+            [dimension for dimension in DIMENSIONS if dimension in GROUP_LABELS],
+            format_func=GROUP_LABELS.get,
+        )
+    since = time.time() - TIME_WINDOWS[window] if TIME_WINDOWS[window] else None
+
+    totals = recorder.summarize(group_by="kind", since=since)
+    if not totals:
+        st.info("No usage has been recorded yet.")
+        return
+
+    input_tokens = sum(row["input_tokens"] or 0 for row in totals)
+    cached_tokens = sum(row["cached_tokens"] or 0 for row in totals)
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Runs", int(sum(row["runs"] or 0 for row in totals)))
+    metric_cols[1].metric(
+        "Tokens (in / out)",
+        f"{input_tokens:,} / {sum(row['output_tokens'] or 0 for row in totals):,}",
+    )
+    metric_cols[2].metric(
+        "Prompt cache hit rate",
+        f"{cached_tokens / input_tokens:.0%}" if input_tokens else "–",
+    )
+    metric_cols[3].metric(
+        "Estimated cost", f"${sum(row['cost'] or 0 for row in totals):.4f}"
+    )
+
+    st.subheader(f"Usage by {GROUP_LABELS[group_by].lower()}")
+    summary = pd.DataFrame(recorder.summarize(group_by=group_by, since=since))
+    summary = summary.rename(columns={"group": GROUP_LABELS[group_by]})
+    st.dataframe(
+        summary,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "cost": st.column_config.NumberColumn("Cost (USD)", format="$%.4f"),
+            "call_time": st.column_config.NumberColumn("Call time (s)", format="%.1f"),
+            "run_time": st.column_config.NumberColumn("Run time (s)", format="%.1f"),
+        },
+    )
+    st.caption(
+        "Costs are estimates from list prices; models without a known price count as $0. "
+        "Override prices with the HALO_MODEL_PRICES environment variable."
+    )
+
+    latencies = stage_latencies.get_stats()
+    if latencies:
+        st.subheader("Stage latencies (this process)")
+        st.dataframe(
+            pd.DataFrame(latencies).T.rename_axis("Stage").reset_index(),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+    for index_stats in get_index_stats():
+        st.subheader(f"Knowledge index: {index_stats['table']}")
+        recall = index_stats["recall"] or {}
+        latency = index_stats["latency"] or {}
+        index_cols = st.columns(4)
+        index_cols[0].metric("Chunks", f"{index_stats['rows']:,}")
+        index_cols[1].metric(
+            "Vector index",
+            index_stats["indexes"].get("vector_idx", {}).get("type", "none (exact search)"),
+        )
+        index_cols[2].metric(
+            f"Recall@{recall.get('k', 10)}",
+            f"{recall['recall_at_k']:.1%}" if recall else "–",
+        )
+        index_cols[3].metric(
+            "Search p95",
+            f"{latency['p95'] * 1000:.0f} ms" if latency.get("p95") is not None else "–",
+        )
+        if index_stats["indexes"]:
+            st.dataframe(
+                pd.DataFrame(index_stats["indexes"]).T.rename_axis("Index").reset_index(),
+                hide_index=True,
+                use_container_width=True,
+            )
+        if index_stats["search"]:
+            st.caption(f"Tuned search parameters: {index_stats['search']}")
+
+    retrieval = get_retrieval_cache().get_stats()
+    if retrieval["result_hits"] + retrieval["result_persisted_hits"] + retrieval["result_misses"]:
+        st.subheader("Retrieval cache (this process)")
+        retrieval_cols = st.columns(3)
+        retrieval_cols[0].metric("Result hit rate", f"{retrieval['result_hit_rate']:.0%}")
+        retrieval_cols[1].metric("Query embedding hit rate", f"{retrieval['embedding_hit_rate']:.0%}")
+        retrieval_cols[2].metric("Cached results", f"{retrieval['results_cached']:,}")
+        st.caption(
+            "Cached results are invalidated by every write to the knowledge table. "
+            "Set HALO_RETRIEVAL_CACHE=memory to keep them out of the SQLite file."
+        )
+
+    responses = get_response_cache_stats()
+    if responses is not None:
+        st.subheader("Response cache (this process)")
+        response_cols = st.columns(4)
+        response_cols[0].metric("Hit rate", f"{responses['hit_rate']:.0%}")
+        response_cols[1].metric("Hits", f"{responses['hits']:,} of {responses['lookups']:,}")
+        response_cols[2].metric("Latency saved", f"{responses['latency_saved']:.1f} s")
+        response_cols[3].metric("Cached answers", f"{responses['entries']:,}")
+        st.caption(
+            "Repeated standalone questions are answered from earlier answers of the same scope. "
+            "Answers built from user memories or the session summary are never cached."
+        )
+    else:
+        st.caption("The response cache is off. Turn it on under Configuration or with HALO_SEMANTIC_CACHE=1.")
+
+    with st.expander("Recent events"):
+        events = pd.DataFrame(recorder.recent_events(limit=200))
+        events["created_at"] = pd.to_datetime(events["created_at"], unit="s")
+        st.dataframe(events, hide_index=True, use_container_width=True)
+
+
+if __name__ == "__main__":
+    main()
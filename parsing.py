@@ -0,0 +1,238 @@
+"""
+Parallel document parsing for knowledge ingestion.
+
+Text extraction from PDF, DOCX and CSV files is CPU-bound and was done one
+file at a time. Files, and page ranges of large PDFs, are parsed in a pool of
+worker processes instead; parsed files are handed back as soon as they are
+complete, so chunks of early files are embedded while later ones are still
+being parsed. Very large PDFs are streamed as page windows instead, so they
+are never held in memory as a whole.
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agno.knowledge.document import Document
+from agno.knowledge.reader import Reader
+from agno.utils.log import log_debug, logger
+
+from chunking import get_chunking_strategy
+
+# Worker processes for parsing; 1 parses in the calling thread
+PARSE_WORKERS = int(os.getenv("HALO_PARSE_WORKERS", str(os.cpu_count() or 1)))
+# PDFs with more pages are split into page ranges parsed in parallel
+PDF_PAGES_PER_TASK = 50
+
+# PDFs with more pages are streamed window by window instead of parsed as a whole
+STREAM_PDF_MIN_PAGES = int(os.getenv("HALO_STREAM_PDF_PAGES", "200"))
+
+SUPPORTED_FORMATS = [".txt", ".md", ".pdf", ".csv", ".docx"]
+
+
+def get_reader(suffix: str) -> Reader:
+    """Return the reader for a file extension such as ``.pdf``.
+
+    Readers are imported on demand: each needs its own optional dependency.
+    Chunks are cut by the token-aware strategy configured for the format.
+    """
+    suffix = suffix.lower()
+    if suffix == ".pdf":
+        from agno.knowledge.reader.pdf_reader import PDFReader
+
+        reader = PDFReader()
+    elif suffix == ".csv":
+        from agno.knowledge.reader.csv_reader import CSVReader
+
+        reader = CSVReader()
+    elif suffix == ".docx":
+        from agno.knowledge.reader.docx_reader import DocxReader
+
+        reader = DocxReader()
+    elif suffix in (".txt", ".md"):
+        from agno.knowledge.reader.text_reader import TextReader
+
+        reader = TextReader()
+    else:
+        raise ValueError(f"Unsupported file type: {suffix}")
+    reader.chunking_strategy = get_chunking_strategy(suffix)
+    return reader
+
+
+def read_file(path: str) -> List[Document]:
+    """Parse and chunk a whole file. Runs in a worker process."""
+    file_path = Path(path)
+    return get_reader(file_path.suffix).read(file_path)
+
+
+def read_pdf_pages(path: str, start: int, end: int) -> List[Document]:
+    """Parse and chunk pages ``start`` to ``end`` (exclusive) of a PDF. Runs in a worker process."""
+    from pypdf import PdfReader
+
+    file_path = Path(path)
+    reader = get_reader(".pdf")
+    pdf = PdfReader(file_path)
+    documents = []
+    for page_number in range(start, end):
+        content = pdf.pages[page_number].extract_text() or ""
+        if not content.strip():
+            continue
+        page = Document(
+            name=file_path.stem,
+            id=f"{file_path.stem}_{page_number + 1}",
+            meta_data={"page": page_number + 1},
+            content=content,
+        )
+        documents.extend(reader.chunk_document(page) if reader.chunk else [page])
+    return documents
+
+
+def pdf_page_count(path: Path) -> int:
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+# Started on first use and shared by all parsing of the process
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        # A worker that crashed (e.g. out of memory) breaks the whole pool
+        if _pool is None or getattr(_pool, "_broken", False):
+            # Spawned, not forked: the parent runs Streamlit, LanceDB and event loop threads
+            _pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"Started document parsing pool with {PARSE_WORKERS} workers")
+    return _pool
+
+
+@dataclass
+class _PendingFile:
+    path: Path
+    parts: Dict[int, List[Document]] = field(default_factory=dict)
+    remaining: int = 0
+    error: Optional[BaseException] = None
+
+
+class DocumentParser:
+    """Parses files in worker processes and yields them as they complete.
+
+    Args:
+        max_workers: Worker processes; 1 parses in the calling thread
+        pages_per_task: Page range size large PDFs are split into
+    """
+
+    def __init__(self, max_workers: int = PARSE_WORKERS, pages_per_task: int = PDF_PAGES_PER_TASK):
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
+
+    def _tasks(self, path: Path) -> List[Tuple]:
+        if path.suffix.lower() == ".pdf":
+            try:
+                pages = pdf_page_count(path)
+            except Exception as e:
+                logger.warning(f"Could not count pages of {path}: {e}")
+                pages = 0
+            if pages > self.pages_per_task:
+                return [
+                    (read_pdf_pages, str(path), start, min(start + self.pages_per_task, pages))
+                    for start in range(0, pages, self.pages_per_task)
+                ]
+        return [(read_file, str(path))]
+
+    def parse(self, paths: Iterable[Path]) -> Iterator[Tuple[Path, List[Document], Optional[BaseException]]]:
+        """Parse files, yielding ``(path, documents, error)`` per file in completion order.
+
+        Documents of a PDF split into page ranges are yielded in page order.
+        """
+        paths = list(paths)
+        if self.max_workers <= 1 or (len(paths) == 1 and len(self._tasks(paths[0])) == 1):
+            # Not worth the round trip to a worker process
+            for path in paths:
+                try:
+                    yield path, read_file(str(path)), None
+                except Exception as e:
+                    yield path, [], e
+            return
+
+        pool = _get_pool()
+        pending: Dict[Future, Tuple[_PendingFile, int]] = {}
+        for path in paths:
+            tasks = self._tasks(path)
+            pending_file = _PendingFile(path=path, remaining=len(tasks))
+            for index, (fn, *args) in enumerate(tasks):
+                pending[pool.submit(fn, *args)] = (pending_file, index)
+            log_debug(f"Parsing {path.name} in {len(tasks)} tasks")
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending_file, index = pending.pop(future)
+                try:
+                    pending_file.parts[index] = future.result()
+                except Exception as e:
+                    pending_file.error = pending_file.error or e
+                pending_file.remaining -= 1
+                if pending_file.remaining:
+                    continue
+                if pending_file.error is not None:
+                    yield pending_file.path, [], pending_file.error
+                    continue
+                documents = [
+                    document
+                    for part in sorted(pending_file.parts)
+                    for document in pending_file.parts[part]
+                ]
+                yield pending_file.path, documents, None
+
+    def iter_pdf_pages(
+        self, path: Path, start: int = 0, pages: Optional[int] = None
+    ) -> Iterator[Tuple[int, List[Document]]]:
+        """Stream a PDF as chunked page windows, in page order.
+
+        Only a few windows are parsed ahead of the consumer, so memory stays
+        bounded however long the document is.
+
+        Args:
+            path: The PDF
+            start: First page to parse (0-based), e.g. to resume an interrupted ingest
+            pages: Page count of the PDF, if already known
+
+        Yields:
+            The page after the window (i.e. pages done so far) and the window's chunks
+        """
+        pages = pdf_page_count(path) if pages is None else pages
+        windows = deque(
+            (window_start, min(window_start + self.pages_per_task, pages))
+            for window_start in range(start, pages, self.pages_per_task)
+        )
+        if self.max_workers <= 1:
+            for window_start, window_end in windows:
+                yield window_end, read_pdf_pages(str(path), window_start, window_end)
+            return
+
+        pool = _get_pool()
+        in_flight: Deque[Tuple[int, Future]] = deque()
+        try:
+            while windows or in_flight:
+                while windows and len(in_flight) <= self.max_workers:
+                    window_start, window_end = windows.popleft()
+                    in_flight.append(
+                        (window_end, pool.submit(read_pdf_pages, str(path), window_start, window_end))
+                    )
+                window_end, future = in_flight.popleft()
+                yield window_end, future.result()
+        finally:
+            # Stop parsing ahead when the consumer gives up
+            for _, future in in_flight:
+                future.cancel()
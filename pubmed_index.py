@@ -0,0 +1,437 @@
+"""
+Local PubMed index for the HALO Agent Interface.
+
+Stores PubMed baseline/update records in a local SQLite full-text index
+(FTS5) and, optionally, a LanceDB vector table so literature lookups work
+without network access.
+"""
+
+import gzip
+import json
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+from xml.etree import ElementTree
+
+from agno.knowledge.embedder.base import Embedder
+from agno.utils.log import logger
+
+from ingestion import embedder_signature
+
+# Default location of the local PubMed index, can be overridden via environment
+PUBMED_INDEX_PATH = Path(
+    os.getenv(
+        "PUBMED_INDEX_PATH", os.path.join(os.path.expanduser("~"), "halo_pubmed")
+    )
+)
+
+VECTOR_TABLE_NAME = "pubmed_vectors"
+# Records the embedder of the vector table beside it, so vectors of different models are never mixed
+VECTOR_MANIFEST_NAME = f"{VECTOR_TABLE_NAME}.json"
+
+# Reciprocal rank fusion constant used to merge full-text and vector hits
+RRF_K = 60
+
+
+def _text(elem: Optional[ElementTree.Element]) -> str:
+    """Return the full text content of an element, including nested markup."""
+    if elem is None:
+        return ""
+    return "".join(elem.itertext()).strip()
+
+
+def parse_pubmed_article(article: ElementTree.Element) -> Optional[Dict[str, Any]]:
+    """Parse a single <PubmedArticle> element into a flat record."""
+    pmid = _text(article.find("./MedlineCitation/PMID"))
+    if not pmid:
+        return None
+
+    abstract_parts = []
+    for section in article.findall(".//Abstract/AbstractText"):
+        label = section.get("Label", "")
+        text = _text(section)
+        if text:
+            abstract_parts.append(f"{label}: {text}" if label else text)
+
+    authors = []
+    for author in article.findall(".//AuthorList/Author"):
+        last_name = _text(author.find("LastName"))
+        fore_name = _text(author.find("ForeName"))
+        collective = _text(author.find("CollectiveName"))
+        if last_name:
+            authors.append(f"{last_name}, {fore_name}" if fore_name else last_name)
+        elif collective:
+            authors.append(collective)
+
+    year = _text(article.find(".//JournalIssue/PubDate/Year"))
+    if not year:
+        # MedlineDate looks like "2021 Jan-Feb", keep only the year
+        medline_date = _text(article.find(".//JournalIssue/PubDate/MedlineDate"))
+        year = medline_date[:4] if medline_date else ""
+
+    doi = ""
+    pmc = ""
+    for article_id in article.findall(".//PubmedData/ArticleIdList/ArticleId"):
+        id_type = article_id.get("IdType")
+        if id_type == "doi" and not doi:
+            doi = _text(article_id)
+        elif id_type == "pmc" and not pmc:
+            pmc = _text(article_id)
+
+    return {
+        "pmid": pmid,
+        "title": _text(article.find(".//Article/ArticleTitle")),
+        "abstract": "\n\n".join(abstract_parts),
+        "authors": "; ".join(authors),
+        "journal": _text(article.find(".//Article/Journal/Title")),
+        "year": year,
+        "doi": doi,
+        "pmc": pmc,
+        "mesh_terms": ", ".join(
+            _text(mesh)
+            for mesh in article.findall(".//MeshHeadingList/MeshHeading/DescriptorName")
+        ),
+        "publication_types": ", ".join(
+            _text(pub_type)
+            for pub_type in article.findall(".//PublicationTypeList/PublicationType")
+        ),
+    }
+
+
+def iter_pubmed_file(
+    file_path: Union[str, Path], deleted: Optional[List[str]] = None
+) -> Iterator[Dict[str, Any]]:
+    """Stream records from a PubMed baseline/update XML file.
+
+    The file is parsed incrementally and every processed element is cleared,
+    so memory stays flat regardless of file size. Files ending in ``.gz`` are
+    decompressed on the fly.
+
+    Args:
+        file_path: Path to a ``.xml`` or ``.xml.gz`` file
+        deleted: Optional list that collects PMIDs from <DeleteCitation> blocks
+    """
+    file_path = Path(file_path)
+    opener = gzip.open if file_path.suffix == ".gz" else open
+    with opener(file_path, "rb") as f:
+        in_delete_block = False
+        for event, elem in ElementTree.iterparse(f, events=("start", "end")):
+            if event == "start":
+                if elem.tag == "DeleteCitation":
+                    in_delete_block = True
+                continue
+
+            if elem.tag == "PubmedArticle":
+                record = parse_pubmed_article(elem)
+                elem.clear()
+                if record:
+                    yield record
+            elif elem.tag == "PMID" and in_delete_block:
+                if deleted is not None and elem.text:
+                    deleted.append(elem.text.strip())
+            elif elem.tag == "DeleteCitation":
+                in_delete_block = False
+                elem.clear()
+
+
+def pubmed_index_exists(path: Union[str, Path] = PUBMED_INDEX_PATH) -> bool:
+    """Whether a local PubMed index has been loaded at ``path``."""
+    return (Path(path) / "pubmed.db").exists()
+
+
+def pubmed_vectors_exist(path: Union[str, Path] = PUBMED_INDEX_PATH) -> bool:
+    """Whether ``load_pubmed.py --embed`` has written the vector table at ``path``."""
+    return (Path(path) / f"{VECTOR_TABLE_NAME}.lance").exists()
+
+
+class PubmedIndex:
+    """Local full-text plus vector index over PubMed records."""
+
+    def __init__(
+        self,
+        path: Union[str, Path] = PUBMED_INDEX_PATH,
+        embedder: Optional[Embedder] = None,
+    ):
+        self.path = Path(path)
+        self.path.mkdir(exist_ok=True, parents=True)
+        self.db_path = self.path / "pubmed.db"
+        self.embedder = embedder
+        self._connection: Optional[sqlite3.Connection] = None
+        self._vector_table = None
+        # Whether the vector table was embedded with ``embedder``; checked on first search
+        self._vectors_match: Optional[bool] = None
+        self._create_schema()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                str(self.db_path), check_same_thread=False
+            )
+            self._connection.row_factory = sqlite3.Row
+        return self._connection
+
+    def _create_schema(self) -> None:
+        self.connection.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS articles (
+                pmid TEXT PRIMARY KEY,
+                title TEXT,
+                abstract TEXT,
+                authors TEXT,
+                journal TEXT,
+                year TEXT,
+                doi TEXT,
+                pmc TEXT,
+                mesh_terms TEXT,
+                publication_types TEXT
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, abstract, mesh_terms,
+                content='articles', content_rowid='rowid'
+            );
+            CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts(rowid, title, abstract, mesh_terms)
+                VALUES (new.rowid, new.title, new.abstract, new.mesh_terms);
+            END;
+            CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+                INSERT INTO articles_fts(articles_fts, rowid, title, abstract, mesh_terms)
+                VALUES ('delete', old.rowid, old.title, old.abstract, old.mesh_terms);
+            END;
+            """
+        )
+
+    def count(self) -> int:
+        """Return the number of indexed articles."""
+        return self.connection.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def has_articles(self) -> bool:
+        """Whether any article is indexed; cheaper than ``count`` on a large index."""
+        return self.connection.execute("SELECT 1 FROM articles LIMIT 1").fetchone() is not None
+
+    # ------------------------------------------------------------------
+    # Ingestion
+    # ------------------------------------------------------------------
+
+    def ingest_file(
+        self, file_path: Union[str, Path], batch_size: int = 1000
+    ) -> Dict[str, int]:
+        """Ingest a PubMed baseline or update file.
+
+        Records are written in batches; an existing PMID is replaced so update
+        files supersede baseline records. Citations listed in <DeleteCitation>
+        are removed.
+
+        Returns:
+            Dict[str, int]: Number of upserted and deleted records
+        """
+        deleted: List[str] = []
+        batch: List[Dict[str, Any]] = []
+        upserted = 0
+
+        for record in iter_pubmed_file(file_path, deleted=deleted):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                self._write_batch(batch)
+                upserted += len(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+            upserted += len(batch)
+
+        if deleted:
+            self.delete(deleted)
+
+        logger.info(
+            f"Ingested {file_path}: {upserted} upserted, {len(deleted)} deleted"
+        )
+        return {"upserted": upserted, "deleted": len(deleted)}
+
+    def _write_batch(self, records: List[Dict[str, Any]]) -> None:
+        pmids = [record["pmid"] for record in records]
+        with self.connection:
+            # Delete first so the FTS triggers keep the full-text index in sync
+            self.connection.executemany(
+                "DELETE FROM articles WHERE pmid = ?", [(pmid,) for pmid in pmids]
+            )
+            self.connection.executemany(
+                """
+                INSERT INTO articles (pmid, title, abstract, authors, journal, year,
+                                      doi, pmc, mesh_terms, publication_types)
+                VALUES (:pmid, :title, :abstract, :authors, :journal, :year,
+                        :doi, :pmc, :mesh_terms, :publication_types)
+                """,
+                records,
+            )
+        if self.embedder is not None:
+            self._write_vectors(records)
+
+    def _write_vectors(self, records: List[Dict[str, Any]]) -> None:
+        texts = [f"{record['title']}\n{record['abstract']}" for record in records]
+        if hasattr(self.embedder, "get_embeddings_batch"):
+            vectors = self.embedder.get_embeddings_batch(texts)
+        else:
+            vectors = [self.embedder.get_embedding(text) for text in texts]
+
+        rows = [
+            {"vector": vector, "pmid": record["pmid"]}
+            for record, vector in zip(records, vectors)
+            if vector
+        ]
+        if not rows:
+            return
+
+        table = self._get_vector_table(create_with=rows)
+        if table is not None:
+            self._check_vector_embedder(table, writing=True)
+            pmid_list = ", ".join(f"'{row['pmid']}'" for row in rows)
+            table.delete(f"pmid IN ({pmid_list})")
+            table.add(rows)
+
+    def _get_vector_table(self, create_with: Optional[List[Dict[str, Any]]] = None):
+        if self._vector_table is not None:
+            return self._vector_table
+        try:
+            from lancedb import connect
+
+            connection = connect(str(self.path))
+            if VECTOR_TABLE_NAME in connection.table_names():
+                self._vector_table = connection.open_table(VECTOR_TABLE_NAME)
+            elif create_with:
+                # The first batch defines the schema, the caller then re-adds it
+                self._vector_table = connection.create_table(
+                    VECTOR_TABLE_NAME, data=create_with[:1]
+                )
+        except Exception as e:
+            logger.warning(f"PubMed vector index unavailable: {e}")
+        return self._vector_table
+
+    def _check_vector_embedder(self, table: Any, writing: bool = False) -> bool:
+        """Whether the vector table holds vectors of ``embedder``.
+
+        Tables from before embedders were recorded are accepted if the
+        dimensions match; the first write records the embedder.
+
+        Raises:
+            ValueError: On writes with another embedder than the table's
+        """
+        manifest_path = self.path / VECTOR_MANIFEST_NAME
+        current = embedder_signature(self.embedder)
+        recorded = None
+        if manifest_path.exists():
+            try:
+                recorded = json.loads(manifest_path.read_text()).get("embedder")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read {manifest_path}: {e}")
+        table_dimensions = table.schema.field("vector").type.list_size
+        matches = (recorded == current) if recorded else (
+            not current["dimensions"] or table_dimensions == current["dimensions"]
+        )
+        if not matches:
+            embedded_with = (recorded or {}).get("id", f"{table_dimensions}-dimensional vectors")
+            message = (
+                f"PubMed vectors in {self.path} were embedded with {embedded_with}, not {current['id']}; "
+                f"delete {VECTOR_TABLE_NAME}.lance and run `python load_pubmed.py --embed` again"
+            )
+            if writing:
+                raise ValueError(message)
+            logger.warning(f"{message}. Searching full text only.")
+        elif writing and recorded is None:
+            manifest_path.write_text(json.dumps({"embedder": current}))
+        return matches
+
+    def delete(self, pmids: List[str]) -> None:
+        """Remove articles (and their vectors) from the index."""
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM articles WHERE pmid = ?", [(pmid,) for pmid in pmids]
+            )
+        table = self._get_vector_table()
+        if table is not None:
+            pmid_list = ", ".join(f"'{pmid}'" for pmid in pmids)
+            table.delete(f"pmid IN ({pmid_list})")
+
+    def optimize(self) -> None:
+        """Merge FTS segments after a bulk load for faster queries."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO articles_fts(articles_fts) VALUES ('optimize')"
+            )
+
+    # ------------------------------------------------------------------
+    # Retrieval
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """Convert free text into a safe FTS5 query (quoted terms, OR-ed)."""
+        terms = re.findall(r"\w+", query.lower())
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    def _full_text_search(self, query: str, limit: int) -> List[str]:
+        fts_query = self._fts_query(query)
+        if not fts_query:
+            return []
+        rows = self.connection.execute(
+            """
+            SELECT a.pmid FROM articles_fts
+            JOIN articles a ON a.rowid = articles_fts.rowid
+            WHERE articles_fts MATCH ?
+            ORDER BY bm25(articles_fts, 10.0, 1.0, 5.0)
+            LIMIT ?
+            """,
+            (fts_query, limit),
+        ).fetchall()
+        return [row["pmid"] for row in rows]
+
+    def _vector_search(self, query: str, limit: int) -> List[str]:
+        if self.embedder is None:
+            return []
+        table = self._get_vector_table()
+        if table is None:
+            return []
+        if self._vectors_match is None:
+            self._vectors_match = self._check_vector_embedder(table)
+        if not self._vectors_match:
+            return []
+        try:
+            vector = self.embedder.get_embedding(query)
+            hits = table.search(vector).limit(limit).select(["pmid", "_distance"]).to_list()
+            return [hit["pmid"] for hit in hits]
+        except Exception as e:
+            logger.warning(f"PubMed vector search failed, using full-text only: {e}")
+            return []
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Hybrid search: BM25 full-text and vector hits merged with RRF."""
+        candidates = limit * 3
+        rankings = [
+            self._full_text_search(query, candidates),
+            self._vector_search(query, candidates),
+        ]
+
+        scores: Dict[str, float] = {}
+        for ranking in rankings:
+            for rank, pmid in enumerate(ranking):
+                scores[pmid] = scores.get(pmid, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:limit]
+        articles = {article["pmid"]: article for article in self.get_many(ranked)}
+        return [articles[pmid] for pmid in ranked if pmid in articles]
+
+    def get(self, pmid: str) -> Optional[Dict[str, Any]]:
+        """Fetch a single article by PMID."""
+        articles = self.get_many([pmid])
+        return articles[0] if articles else None
+
+    def get_many(self, pmids: List[str]) -> List[Dict[str, Any]]:
+        if not pmids:
+            return []
+        placeholders = ", ".join("?" for _ in pmids)
+        rows = self.connection.execute(
+            f"SELECT * FROM articles WHERE pmid IN ({placeholders})", pmids
+        ).fetchall()
+        return [dict(row) for row in rows]
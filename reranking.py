@@ -0,0 +1,304 @@
+"""
+Reranking stage of knowledge retrieval.
+
+Hybrid search results went straight into the prompt, and k was set high to
+reach enough recall, which made prompts large. The knowledge base now
+fetches several times more candidates than it returns. Search results are
+cached and small, so this is cheap. The candidates are then narrowed on the
+CPU:
+
+1. BM25 over the candidates, fused with their search ranks by reciprocal
+   rank fusion. This rewards chunks that contain the query's terms, and it
+   is the lexical prefilter for step 2.
+2. Optionally, a small local cross-encoder (an ONNX export such as
+   ms-marco-MiniLM-L-6-v2) that scores the best prefiltered candidates
+   against the query.
+3. Maximal marginal relevance, which picks the top k while skipping chunks
+   that repeat ones already picked, e.g. overlapping windows or the same
+   passage in two documents.
+
+Select the stage with HALO_RERANKER: ``bm25`` (the default),
+``cross-encoder:<model>`` or ``none``.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from agno.knowledge.document import Document
+from agno.utils.log import log_debug, logger
+
+from deadlines import stage_latencies
+from local_embedder import LOCAL_MODELS_DIR, find_model_file
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:
+    onnxruntime = None
+    Tokenizer = None
+
+DEFAULT_RERANKER = os.getenv("HALO_RERANKER", "bm25")
+# Chunks handed to the model per knowledge search
+KNOWLEDGE_TOP_K = int(os.getenv("HALO_KNOWLEDGE_TOP_K", "5"))
+# Candidates fetched per chunk returned
+CANDIDATE_FACTOR = int(os.getenv("HALO_RERANK_CANDIDATES", "4"))
+# Candidates the cross-encoder scores, after the BM25 prefilter
+CROSS_ENCODER_CANDIDATES = 12
+# Trade-off between relevance (1.0) and diversity (0.0) of the chunks picked
+MMR_LAMBDA = float(os.getenv("HALO_MMR_LAMBDA", "0.7"))
+# Chunks at least this similar to a picked one are dropped as duplicates
+DUPLICATE_SIMILARITY = 0.95
+
+# Damping constant of reciprocal rank fusion
+RRF_K = 60
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or that the this to was "
+    "what when where which who why with der die das und ist ein eine zu von mit".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def bm25_scores(query: str, documents: Sequence[Document]) -> List[float]:
+    """BM25 score of each document for the query, with term statistics of the documents themselves."""
+    terms = set(tokenize(query))
+    if not terms or not documents:
+        return [0.0] * len(documents)
+    token_counts = [Counter(tokenize(document.content)) for document in documents]
+    lengths = [sum(counts.values()) for counts in token_counts]
+    average_length = sum(lengths) / len(lengths) or 1.0
+    count = len(documents)
+    idf = {}
+    for term in terms:
+        frequency = sum(1 for counts in token_counts if term in counts)
+        idf[term] = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+    scores = []
+    for counts, length in zip(token_counts, lengths):
+        score = 0.0
+        for term in terms:
+            tf = counts.get(term, 0)
+            if tf:
+                score += idf[term] * tf * (BM25_K1 + 1) / (
+                    tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                )
+        scores.append(score)
+    return scores
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[int]], weights: Optional[Sequence[float]] = None
+) -> Dict[int, float]:
+    """Fuse rankings (lists of document indexes, best first) into one score per index."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[int, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, index in enumerate(ranking):
+            scores[index] = scores.get(index, 0.0) + weight / (RRF_K + rank + 1)
+    return scores
+
+
+def _rank(scores: Sequence[float], indexes: Sequence[int]) -> List[int]:
+    return sorted(indexes, key=lambda index: scores[index], reverse=True)
+
+
+class OnnxCrossEncoder:
+    """Cross-encoder reranking model run locally with onnxruntime.
+
+    Args:
+        model: Model name, also the directory name below ``LOCAL_MODELS_DIR``
+        model_path: Directory of the model, if not below ``LOCAL_MODELS_DIR``
+        max_length: Tokens per query and chunk pair; longer pairs are truncated
+    """
+
+    def __init__(
+        self, model: str = "ms-marco-MiniLM-L-6-v2", model_path: Optional[str] = None, max_length: int = 512
+    ):
+        if onnxruntime is None or Tokenizer is None:
+            raise ImportError(
+                "`onnxruntime` and `tokenizers` not installed. "
+                "Please install using `pip install onnxruntime tokenizers`"
+            )
+        self.model = model
+        self.model_dir = Path(model_path) if model_path else LOCAL_MODELS_DIR / model
+        self.model_file = find_model_file(self.model_dir)
+        self.max_length = max_length
+        self._session = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "OnnxCrossEncoder":
+        # Knowledge bases are deep-copied per run; they share the loaded model
+        return self
+
+    def _load(self):
+        with self._lock:
+            if self._session is None:
+                options = onnxruntime.SessionOptions()
+                options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self._session = onnxruntime.InferenceSession(
+                    str(self.model_file), options, providers=["CPUExecutionProvider"]
+                )
+                tokenizer = Tokenizer.from_file(str(self.model_dir / "tokenizer.json"))
+                tokenizer.enable_truncation(max_length=self.max_length)
+                tokenizer.enable_padding()
+                self._tokenizer = tokenizer
+                logger.info(f"Loaded local reranking model {self.model_file}")
+        return self._session, self._tokenizer
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """Relevance of each text to the query; higher is more relevant."""
+        if not texts:
+            return []
+        session, tokenizer = self._load()
+        encodings = tokenizer.encode_batch([(query, text) for text in texts])
+        inputs = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        feed = {model_input.name: inputs[model_input.name] for model_input in session.get_inputs()}
+        logits = session.run(None, feed)[0]
+        if logits.ndim == 1:
+            return logits.tolist()
+        # One logit per pair, or (irrelevant, relevant) for two-class models
+        return logits[:, -1].tolist()
+
+
+class KnowledgeReranker:
+    """Narrows over-fetched search candidates to a tight, diverse top k.
+
+    Args:
+        cross_encoder: Scores the prefiltered candidates, if set
+        candidate_factor: Candidates fetched per chunk returned
+        cross_encoder_candidates: Candidates the cross-encoder scores
+        mmr_lambda: Relevance weight of maximal marginal relevance; 1.0 disables diversity
+    """
+
+    def __init__(
+        self,
+        cross_encoder: Optional[OnnxCrossEncoder] = None,
+        candidate_factor: int = CANDIDATE_FACTOR,
+        cross_encoder_candidates: int = CROSS_ENCODER_CANDIDATES,
+        mmr_lambda: float = MMR_LAMBDA,
+    ):
+        self.cross_encoder = cross_encoder
+        self.candidate_factor = max(candidate_factor, 1)
+        self.cross_encoder_candidates = cross_encoder_candidates
+        self.mmr_lambda = mmr_lambda
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "KnowledgeReranker":
+        return self
+
+    def candidates(self, top_k: int) -> int:
+        """Number of candidates to fetch for ``top_k`` results."""
+        return top_k * self.candidate_factor
+
+    def _relevance(self, query: str, documents: List[Document]) -> List[float]:
+        """Fused relevance of each candidate, scaled to 0..1."""
+        indexes = list(range(len(documents)))
+        # Candidates arrive in search order
+        rankings = [indexes, _rank(bm25_scores(query, documents), indexes)]
+        weights = [1.0, 1.0]
+        fused = reciprocal_rank_fusion(rankings, weights)
+        if self.cross_encoder is not None:
+            prefiltered = sorted(indexes, key=lambda index: fused[index], reverse=True)[
+                : self.cross_encoder_candidates
+            ]
+            try:
+                cross_scores = self.cross_encoder.score(query, [documents[index].content for index in prefiltered])
+                scores = dict(zip(prefiltered, cross_scores))
+                # The cross-encoder reads query and chunk together: its ranking counts most
+                rankings.append(sorted(prefiltered, key=lambda index: scores[index], reverse=True))
+                weights.append(2.0)
+                fused = reciprocal_rank_fusion(rankings, weights)
+            except Exception as e:
+                logger.warning(f"Cross-encoder reranking failed, using BM25 fusion: {e}")
+        values = [fused.get(index, 0.0) for index in indexes]
+        low, high = min(values), max(values)
+        return [(value - low) / (high - low) if high > low else 1.0 for value in values]
+
+    def _similarities(self, documents: List[Document]) -> np.ndarray:
+        """Pairwise similarity of the candidates: cosine of embeddings, else token overlap."""
+        embeddings = [document.embedding for document in documents]
+        if all(embedding is not None and len(embedding) for embedding in embeddings):
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+            return vectors @ vectors.T
+        token_sets = [set(tokenize(document.content)) for document in documents]
+        similarities = np.zeros((len(documents), len(documents)), dtype=np.float32)
+        for i, first in enumerate(token_sets):
+            for j, second in enumerate(token_sets):
+                union = len(first | second)
+                similarities[i, j] = len(first & second) / union if union else 0.0
+        return similarities
+
+    def rerank(self, query: str, documents: List[Document], top_k: int) -> List[Document]:
+        """Return the ``top_k`` most relevant candidates that do not repeat each other."""
+        if not documents:
+            return []
+        start = time.monotonic()
+        relevance = self._relevance(query, documents)
+        similarities = self._similarities(documents)
+
+        picked: List[int] = []
+        remaining = set(range(len(documents)))
+        while remaining and len(picked) < top_k:
+            best, best_score = None, -math.inf
+            for index in remaining:
+                redundancy = max((similarities[index, other] for other in picked), default=0.0)
+                score = self.mmr_lambda * relevance[index] - (1 - self.mmr_lambda) * redundancy
+                if score > best_score:
+                    best, best_score = index, score
+            remaining.discard(best)
+            if picked and max(similarities[best, other] for other in picked) >= DUPLICATE_SIMILARITY:
+                continue
+            picked.append(best)
+
+        results = []
+        for index in picked:
+            document = documents[index]
+            document.reranking_score = relevance[index]
+            results.append(document)
+        stage_latencies.record("knowledge_rerank", time.monotonic() - start)
+        candidate_tokens = sum((document.meta_data or {}).get("chunk_tokens", 0) for document in documents)
+        kept_tokens = sum((document.meta_data or {}).get("chunk_tokens", 0) for document in results)
+        log_debug(
+            f"Reranked {len(documents)} candidates to {len(results)} chunks "
+            f"({kept_tokens} of {candidate_tokens} tokens)"
+        )
+        return results
+
+
+def create_reranker(spec: str = DEFAULT_RERANKER) -> Optional[KnowledgeReranker]:
+    """Create the reranking stage from a spec like ``bm25`` or ``cross-encoder:<model>``.
+
+    Returns:
+        The reranker, or None for ``none``
+    """
+    name, _, model = spec.partition(":")
+    name = name.strip().lower()
+    if name in ("none", "off", ""):
+        return None
+    if name == "cross-encoder":
+        try:
+            return KnowledgeReranker(cross_encoder=OnnxCrossEncoder(model or "ms-marco-MiniLM-L-6-v2"))
+        except (ImportError, FileNotFoundError) as e:
+            # Reranking still works without the model, only less precisely
+            logger.warning(f"Cross-encoder unavailable, reranking with BM25 fusion: {e}")
+            return KnowledgeReranker()
+    if name != "bm25":
+        logger.warning(f"Unknown reranker {spec!r}, using bm25")
+    return KnowledgeReranker()
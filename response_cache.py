@@ -0,0 +1,356 @@
+"""
+Semantic response cache for the HALO team.
+
+Near-identical standalone questions ("what is shingles", "shingles symptoms")
+are answered from earlier runs instead of running the full coordinator and
+member pipeline. Entries live in a small SQLite-backed vector index, scoped by
+user (or tenant) and by the knowledge version they were answered with, so a
+knowledge change invalidates them.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from agno.knowledge.embedder.base import Embedder
+from agno.utils.log import log_debug, logger
+
+cwd = Path(__file__).parent.resolve()
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
+tmp_dir.mkdir(exist_ok=True, parents=True)
+
+RESPONSE_CACHE_PATH = tmp_dir.joinpath("halo_response_cache.db")
+# Holds the "semantic_cache" switch of the Configuration page
+MODEL_CONFIG_PATH = cwd.joinpath("model_config.json")
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.92
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Questions about the user, about earlier turns or about the present depend on
+# more than the question itself and are never served from the cache
+UNCACHEABLE_PATTERN = re.compile(
+    r"\b(i|i'm|me|my|mine|myself|we|our|you said|"
+    r"it|this|that|these|those|them|above|previous|earlier|more|"
+    r"today|now|current|currently|latest|recent|"
+    r"ich|mich|mir|mein|meine|meinen|wir|unser|dies|heute|aktuell)\b",
+    re.IGNORECASE,
+)
+
+# Runs that touched user memories are personalised
+MEMORY_TOOLS = {"update_user_memory"}
+
+
+def normalize_query(query: str) -> str:
+    query = re.sub(r"[^\w\s]", " ", query.lower())
+    return " ".join(query.split())
+
+
+def is_cacheable_query(query: str) -> bool:
+    """Whether a query is standalone and impersonal enough to share answers."""
+    normalized = normalize_query(query)
+    return 0 < len(normalized) <= 500 and not UNCACHEABLE_PATTERN.search(normalized)
+
+
+@dataclass
+class CacheHit:
+    answer: str
+    query: str
+    similarity: float
+    latency_saved: float
+
+
+class SemanticResponseCache:
+    """Nearest-neighbour cache of final HALO answers keyed by query embedding.
+
+    Args:
+        embedder: Embedder for the normalised queries
+        path: SQLite file of the cache
+        threshold: Minimum cosine similarity for a hit
+        ttl: Maximum age of an entry in seconds
+        max_entries_per_scope: Oldest entries of a scope are evicted beyond this
+    """
+
+    def __init__(
+        self,
+        embedder: Embedder,
+        path: Path = RESPONSE_CACHE_PATH,
+        threshold: float = DEFAULT_SIMILARITY_THRESHOLD,
+        ttl: float = DEFAULT_TTL,
+        max_entries_per_scope: int = 500,
+    ):
+        self.embedder = embedder
+        self.path = Path(path)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries_per_scope = max_entries_per_scope
+        # Vectors of different embedders are not comparable
+        self.embedder_id = getattr(embedder, "id", None) or type(embedder).__name__
+
+        # Ids, vectors and creation times per (scope, knowledge version), loaded on first use
+        self._index: Dict[Tuple[str, str], Tuple[List[int], np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "stores": 0, "latency_saved": 0.0}
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT NOT NULL,
+                    knowledge_version TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    latency REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope, knowledge_version)"
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation: callers run on many threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _version(self, knowledge_version: str) -> str:
+        return f"{self.embedder_id}/{knowledge_version}"
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embedder.get_embedding(normalize_query(query)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _load_index(self, scope: str, knowledge_version: str) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        key = (scope, knowledge_version)
+        with self._lock:
+            if key in self._index:
+                return self._index[key]
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, embedding, created_at FROM responses "
+                "WHERE scope = ? AND knowledge_version = ? AND created_at > ?",
+                (scope, knowledge_version, time.time() - self.ttl),
+            ).fetchall()
+        ids = [row[0] for row in rows]
+        matrix = (
+            np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+            if rows
+            else np.empty((0, 0), dtype=np.float32)
+        )
+        created_at = np.array([row[2] for row in rows], dtype=np.float64)
+        with self._lock:
+            self._index[key] = (ids, matrix, created_at)
+        return ids, matrix, created_at
+
+    def _drop_index(self, scope: Optional[str] = None) -> None:
+        with self._lock:
+            for key in list(self._index):
+                if scope is None or key[0] == scope:
+                    del self._index[key]
+
+    def lookup(self, query: str, scope: str, knowledge_version: str) -> Optional[CacheHit]:
+        """Return the closest cached answer above the similarity threshold."""
+        start = time.perf_counter()
+        with self._lock:
+            self._stats["lookups"] += 1
+        ids, matrix, created_at = self._load_index(scope, self._version(knowledge_version))
+        # Indexes stay in memory: entries may have expired since they were loaded
+        live = created_at > time.time() - self.ttl
+        if not live.any():
+            return None
+
+        similarities = np.where(live, matrix @ self._embed(query), -np.inf)
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < self.threshold:
+            log_debug(f"Semantic cache miss (best similarity {similarity:.3f})")
+            return None
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT query, answer, latency FROM responses WHERE id = ?", (ids[best],)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET hits = hits + 1 WHERE id = ?", (ids[best],))
+
+        latency_saved = max(row[2] - (time.perf_counter() - start), 0.0)
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats["latency_saved"] += latency_saved
+        logger.info(
+            f"Semantic cache hit ({similarity:.3f}) for a query similar to {row[0]!r}, "
+            f"saved {latency_saved:.1f}s"
+        )
+        return CacheHit(answer=row[1], query=row[0], similarity=similarity, latency_saved=latency_saved)
+
+    def store(
+        self, query: str, answer: str, scope: str, knowledge_version: str, latency: float
+    ) -> None:
+        """Cache the final answer of a run."""
+        embedding = self._embed(query)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO responses (scope, knowledge_version, query, answer, embedding, latency, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    scope,
+                    self._version(knowledge_version),
+                    query,
+                    answer,
+                    embedding.tobytes(),
+                    latency,
+                    time.time(),
+                ),
+            )
+            # Evict the oldest entries of the scope beyond the limit
+            conn.execute(
+                "DELETE FROM responses WHERE scope = ? AND id NOT IN "
+                "(SELECT id FROM responses WHERE scope = ? ORDER BY created_at DESC LIMIT ?)",
+                (scope, scope, self.max_entries_per_scope),
+            )
+        self._drop_index(scope)
+        with self._lock:
+            self._stats["stores"] += 1
+
+    def invalidate(self, scope: Optional[str] = None, keep_version: Optional[str] = None) -> int:
+        """Delete cached answers, e.g. after the knowledge base changed.
+
+        Args:
+            scope: Only invalidate this scope. Defaults to all scopes.
+            keep_version: Keep the entries of this knowledge version.
+
+        Returns:
+            int: Number of deleted entries
+        """
+        conditions, params = [], []
+        if scope is not None:
+            conditions.append("scope = ?")
+            params.append(scope)
+        if keep_version is not None:
+            conditions.append("knowledge_version != ?")
+            params.append(self._version(keep_version))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as conn:
+            deleted = conn.execute(f"DELETE FROM responses{where}", params).rowcount
+        self._drop_index(scope)
+        if deleted:
+            logger.info(f"Invalidated {deleted} cached answers")
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return lookups, hits, hit rate, total latency saved in seconds and live entries."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        try:
+            with self._connect() as conn:
+                stats["entries"] = conn.execute(
+                    "SELECT COUNT(*) FROM responses WHERE created_at > ?", (time.time() - self.ttl,)
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Could not count cached answers: {e}")
+            stats["entries"] = None
+        return stats
+
+
+def used_memory_tools(run_output: Any) -> bool:
+    """Whether a run (or one of its members) read or updated user memories."""
+    for tool in getattr(run_output, "tools", None) or []:
+        if getattr(tool, "tool_name", None) in MEMORY_TOOLS:
+            return True
+    return any(used_memory_tools(member) for member in getattr(run_output, "member_responses", None) or [])
+
+
+# Tags of the user memories and the session summary in system messages
+PERSONAL_CONTEXT_TAGS = ("<memories_from_previous_interactions>", "<summary_of_previous_interactions>")
+
+
+def used_personal_context(run_output: Any) -> bool:
+    """Whether a run (or one of its members) saw user memories or a session summary.
+
+    Its answer is personalised even without a memory tool call, since both
+    are injected into the system message.
+    """
+    if used_memory_tools(run_output):
+        return True
+    for message in getattr(run_output, "messages", None) or []:
+        content = getattr(message, "content", None)
+        if (
+            getattr(message, "role", None) == "system"
+            and isinstance(content, str)
+            and any(tag in content for tag in PERSONAL_CONTEXT_TAGS)
+        ):
+            return True
+    return any(used_personal_context(member) for member in getattr(run_output, "member_responses", None) or [])
+
+
+# Shared by all HALO sessions of the process
+_response_caches: Dict[Tuple[str, str], SemanticResponseCache] = {}
+_response_caches_lock = threading.Lock()
+
+
+def semantic_cache_enabled() -> bool:
+    """Whether HALO teams answer repeated questions from the cache by default.
+
+    ``HALO_SEMANTIC_CACHE=1`` or ``0`` wins over the switch of the Configuration page.
+    """
+    setting = os.getenv("HALO_SEMANTIC_CACHE")
+    if setting is not None:
+        return setting.lower() in ("1", "true", "yes", "on")
+    if MODEL_CONFIG_PATH.exists():
+        try:
+            with open(MODEL_CONFIG_PATH, "r") as f:
+                return bool(json.load(f).get("semantic_cache", False))
+        except (json.JSONDecodeError, OSError):
+            pass
+    return False
+
+
+def get_response_cache_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the response caches of this process, summed; None if none is in use."""
+    with _response_caches_lock:
+        caches = list(_response_caches.values())
+    if not caches:
+        return None
+    stats: Dict[str, Any] = {"lookups": 0, "hits": 0, "stores": 0, "latency_saved": 0.0, "entries": 0}
+    counted_paths = set()
+    for cache in caches:
+        cache_stats = cache.get_stats()
+        for name in ("lookups", "hits", "stores", "latency_saved"):
+            stats[name] += cache_stats[name]
+        # Entries are counted per file, which caches of several embedders share
+        if cache.path not in counted_paths:
+            counted_paths.add(cache.path)
+            stats["entries"] += cache_stats["entries"] or 0
+    stats["hit_rate"] = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+    return stats
+
+
+def get_response_cache(embedder: Embedder, path: Path = RESPONSE_CACHE_PATH) -> SemanticResponseCache:
+    """Return the process-wide cache for a cache file."""
+    key = (str(path), getattr(embedder, "id", None) or type(embedder).__name__)
+    with _response_caches_lock:
+        cache = _response_caches.get(key)
+        if cache is None:
+            cache = SemanticResponseCache(embedder=embedder, path=path)
+            _response_caches[key] = cache
+    return cache
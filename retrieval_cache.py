@@ -0,0 +1,259 @@
+"""
+Query-embedding and retrieval result cache for knowledge search.
+
+The HALO team asks the knowledge base the same questions over and over, within
+a session and across users, and every ``search_knowledge_base`` call embedded
+the query and ran hybrid search again. Two cache levels sit in front of that:
+
+- query text to embedding, an in-memory LRU. Misses go to the embedder, which
+  in HALO is backed by the persistent embedding cache.
+- (query, search type, filters, limit, table version) to the ranked chunks,
+  an in-memory LRU with optional SQLite persistence that holds the ranked
+  chunk ids. Chunks of persisted hits are read back by id.
+
+Results are keyed by the version of the LanceDB table, which every insert,
+upsert, delete and index build bumps, in whichever process they happen. A
+write therefore invalidates all results cached before it, and hot queries
+skip both the embedding API and the vector scan.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from agno.knowledge.document import Document
+from agno.utils.log import log_debug, logger
+
+from embedding_cache import chunk_hash
+
+cwd = Path(__file__).parent.resolve()
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
+tmp_dir.mkdir(exist_ok=True, parents=True)
+
+RETRIEVAL_CACHE_PATH = tmp_dir.joinpath("halo_retrieval.db")
+# Set HALO_RETRIEVAL_CACHE=memory to keep results in this process only
+PERSIST_RESULTS = os.getenv("HALO_RETRIEVAL_CACHE", "sqlite").lower() != "memory"
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("HALO_QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+RESULT_CACHE_SIZE = int(os.getenv("HALO_RESULT_CACHE_SIZE", "1024"))
+# Persisted results of older table versions are pruned, the rest after this long
+RESULT_TTL = 7 * 24 * 3600
+
+
+@dataclass
+class CachedResult:
+    """Ranked chunks of a search, in rank order."""
+
+    ids: List[str]
+    documents: Optional[List[Document]] = None
+    created_at: float = field(default_factory=time.time)
+
+
+class _LRU:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+def result_key(
+    table: str,
+    version: int,
+    search_type: str,
+    query: str,
+    limit: int,
+    filters: Optional[Dict[str, Any]] = None,
+    scope: str = "",
+) -> str:
+    """Cache key of a search.
+
+    Args:
+        table: Location of the table, e.g. ``{uri}/{table_name}``
+        version: Version of the table the results were read from
+        search_type: ``vector``, ``keyword`` or ``hybrid``
+        query: The query text; differences in whitespace are ignored
+        limit: Number of results asked for
+        filters: Metadata filters of the search
+        scope: Anything else the ranking depends on, such as embedder and reranker
+    """
+    filters_key = json.dumps(filters or {}, sort_keys=True, default=str)
+    return f"{table}|{version}|{search_type}|{limit}|{scope}|{chunk_hash(query)}|{filters_key}"
+
+
+class RetrievalCache:
+    """Two-level cache of query embeddings and ranked search results.
+
+    Args:
+        path: SQLite file the results persist in, None to keep them in memory only
+        embedding_cache_size: Query embeddings kept in memory
+        result_cache_size: Search results kept in memory
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = RETRIEVAL_CACHE_PATH,
+        embedding_cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+        result_cache_size: int = RESULT_CACHE_SIZE,
+    ):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._embeddings = _LRU(embedding_cache_size)
+        self._results = _LRU(result_cache_size)
+        # Newest version seen per table; persisted results of older ones are pruned
+        self._versions: Dict[str, int] = {}
+        self._stats = {
+            "embedding_hits": 0,
+            "embedding_misses": 0,
+            "result_hits": 0,
+            "result_persisted_hits": 0,
+            "result_misses": 0,
+        }
+
+        if self.path is not None:
+            try:
+                with self._connect() as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        """
+                        CREATE TABLE IF NOT EXISTS results (
+                            key TEXT PRIMARY KEY,
+                            table_name TEXT NOT NULL,
+                            version INTEGER NOT NULL,
+                            ids TEXT NOT NULL,
+                            created_at REAL NOT NULL
+                        )
+                        """
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS results_table ON results (table_name, version)")
+            except sqlite3.Error as e:
+                logger.warning(f"Retrieval cache not persisted: {e}")
+                self.path = None
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "RetrievalCache":
+        # Agents and knowledge bases are deep-copied per run; they share the cache
+        return self
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # One short-lived connection per operation: searches run on many threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get_query_embedding(self, embedder_key: Tuple[str, int], query: str) -> Optional[List[float]]:
+        key = (*embedder_key, chunk_hash(query))
+        with self._lock:
+            embedding = self._embeddings.get(key)
+            self._stats["embedding_hits" if embedding is not None else "embedding_misses"] += 1
+        return embedding
+
+    def put_query_embedding(self, embedder_key: Tuple[str, int], query: str, embedding: List[float]) -> None:
+        if embedding:
+            with self._lock:
+                self._embeddings.put((*embedder_key, chunk_hash(query)), embedding)
+
+    def get_results(self, key: str) -> Optional[CachedResult]:
+        """Return the cached result of a search key, from memory or the SQLite file.
+
+        Results loaded from the file only carry their chunk ids; the caller reads
+        the chunks and stores the complete result with ``put_results``.
+        """
+        with self._lock:
+            result = self._results.get(key)
+        if result is None and self.path is not None:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT ids, created_at FROM results WHERE key = ? AND created_at > ?",
+                        (key, time.time() - RESULT_TTL),
+                    ).fetchone()
+                if row is not None:
+                    result = CachedResult(ids=json.loads(row[0]), created_at=row[1])
+            except sqlite3.Error as e:
+                logger.warning(f"Retrieval cache lookup failed: {e}")
+        with self._lock:
+            if result is None:
+                self._stats["result_misses"] += 1
+            elif result.documents is None:
+                self._stats["result_persisted_hits"] += 1
+            else:
+                self._stats["result_hits"] += 1
+        return result
+
+    def put_results(self, key: str, table: str, version: int, ids: List[str], documents: List[Document]) -> None:
+        """Cache the ranked chunks of a search, with ``ids`` the chunk ids of ``documents``."""
+        result = CachedResult(ids=list(ids), documents=list(documents))
+        with self._lock:
+            self._results.put(key, result)
+            newer_version = version > self._versions.get(table, -1)
+            if newer_version:
+                self._versions[table] = version
+        if self.path is None:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, table, version, json.dumps(result.ids), result.created_at),
+                )
+                if newer_version:
+                    # Results of older versions can never be hit again
+                    deleted = conn.execute(
+                        "DELETE FROM results WHERE (table_name = ? AND version < ?) OR created_at < ?",
+                        (table, version, time.time() - RESULT_TTL),
+                    ).rowcount
+                    if deleted:
+                        log_debug(f"Pruned {deleted} stale retrieval results of {table}")
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist retrieval result: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["embeddings_cached"] = len(self._embeddings)
+            stats["results_cached"] = len(self._results)
+        embedding_lookups = stats["embedding_hits"] + stats["embedding_misses"]
+        stats["embedding_hit_rate"] = stats["embedding_hits"] / embedding_lookups if embedding_lookups else 0.0
+        result_hits = stats["result_hits"] + stats["result_persisted_hits"]
+        result_lookups = result_hits + stats["result_misses"]
+        stats["result_hit_rate"] = result_hits / result_lookups if result_lookups else 0.0
+        return stats
+
+
+# Shared by all knowledge tables of the process
+_retrieval_cache: Optional[RetrievalCache] = None
+_retrieval_cache_lock = threading.Lock()
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Return the process-wide retrieval cache."""
+    global _retrieval_cache
+    with _retrieval_cache_lock:
+        if _retrieval_cache is None:
+            _retrieval_cache = RetrievalCache(RETRIEVAL_CACHE_PATH if PERSIST_RESULTS else None)
+    return _retrieval_cache
@@ -0,0 +1,341 @@
+"""
+Tiered model routing for the HALO Agent Interface.
+
+A fast, cheap triage model classifies each request first. Chit-chat and
+memory updates are served by the cheap model, unusable images are rejected
+directly, and only full analyses are escalated to the heavyweight model.
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional, Sequence, Tuple
+
+from agno.agent import Agent
+from agno.utils.log import logger
+from pydantic import BaseModel, Field
+
+from accounting import record_run
+from deadlines import stage_timeout
+from models import create_model
+
+cwd = Path(__file__).parent.resolve()
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
+tmp_dir.mkdir(exist_ok=True, parents=True)
+
+ROUTING_LOG_PATH = tmp_dir.joinpath("routing_decisions.jsonl")
+MODEL_CONFIG_PATH = cwd.joinpath("model_config.json")
+
+DEFAULT_ROUTER_CONFIG = {
+    "router_enabled": True,
+    "triage_model": "gpt-5-mini",
+    "router_confidence_threshold": 0.8,
+}
+
+# Categories the triage model may handle without escalation
+CHEAP_CATEGORIES = ["chit_chat", "memory_update"]
+
+TRIAGE_INSTRUCTIONS = [
+    "You are a triage classifier in front of a medical AI assistant. Do not answer medical questions.",
+    "Classify the request into exactly one category:",
+    "- chit_chat: greetings, small talk, questions about the assistant itself",
+    "- memory_update: the user shares a preference or personal fact to remember, or asks to forget something",
+    "- image_unusable: an attached image is not a medical image, is blank, corrupted, or far too low quality to analyse",
+    "- full_analysis: anything else, including every medical question and every usable medical image",
+    "Set confidence between 0 and 1. When in doubt, choose full_analysis.",
+    "If the request contains a medical image, set modality (e.g. radiography, computed tomography, magnetic resonance imaging, ultrasonography) and body_part (e.g. chest, knee) when you can tell.",
+    "For chit_chat write a short, friendly reply. For image_unusable explain briefly why the image cannot be analysed and what to upload instead, in the language of the user. Otherwise leave reply empty.",
+]
+
+
+class TriageResult(BaseModel):
+    category: Literal["chit_chat", "memory_update", "image_unusable", "full_analysis"]
+    confidence: float = Field(ge=0.0, le=1.0)
+    reply: Optional[str] = None
+    modality: Optional[str] = None
+    body_part: Optional[str] = None
+
+
+@dataclass
+class RouteDecision:
+    category: str
+    confidence: float
+    model_id: str
+    escalated: bool
+    reply: Optional[str] = None
+    triage_time: float = 0.0
+    modality: Optional[str] = None
+    body_part: Optional[str] = None
+
+
+def _qualify_model_id(model_id: str) -> str:
+    # model_config.json stores bare OpenAI model names
+    return model_id if ":" in model_id else f"openai:{model_id}"
+
+
+def load_router_config() -> Dict[str, Any]:
+    """Read the router settings from model_config.json, with defaults."""
+    router_config = dict(DEFAULT_ROUTER_CONFIG)
+    if MODEL_CONFIG_PATH.exists():
+        try:
+            with open(MODEL_CONFIG_PATH, "r") as f:
+                model_config = json.load(f)
+            for key in DEFAULT_ROUTER_CONFIG:
+                if key in model_config:
+                    router_config[key] = model_config[key]
+        except (json.JSONDecodeError, OSError):
+            pass
+    return router_config
+
+
+def triage_model_id() -> str:
+    """The configured triage model as a ``provider:model`` id."""
+    return _qualify_model_id(load_router_config()["triage_model"])
+
+
+# Triage agents are stateless, so one per model id is shared by all sessions
+_triage_agents: Dict[str, Agent] = {}
+_triage_agents_lock = threading.Lock()
+
+
+def _get_triage_agent(model_id: str) -> Agent:
+    agent = _triage_agents.get(model_id)
+    if agent is None:
+        with _triage_agents_lock:
+            agent = _triage_agents.get(model_id)
+            if agent is None:
+                agent = Agent(
+                    name="Triage",
+                    model=create_model(model_id),
+                    instructions=TRIAGE_INSTRUCTIONS,
+                    output_schema=TriageResult,
+                )
+                _triage_agents[model_id] = agent
+    return agent
+
+
+def classify(
+    message: str, images: Optional[Sequence[Any]] = None, model_id: Optional[str] = None
+) -> Tuple[TriageResult, float]:
+    """Classify a request with the triage model.
+
+    Any failure results in a zero-confidence ``full_analysis``, so errors
+    always escalate to the heavyweight model.
+
+    Returns:
+        Tuple[TriageResult, float]: The classification and the time it took
+    """
+    model_id = _qualify_model_id(model_id or load_router_config()["triage_model"])
+    start = time.perf_counter()
+    try:
+        response = _get_triage_agent(model_id).run(
+            message, images=list(images) if images else None
+        )
+        record_run(response)
+        result = _triage_result(response)
+    except Exception as e:
+        logger.warning(f"Triage failed, escalating: {e}")
+        result = TriageResult(category="full_analysis", confidence=0.0)
+    return result, time.perf_counter() - start
+
+
+async def aclassify(
+    message: str, images: Optional[Sequence[Any]] = None, model_id: Optional[str] = None
+) -> Tuple[TriageResult, float]:
+    """Async version of ``classify``."""
+    model_id = _qualify_model_id(model_id or load_router_config()["triage_model"])
+    start = time.perf_counter()
+    try:
+        # A late triage escalates instead of holding up the analysis
+        response = await asyncio.wait_for(
+            _get_triage_agent(model_id).arun(
+                message, images=list(images) if images else None
+            ),
+            timeout=stage_timeout("triage"),
+        )
+        record_run(response)
+        result = _triage_result(response)
+    except Exception as e:
+        logger.warning(f"Triage failed, escalating: {e}")
+        result = TriageResult(category="full_analysis", confidence=0.0)
+    return result, time.perf_counter() - start
+
+
+def _triage_result(response: Any) -> TriageResult:
+    result = response.content
+    if not isinstance(result, TriageResult):
+        raise ValueError(f"Unexpected triage output: {result!r}")
+    return result
+
+
+def _log_decision(kind: str, message: str, decision: RouteDecision) -> None:
+    """Append a routing decision to the routing log for threshold tuning.
+
+    Only a hash and the length of the message are stored, never its text.
+    """
+    record = {
+        "timestamp": time.time(),
+        "kind": kind,
+        "message_sha1": hashlib.sha1(message.encode("utf-8")).hexdigest()[:12],
+        "message_length": len(message),
+        **{k: v for k, v in dataclasses.asdict(decision).items() if k != "reply"},
+    }
+    logger.info(
+        f"Routing {kind}: {decision.category} ({decision.confidence:.2f}) -> "
+        f"{decision.model_id}{' [escalated]' if decision.escalated else ''}"
+    )
+    try:
+        with open(ROUTING_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError as e:
+        logger.debug(f"Could not write routing log: {e}")
+
+
+def _halo_decision(
+    result: TriageResult,
+    triage_time: float,
+    router_config: Dict[str, Any],
+    heavy_model_id: str,
+) -> RouteDecision:
+    cheap = (
+        result.category in CHEAP_CATEGORIES
+        and result.confidence >= router_config["router_confidence_threshold"]
+    )
+    return RouteDecision(
+        category=result.category,
+        confidence=result.confidence,
+        model_id=(
+            _qualify_model_id(router_config["triage_model"])
+            if cheap
+            else heavy_model_id
+        ),
+        escalated=not cheap,
+        triage_time=triage_time,
+    )
+
+
+def route_halo_request(message: str, heavy_model_id: str) -> RouteDecision:
+    """Decide which model the HALO team should use for a chat message."""
+    router_config = load_router_config()
+    heavy_model_id = _qualify_model_id(heavy_model_id)
+    if not router_config["router_enabled"]:
+        return RouteDecision("full_analysis", 0.0, heavy_model_id, escalated=True)
+
+    result, triage_time = classify(message, model_id=router_config["triage_model"])
+    decision = _halo_decision(result, triage_time, router_config, heavy_model_id)
+    _log_decision("halo", message, decision)
+    return decision
+
+
+async def aroute_halo_request(message: str, heavy_model_id: str) -> RouteDecision:
+    """Async version of ``route_halo_request``."""
+    router_config = load_router_config()
+    heavy_model_id = _qualify_model_id(heavy_model_id)
+    if not router_config["router_enabled"]:
+        return RouteDecision("full_analysis", 0.0, heavy_model_id, escalated=True)
+
+    result, triage_time = await aclassify(message, model_id=router_config["triage_model"])
+    decision = _halo_decision(result, triage_time, router_config, heavy_model_id)
+    _log_decision("halo", message, decision)
+    return decision
+
+
+def _bind_routed_halo(halo_config, session_id: Optional[str], decision: RouteDecision):
+    from halo import create_halo
+
+    if decision.escalated:
+        return None
+    routed_config = dataclasses.replace(halo_config, model_id=decision.model_id)
+    team = create_halo(config=routed_config, session_id=session_id)
+    # The message is routed already
+    team.halo_config = None
+    return team
+
+
+def create_routed_halo(halo_config, session_id: Optional[str], message: str):
+    """Return a HALO team bound to the session on the cheap model, if triage picks it.
+
+    Called by ``HaloTeam.run`` once the message is known. Both the cheap and
+    the heavyweight team come from the per-process template cache, so
+    switching between them costs nothing.
+
+    Returns:
+        Tuple[Optional[Team], RouteDecision]: The cheap team, None if the
+        message is escalated to the configured model, and the decision
+    """
+    decision = route_halo_request(message, halo_config.model_id)
+    return _bind_routed_halo(halo_config, session_id, decision), decision
+
+
+async def acreate_routed_halo(halo_config, session_id: Optional[str], message: str):
+    """Async version of ``create_routed_halo``."""
+    decision = await aroute_halo_request(message, halo_config.model_id)
+    return _bind_routed_halo(halo_config, session_id, decision), decision
+
+
+def _image_decision(
+    result: TriageResult,
+    triage_time: float,
+    router_config: Dict[str, Any],
+    heavy_model_id: str,
+) -> RouteDecision:
+    short_circuit = (
+        result.category == "image_unusable"
+        and result.confidence >= router_config["router_confidence_threshold"]
+        and bool(result.reply)
+    )
+    return RouteDecision(
+        category=result.category,
+        confidence=result.confidence,
+        model_id=(
+            _qualify_model_id(router_config["triage_model"])
+            if short_circuit
+            else heavy_model_id
+        ),
+        escalated=not short_circuit,
+        reply=result.reply if short_circuit else None,
+        triage_time=triage_time,
+        modality=result.modality,
+        body_part=result.body_part,
+    )
+
+
+def route_image_request(
+    prompt: str, images: List[Any], heavy_model_id: str
+) -> RouteDecision:
+    """Triage an imaging request; unusable images are answered without escalation."""
+    router_config = load_router_config()
+    heavy_model_id = _qualify_model_id(heavy_model_id)
+    if not router_config["router_enabled"]:
+        return RouteDecision("full_analysis", 0.0, heavy_model_id, escalated=True)
+
+    result, triage_time = classify(
+        prompt, images=images, model_id=router_config["triage_model"]
+    )
+    decision = _image_decision(result, triage_time, router_config, heavy_model_id)
+    _log_decision("image", prompt, decision)
+    return decision
+
+
+async def aroute_image_request(
+    prompt: str, images: List[Any], heavy_model_id: str
+) -> RouteDecision:
+    """Async version of ``route_image_request``."""
+    router_config = load_router_config()
+    heavy_model_id = _qualify_model_id(heavy_model_id)
+    if not router_config["router_enabled"]:
+        return RouteDecision("full_analysis", 0.0, heavy_model_id, escalated=True)
+
+    result, triage_time = await aclassify(
+        prompt, images=images, model_id=router_config["triage_model"]
+    )
+    decision = _image_decision(result, triage_time, router_config, heavy_model_id)
+    _log_decision("image", prompt, decision)
+    return decision
@@ -0,0 +1,66 @@
+"""
+Run telemetry for the HALO Agent Interface
+"""
+
+import threading
+from typing import Any, Dict, Optional
+
+from agno.utils.log import logger
+
+# Aggregated prompt cache usage per label, for the lifetime of the process
+_prompt_cache_stats: Dict[str, Dict[str, float]] = {}
+_prompt_cache_lock = threading.Lock()
+
+
+def report_prompt_cache_usage(run_output: Any, label: str) -> Optional[Dict[str, Any]]:
+    """Log how many input tokens of a run were served from the provider prompt cache.
+
+    Args:
+        run_output: The RunOutput/TeamRunOutput returned by ``run``
+        label: Name to aggregate the usage under, e.g. the agent name
+
+    Returns:
+        Optional[Dict[str, Any]]: Usage of this run, or None if no metrics were reported
+    """
+    metrics = getattr(run_output, "metrics", None)
+    if metrics is None:
+        return None
+
+    input_tokens = getattr(metrics, "input_tokens", 0) or 0
+    cached_tokens = getattr(metrics, "cache_read_tokens", 0) or 0
+    usage = {
+        "input_tokens": input_tokens,
+        "cached_tokens": cached_tokens,
+        "cache_hit_ratio": cached_tokens / input_tokens if input_tokens else 0.0,
+        "time_to_first_token": getattr(metrics, "time_to_first_token", None),
+    }
+
+    with _prompt_cache_lock:
+        stats = _prompt_cache_stats.setdefault(
+            label, {"runs": 0, "input_tokens": 0, "cached_tokens": 0}
+        )
+        stats["runs"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["cached_tokens"] += cached_tokens
+
+    logger.info(
+        f"Prompt cache [{label}]: {cached_tokens}/{input_tokens} input tokens cached "
+        f"({usage['cache_hit_ratio']:.0%})"
+    )
+    return usage
+
+
+def get_prompt_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Return the aggregated prompt cache usage per label."""
+    with _prompt_cache_lock:
+        return {
+            label: {
+                **stats,
+                "cache_hit_ratio": (
+                    stats["cached_tokens"] / stats["input_tokens"]
+                    if stats["input_tokens"]
+                    else 0.0
+                ),
+            }
+            for label, stats in _prompt_cache_stats.items()
+        }
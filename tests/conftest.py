@@ -0,0 +1,22 @@
+"""Test setup: HALO runs on mock models and keeps all its state in a temporary directory."""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Set before any HALO module is imported: they read the environment at import
+_home = Path(tempfile.mkdtemp(prefix="halo-tests-"))
+_profiles = _home / "mock_profiles.json"
+_profiles.write_text(json.dumps({"heavy": {}}))
+os.environ["HOME"] = str(_home)
+os.environ["HALO_TMP_DIR"] = str(_home / "tmp")
+os.environ["HALO_EMBEDDER"] = "mock:test"
+os.environ["HALO_SUMMARY_MODEL"] = "mock:fast"
+os.environ["HALO_RETRIEVAL_CACHE"] = "memory"
+os.environ["MOCK_MODEL_PROFILES"] = str(_profiles)
+# Never a real key: nothing in the suite may call OpenAI
+os.environ["OPENAI_API_KEY"] = "test"
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,33 @@
+from chunking import MarkdownHeadingChunking, count_tokens
+
+
+def test_oversize_tables_are_split_with_their_header_repeated():
+    header = "| Drug | Dose | Notes |\n|---|---|---|"
+    rows = [f"| drug {i} | {i * 100} mg | taken with food, twice daily |" for i in range(60)]
+    text = "# Dosing\n\n## Antivirals\n\n" + "\n".join([header, *rows])
+    chunking = MarkdownHeadingChunking(max_tokens=120, overlap=10)
+
+    chunks = chunking.split(text)
+
+    assert len(chunks) > 1
+    seen = []
+    for content, extra in chunks:
+        assert extra == {"section": "Dosing > Antivirals"}
+        assert count_tokens(content) <= 120
+        prefix, table = content.split("\n\n", 1)
+        assert prefix == "Dosing > Antivirals"
+        assert table.startswith(header + "\n")
+        seen.extend(table.splitlines()[2:])
+    # Every row lands in exactly one part
+    assert seen == rows
+
+
+def test_sections_are_not_merged_across_headings():
+    chunks = MarkdownHeadingChunking(max_tokens=200, overlap=10).split(
+        "# Shingles\n\nCaused by varicella zoster.\n\n# Flu\n\nCaused by influenza."
+    )
+
+    assert [content for content, _ in chunks] == [
+        "Shingles\n\nCaused by varicella zoster.",
+        "Flu\n\nCaused by influenza.",
+    ]
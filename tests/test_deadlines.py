@@ -0,0 +1,52 @@
+import asyncio
+import threading
+import time
+
+import deadlines
+from deadlines import ahedged_call, hedged_call
+
+
+def test_saturated_stage_calls_without_hedging(monkeypatch):
+    monkeypatch.setitem(deadlines._stage_pools, "stalled", deadlines._StagePool("stalled", max_workers=2))
+    release = threading.Event()
+
+    def stalled():
+        release.wait(5)
+        return "late"
+
+    try:
+        for _ in range(2):
+            try:
+                hedged_call("stalled", stalled, timeout=0.05, hedge=False)
+            except TimeoutError:
+                pass
+        # Both threads still hold a timed-out attempt; the call is not queued behind them
+        start = time.monotonic()
+        assert hedged_call("stalled", lambda: "fresh", timeout=0.05) == "fresh"
+        assert time.monotonic() - start < 1
+    finally:
+        release.set()
+
+
+def test_async_losers_are_cancelled(monkeypatch):
+    monkeypatch.setitem(deadlines.DEFAULT_HEDGE_DELAYS, "racing", 0.01)
+    cancelled = []
+    attempts = []
+
+    async def attempt():
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return "hedged"
+
+    async def main():
+        result = await ahedged_call("racing", attempt, timeout=2)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == "hedged"
+    assert cancelled == [True]
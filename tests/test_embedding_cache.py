@@ -0,0 +1,57 @@
+import sqlite3
+import time
+
+import numpy as np
+
+from embedding_cache import EmbeddingCache
+
+
+def test_prune_keeps_the_most_recently_used_vectors(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.db", max_rows=3)
+    cache.put_many("mock", 2, [(f"hash-{i}", [float(i), 1.0]) for i in range(5)])
+    with cache._connect() as conn:
+        # Stored long ago, so that the hit below refreshes them
+        conn.execute("UPDATE embeddings SET last_used_at = ?", (time.time() - 7 * 24 * 3600,))
+    cache.get_many("mock", 2, ["hash-0"])
+
+    assert cache.prune() == 2
+    kept = cache.get_many("mock", 2, [f"hash-{i}" for i in range(5)])
+    assert "hash-0" in kept and len(kept) == 3
+
+
+def test_prune_drops_vectors_past_their_ttl(tmp_path):
+    cache = EmbeddingCache(tmp_path / "embeddings.db", ttl=3600)
+    cache.put_many("mock", 2, [("old", [1.0, 0.0]), ("new", [0.0, 1.0])])
+    with cache._connect() as conn:
+        conn.execute("UPDATE embeddings SET last_used_at = ? WHERE text_hash = 'old'", (time.time() - 7200,))
+
+    assert cache.prune() == 1
+    assert list(cache.get_many("mock", 2, ["old", "new"])) == ["new"]
+
+
+def test_caches_with_a_created_at_column_are_migrated(tmp_path):
+    path = tmp_path / "embeddings.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            """
+            CREATE TABLE embeddings (
+                embedder TEXT NOT NULL, dimensions INTEGER NOT NULL, text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL, created_at REAL NOT NULL,
+                PRIMARY KEY (embedder, dimensions, text_hash)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX embeddings_created_at ON embeddings (created_at)")
+        conn.execute(
+            "INSERT INTO embeddings VALUES ('mock', 2, 'old', ?, ?)",
+            (np.asarray([1.0, 0.0], dtype=np.float32).tobytes(), time.time()),
+        )
+    conn.close()
+
+    cache = EmbeddingCache(path)
+    assert cache.get_many("mock", 2, ["old"]) == {"old": [1.0, 0.0]}
+    with cache._connect() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(embeddings)")}
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(embeddings)")}
+    assert "last_used_at" in columns and "created_at" not in columns
+    assert "embeddings_last_used_at" in indexes and "embeddings_created_at" not in indexes
@@ -0,0 +1,17 @@
+import history
+import router
+
+
+def test_summary_model_follows_the_team_provider(monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_SUMMARY_MODEL", None)
+    monkeypatch.setattr(router, "load_router_config", lambda: {"triage_model": "gpt-5-mini"})
+
+    assert history.summary_model_id("openai:gpt-5") == "openai:gpt-5-mini"
+    # Mock and other providers never fall back to OpenAI
+    assert history.summary_model_id("mock:heavy") == "mock:heavy"
+    assert history.summary_model_id("anthropic:claude-sonnet-4") == "anthropic:claude-sonnet-4"
+
+
+def test_summary_model_override(monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_SUMMARY_MODEL", "mock:fast")
+    assert history.summary_model_id("openai:gpt-5") == "mock:fast"
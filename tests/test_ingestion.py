@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+from ingestion import EmbeddingPipeline, RateLimiter
+from mock_models import MockEmbedder
+
+
+class RateLimitError(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "0.1"})
+
+
+@dataclass
+class RateLimitedEmbedder(MockEmbedder):
+    """Answers the first call with a 429."""
+
+    calls: int = 0
+
+    def get_embedding_and_usage(self, text):
+        self.calls += 1
+        if self.calls == 1:
+            raise RateLimitError("Rate limit reached")
+        return super().get_embedding_and_usage(text)
+
+
+def test_batches_are_retried_after_a_rate_limit():
+    embedder = RateLimitedEmbedder(id="rate-limited", dimensions=8)
+    limiter = RateLimiter(requests_per_minute=6000, tokens_per_minute=1_000_000)
+    pipeline = EmbeddingPipeline(embedder, concurrency=1, rate_limiter=limiter)
+    tokens_before = pipeline.batch_size.tokens
+    texts = ["shingles vaccine", "herpes zoster", "postherpetic neuralgia"]
+
+    vectors = pipeline.embed(texts)
+
+    assert vectors == [embedder._embed(text) for text in texts]
+    # The failed batch is sent again: once failing, then once per text
+    assert embedder.calls == 1 + len(texts)
+    assert pipeline.batch_size.tokens < tokens_before
+    # The retry-after of the response holds back all ingestion
+    assert limiter._paused_until > 0
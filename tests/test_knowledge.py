@@ -0,0 +1,58 @@
+import json
+
+import pytest
+from agno.vectordb.lancedb import LanceDb, SearchType
+
+import knowledge
+from knowledge import HaloKnowledge
+from models import create_embedder
+
+
+def _pdf(pages: int) -> bytes:
+    """A minimal PDF with one line of text per page."""
+    objects = [b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>", None]
+    page_ids = []
+    for page in range(pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (Page %d covers antiviral option %d for shingles) Tj ET" % (page + 1, page)
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 1 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % i for i in page_ids), pages)
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, len(objects), xref)
+    return bytes(out)
+
+
+@pytest.mark.parametrize("stream_from_pages", [1000, 2], ids=["parsed", "streamed"])
+def test_uploaded_pdf_keeps_its_metadata(tmp_path, monkeypatch, stream_from_pages):
+    monkeypatch.setattr(knowledge, "STREAM_PDF_MIN_PAGES", stream_from_pages)
+    # The knowledge directory defaults to ./knowledge_docs
+    monkeypatch.chdir(tmp_path)
+    kb = HaloKnowledge(
+        vector_db=LanceDb(
+            table_name="uploads",
+            uri=str(tmp_path / "db"),
+            search_type=SearchType.vector,
+            embedder=create_embedder("mock:test"),
+        )
+    )
+    assert kb.knowledge_dir == tmp_path / "knowledge_docs"
+
+    report = kb.add_file("shingles.pdf", _pdf(3), metadata={"source": "upload", "owner": "ward-7"})
+
+    assert report.added == ["shingles.pdf"]
+    rows = kb.vector_db.table.to_pandas()
+    assert len(rows) > 0
+    for payload in rows["payload"]:
+        meta_data = json.loads(payload)["meta_data"]
+        assert meta_data["source"] == "upload" and meta_data["owner"] == "ward-7"
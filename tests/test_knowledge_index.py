@@ -0,0 +1,46 @@
+import json
+
+import lancedb
+import numpy as np
+import pyarrow as pa
+
+import knowledge_index
+from knowledge_index import FTS_INDEX_NAME, VECTOR_INDEX_NAME, IndexManager
+
+SCHEMA = pa.schema(
+    [
+        pa.field("vector", pa.list_(pa.float32(), 16)),
+        pa.field("id", pa.string()),
+        pa.field("payload", pa.string()),
+    ]
+)
+
+
+def _rows(start: int, count: int):
+    vectors = np.random.default_rng(start).normal(size=(count, 16)).astype(np.float32)
+    return [
+        {"vector": vector, "id": str(start + number), "payload": json.dumps({"content": f"chunk {start + number}"})}
+        for number, vector in enumerate(vectors)
+    ]
+
+
+def test_indexes_follow_the_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(knowledge_index, "VECTOR_INDEX_MIN_ROWS", 300)
+    connection = lancedb.connect(tmp_path)
+    connection.create_table("halo", _rows(0, 200), schema=SCHEMA)
+    manager = IndexManager(str(tmp_path), "halo")
+
+    # Small tables are scanned: only the full-text index is built
+    assert manager.update() == ["fts"]
+    connection.open_table("halo").add(_rows(200, 200))
+    assert manager.update() == ["vector:IVF_HNSW_SQ"]
+    assert {index.name for index in connection.open_table("halo").list_indices()} == {FTS_INDEX_NAME, VECTOR_INDEX_NAME}
+    assert manager.search_params()["ef"] and manager.state["recall"]["k"] == 10
+    assert manager.update() == []
+
+    # The state is kept beside the table
+    assert IndexManager(str(tmp_path), "halo").search_params() == manager.search_params()
+
+    connection.open_table("halo").add(_rows(400, 400))
+    assert manager.update() == ["retrain:IVF_HNSW_SQ"]
+    assert manager.state["vector_index"]["trained_rows"] == 800
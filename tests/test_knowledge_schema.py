@@ -0,0 +1,102 @@
+import json
+
+import pyarrow as pa
+
+from knowledge import SCHEMA_VERSION, KnowledgeManifest, row_id
+from knowledge_schema import KnowledgeMigrator
+from models import create_embedder
+from mock_models import MockEmbedder
+
+CONTENTS = ["Valacyclovir treats shingles.", "The zoster vaccine prevents shingles."]
+
+
+def _legacy_rows():
+    """Rows as an early version wrote them: placeholder row, float64 ``embedding`` and old payload keys."""
+    embed = MockEmbedder()._embed
+    rows = [
+        {
+            "embedding": embed("initialization"),
+            "id": "init",
+            "payload": json.dumps({"name": "initialization", "content": "initialization"}),
+        }
+    ]
+    for content in CONTENTS:
+        rows.append(
+            {
+                "embedding": embed(content),
+                "id": row_id(content),
+                "payload": json.dumps({"document_name": "shingles.md", "text": content, "metadata": {"page": 1}}),
+            }
+        )
+    return rows
+
+
+LEGACY_SCHEMA = pa.schema(
+    [
+        pa.field("embedding", pa.list_(pa.float64())),
+        pa.field("id", pa.string()),
+        pa.field("payload", pa.string()),
+    ]
+)
+
+
+def test_legacy_table_is_migrated_in_place(tmp_path):
+    migrator = KnowledgeMigrator(tmp_path, "halo", create_embedder("mock:test"))
+    migrator.connection.create_table("halo", _legacy_rows(), schema=LEGACY_SCHEMA)
+
+    plan = migrator.plan()
+
+    assert [(step.name, step.rows, step.rewrite) for step in plan.steps] == [
+        ("rename_vector", 0, False),
+        ("cast_vector", 0, False),
+        ("drop_placeholder", 1, False),
+        ("payload_fields", 2, False),
+    ]
+    # A dry run changes nothing
+    assert migrator.connection.open_table("halo").schema == LEGACY_SCHEMA
+
+    migrator.apply(plan)
+
+    table = migrator.connection.open_table("halo")
+    assert table.schema.field("vector").type == pa.list_(pa.float32(), 1536)
+    rows = sorted(table.to_arrow().to_pylist(), key=lambda row: row["id"])
+    assert [row["id"] for row in rows] == sorted(row_id(content) for content in CONTENTS)
+    payload = json.loads(rows[0]["payload"])
+    assert payload["name"] == "shingles.md" and payload["meta_data"] == {"page": 1}
+    assert payload["content"] in CONTENTS and "text" not in payload
+    manifest = KnowledgeManifest(migrator.manifest_path)
+    assert manifest.schema_version == SCHEMA_VERSION
+    assert not migrator.plan().needed
+
+
+def test_interrupted_copy_is_finished(tmp_path):
+    migrator = KnowledgeMigrator(tmp_path, "halo", create_embedder("mock:test"))
+    rows = [
+        {"vector": MockEmbedder()._embed(content), "id": row_id(content), "payload": json.dumps({"content": content})}
+        for content in CONTENTS
+    ]
+    # The copy was complete, but the process died while the old table was replaced
+    migrator.connection.create_table(migrator.copy_name, rows, schema=migrator._schema())
+    migrator.copy_done_path.touch()
+
+    plan = migrator.plan()
+    assert [step.name for step in plan.steps] == ["finish_copy"]
+    migrator.apply(plan)
+
+    assert migrator.connection.open_table("halo").count_rows() == len(CONTENTS)
+    assert migrator.copy_name not in migrator.connection.table_names()
+    assert not migrator.copy_done_path.exists()
+
+
+def test_partial_copy_is_dropped(tmp_path):
+    migrator = KnowledgeMigrator(tmp_path, "halo", create_embedder("mock:test"))
+    migrator.connection.create_table("halo", _legacy_rows(), schema=LEGACY_SCHEMA)
+    # Interrupted while still copying: no done marker
+    migrator.connection.create_table(migrator.copy_name, schema=migrator._schema())
+
+    plan = migrator.plan()
+    assert plan.steps[0].name == "drop_copy"
+    migrator.apply(plan)
+
+    assert migrator.copy_name not in migrator.connection.table_names()
+    assert migrator.connection.open_table("halo").count_rows() == len(CONTENTS)
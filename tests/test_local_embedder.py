@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+tokenizers = pytest.importorskip("tokenizers")
+
+from local_embedder import OnnxEmbedder  # noqa: E402
+
+WORDS = ["[PAD]", "[UNK]", "shingles", "rash", "vaccine", "valacyclovir", "pain"]
+
+
+def _write_model(model_dir, dimensions: int = 8) -> None:
+    """A token embedding lookup as ONNX model, with a word-level tokenizer."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = np.random.default_rng(0).normal(size=(len(WORDS), dimensions)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["weights", "input_ids"], ["last_hidden_state"])],
+        "token-embeddings",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "tokens"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "tokens"]),
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "tokens", dimensions])],
+        [numpy_helper.from_array(weights, "weights")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    model_dir.mkdir()
+    onnx.save(model, str(model_dir / "model.onnx"))
+
+    tokenizer = tokenizers.Tokenizer(
+        tokenizers.models.WordLevel({word: index for index, word in enumerate(WORDS)}, unk_token="[UNK]")
+    )
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.save(str(model_dir / "tokenizer.json"))
+    (model_dir / "config.json").write_text(json.dumps({"hidden_size": dimensions}), encoding="utf-8")
+
+
+def test_batches_match_single_embeddings(tmp_path):
+    _write_model(tmp_path / "tiny")
+    embedder = OnnxEmbedder(id="tiny", model_path=str(tmp_path / "tiny"), batch_size=2, num_threads=2)
+    texts = ["shingles rash pain vaccine", "shingles", "valacyclovir", "rash pain"]
+
+    vectors = embedder.get_embeddings_batch(texts)
+
+    assert embedder.dimensions == 8
+    # Padding of the shorter texts does not change their mean-pooled vectors
+    for text, vector in zip(texts, vectors):
+        assert np.allclose(vector, embedder.get_embedding(text), atol=1e-6)
+        assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert embedder.get_embedding_and_usage("shingles")[1] is None
+
+
+def test_missing_model_is_reported(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No ONNX model"):
+        OnnxEmbedder(id="missing", model_path=str(tmp_path))
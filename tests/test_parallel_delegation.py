@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from agno.agent import Agent
+from agno.team.team import Team
+
+from models import create_model
+from tools.parallel_delegation import ParallelDelegationTools
+
+
+def _team() -> Team:
+    members = [Agent(name=name, model=create_model("mock:fast")) for name in ("Pubmed", "Medical Imaging")]
+    return Team(name="Test team", model=create_model("mock:fast"), members=members, session_id="parallel")
+
+
+def test_delegation_runs_in_sync_code_on_member_copies():
+    team = _team()
+    for member in team.members:
+        # Runs on the shared members themselves would fail
+        member.arun = None
+    tools = ParallelDelegationTools(member_timeout=10)
+    results = json.loads(
+        tools.delegate_tasks_in_parallel(
+            team,
+            [
+                {"member_name": "pubmed", "task": "Find trials on metformin"},
+                {"member_name": "medical imaging", "task": "Describe a chest X-ray"},
+            ],
+        )
+    )
+    assert [result["status"] for result in results] == ["completed", "completed"]
+    assert "metformin" in results[0]["content"]
+
+
+def test_duplicate_members_are_merged_into_one_run():
+    team = _team()
+    tools = ParallelDelegationTools(member_timeout=10)
+    tasks = [
+        {"member_name": "Pubmed", "task": "Find trials on metformin"},
+        {"member_name": "pubmed", "task": "Find trials on insulin"},
+    ]
+    # Async runs call the synchronous tool in a worker thread
+    results = json.loads(asyncio.run(asyncio.to_thread(tools.delegate_tasks_in_parallel, team, tasks)))
+    assert len(results) == 1
+    assert "metformin" in results[0]["content"] and "insulin" in results[0]["content"]
@@ -0,0 +1,37 @@
+from parsing import DocumentParser
+from test_knowledge import _pdf
+
+
+def test_files_are_parsed_in_worker_processes(tmp_path):
+    notes = tmp_path / "notes.md"
+    notes.write_text("# Shingles\n\nValacyclovir shortens the rash.", encoding="utf-8")
+    guideline = tmp_path / "guideline.pdf"
+    guideline.write_bytes(_pdf(5))
+    # Raises in the worker: there is no reader for it
+    broken = tmp_path / "table.xlsx"
+    broken.write_bytes(b"not supported")
+
+    # Two pages per task, so the PDF is parsed in three page ranges
+    parsed = {
+        path.name: (documents, error)
+        for path, documents, error in DocumentParser(max_workers=2, pages_per_task=2).parse([notes, guideline, broken])
+    }
+
+    documents, error = parsed["notes.md"]
+    assert error is None and "Valacyclovir" in documents[0].content
+    documents, error = parsed["guideline.pdf"]
+    assert error is None
+    assert [document.meta_data["page"] for document in documents] == [1, 2, 3, 4, 5]
+    # One broken file does not fail the others
+    documents, error = parsed["table.xlsx"]
+    assert documents == [] and isinstance(error, ValueError)
+
+
+def test_pdf_pages_are_streamed_in_order(tmp_path):
+    guideline = tmp_path / "guideline.pdf"
+    guideline.write_bytes(_pdf(5))
+
+    windows = list(DocumentParser(max_workers=2, pages_per_task=2).iter_pdf_pages(guideline, start=1))
+
+    assert [pages_done for pages_done, _ in windows] == [3, 5]
+    assert [document.meta_data["page"] for _, documents in windows for document in documents] == [2, 3, 4, 5]
@@ -0,0 +1,26 @@
+import pytest
+
+from models import create_embedder
+from pubmed_index import PubmedIndex
+
+
+def _record(pmid: str, title: str) -> dict:
+    return {
+        "pmid": pmid, "title": title, "abstract": f"{title} in adults.", "authors": "", "journal": "",
+        "year": "2024", "doi": "", "pmc": "", "mesh_terms": "", "publication_types": "",
+    }
+
+
+RECORDS = [_record("1", "Metformin for type 2 diabetes"), _record("2", "Statins after myocardial infarction")]
+
+
+def test_vectors_of_another_embedder_are_not_searched(tmp_path):
+    PubmedIndex(path=tmp_path, embedder=create_embedder("mock:a"))._write_batch(RECORDS)
+    assert PubmedIndex(path=tmp_path, embedder=create_embedder("mock:a"))._vector_search("metformin", 5)
+
+    other = PubmedIndex(path=tmp_path, embedder=create_embedder("mock:b"))
+    assert other._vector_search("metformin", 5) == []
+    # Full-text search still answers
+    assert [article["pmid"] for article in other.search("metformin")] == ["1"]
+    with pytest.raises(ValueError, match="mock:a|MockEmbedder:a"):
+        other._write_batch([_record("3", "Insulin pumps")])
@@ -0,0 +1,38 @@
+from agno.knowledge.document import Document
+
+from mock_models import MockEmbedder
+from reranking import KnowledgeReranker
+
+PASSAGE = "Valacyclovir shortens shingles pain when started within three days of the rash."
+
+
+def _document(name: str, content: str, embed: bool = True) -> Document:
+    document = Document(name=name, content=content)
+    if embed:
+        document.embedding = MockEmbedder(dimensions=64)._embed(content)
+    return document
+
+
+def test_near_duplicate_chunks_are_dropped():
+    documents = [
+        _document("guideline", PASSAGE),
+        # The same passage from another document, and an overlapping window of it
+        _document("leaflet", PASSAGE),
+        _document("guideline-window", PASSAGE + " "),
+        _document("vaccine", "The recombinant zoster vaccine prevents shingles in adults over fifty."),
+        _document("flu", "Influenza vaccines are updated every season."),
+    ]
+
+    results = KnowledgeReranker().rerank("shingles valacyclovir", documents, top_k=3)
+
+    assert [document.name for document in results] == ["guideline", "vaccine", "flu"]
+    assert all(0.0 <= document.reranking_score <= 1.0 for document in results)
+
+
+def test_duplicates_are_found_by_token_overlap_without_embeddings():
+    documents = [_document(name, PASSAGE, embed=False) for name in ("first", "second")]
+    documents.append(_document("vaccine", "Zoster vaccine for shingles prevention.", embed=False))
+
+    results = KnowledgeReranker().rerank("shingles", documents, top_k=3)
+
+    assert [document.name for document in results] == ["first", "vaccine"]
@@ -0,0 +1,56 @@
+import json
+import time
+
+from agno.knowledge.document import Document
+from agno.models.message import Message
+from agno.run.team import TeamRunOutput
+
+import halo
+import response_cache
+from models import create_embedder
+from response_cache import SemanticResponseCache, used_personal_context
+
+
+def test_loaded_documents_change_the_knowledge_version():
+    before = halo.halo_knowledge.knowledge_version()
+    halo.halo_knowledge.load_documents([Document(name="scraped", content="Aspirin inhibits COX-1 and COX-2.")])
+    assert halo.halo_knowledge.knowledge_version() != before
+
+
+def test_runs_with_memories_or_summary_are_personal():
+    def run(system_prompt):
+        return TeamRunOutput(
+            content="answer",
+            messages=[Message(role="system", content=system_prompt), Message(role="user", content="question")],
+        )
+
+    assert not used_personal_context(run("You are HALO."))
+    assert used_personal_context(
+        run("You are HALO.\n\n<memories_from_previous_interactions>\n- Allergic to penicillin\n</memories_from_previous_interactions>")
+    )
+    member = run("You are an agent.\n\n<summary_of_previous_interactions>\nTalked about asthma\n</summary_of_previous_interactions>")
+    assert used_personal_context(TeamRunOutput(content="answer", member_responses=[member]))
+
+
+def test_entries_expire_while_their_index_is_loaded(tmp_path):
+    cache = SemanticResponseCache(create_embedder("mock:test"), path=tmp_path / "responses.db", ttl=0.5)
+    question = "What is the first-line treatment for hypertension?"
+    cache.store(question, "Thiazides or ACE inhibitors.", "scope", "1", latency=3.0)
+    assert cache.lookup(question, "scope", "1") is not None
+
+    # The index loaded above is still in memory after the entry expired
+    time.sleep(0.6)
+    assert cache.lookup(question, "scope", "1") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_cache_switch_of_the_configuration_page(tmp_path, monkeypatch):
+    monkeypatch.delenv("HALO_SEMANTIC_CACHE", raising=False)
+    monkeypatch.setattr(response_cache, "MODEL_CONFIG_PATH", tmp_path / "model_config.json")
+    assert not halo.HaloConfig(user_id="u").semantic_cache
+
+    (tmp_path / "model_config.json").write_text(json.dumps({"semantic_cache": True}))
+    assert halo.HaloConfig(user_id="u").semantic_cache
+
+    monkeypatch.setenv("HALO_SEMANTIC_CACHE", "0")
+    assert not halo.HaloConfig(user_id="u").semantic_cache
@@ -0,0 +1,41 @@
+from agno.knowledge.document import Document
+from agno.vectordb.lancedb import SearchType
+
+from knowledge_index import IndexedLanceDb
+from models import create_embedder
+from retrieval_cache import RetrievalCache, result_key
+
+
+def test_results_are_keyed_by_table_version():
+    cache = RetrievalCache(path=None)
+    key = result_key("tmp/lancedb/halo", 3, "hybrid", "shingles  treatment", 5)
+    cache.put_results(key, "tmp/lancedb/halo", 3, ["chunk-1"], [Document(id="chunk-1", content="Valacyclovir")])
+
+    # Whitespace of the query does not matter, the table version does
+    assert cache.get_results(result_key("tmp/lancedb/halo", 3, "hybrid", "shingles treatment", 5)).ids == ["chunk-1"]
+    assert cache.get_results(result_key("tmp/lancedb/halo", 4, "hybrid", "shingles treatment", 5)) is None
+
+
+def test_a_write_to_the_table_invalidates_cached_results(tmp_path):
+    vector_db = IndexedLanceDb(
+        uri=str(tmp_path / "lancedb"),
+        table_name="halo",
+        embedder=create_embedder("mock:test"),
+        search_type=SearchType.vector,
+    )
+    vector_db.retrieval_cache = cache = RetrievalCache(path=None)
+    vector_db.create()
+    vector_db.insert("first", [Document(content="Valacyclovir treats shingles.")])
+
+    assert [document.content for document in vector_db.search("shingles treatment")] == ["Valacyclovir treats shingles."]
+    vector_db.search("shingles treatment")
+    assert cache.get_stats()["result_hits"] == 1
+
+    vector_db.insert("second", [Document(content="Shingles treatment with famciclovir.")])
+    results = vector_db.search("shingles treatment")
+
+    assert len(results) == 2
+    stats = cache.get_stats()
+    assert (stats["result_hits"], stats["result_misses"]) == (1, 2)
+    # The search after the write reused the query embedding
+    assert (stats["embedding_hits"], stats["embedding_misses"]) == (1, 1)
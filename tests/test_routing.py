@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+import halo
+import router
+from accounting import get_usage_recorder
+from router import TriageResult
+
+ROUTER_CONFIG = {"router_enabled": True, "triage_model": "mock:fast", "router_confidence_threshold": 0.8}
+
+
+def _triage(message, model_id=None):
+    if len(message) < 40:
+        return TriageResult(category="chit_chat", confidence=0.95), 0.0
+    return TriageResult(category="full_analysis", confidence=0.95), 0.0
+
+
+async def _atriage(message, model_id=None):
+    return _triage(message, model_id)
+
+
+@pytest.fixture
+def routed_halo(monkeypatch):
+    monkeypatch.setattr(router, "load_router_config", lambda: dict(ROUTER_CONFIG))
+    monkeypatch.setattr(router, "classify", _triage)
+    monkeypatch.setattr(router, "aclassify", _atriage)
+    return halo.create_halo(halo.HaloConfig(user_id="tester", model_id="mock:heavy"), session_id="routing")
+
+
+def test_short_message_runs_on_light_model(routed_halo):
+    response = routed_halo.run("Hi there!")
+    assert "from fast" in response.content
+
+
+def test_medical_question_runs_on_configured_model(routed_halo):
+    response = routed_halo.run("What are the first-line treatments for community-acquired pneumonia in adults?")
+    assert "from heavy" in response.content
+
+
+def test_async_short_message_runs_on_light_model(routed_halo):
+    response = asyncio.run(routed_halo.arun("Thanks, bye"))
+    assert "from fast" in response.content
+
+
+def test_routed_run_is_recorded_once(routed_halo):
+    response = routed_halo.run("Hello again")
+    recorder = get_usage_recorder()
+    recorder.flush()
+    events = [event for event in recorder.recent_events() if event["run_id"] == response.run_id]
+    assert [event["kind"] for event in events].count("run") == 1
+
+
+def test_sessions_copy_members_but_share_their_db_and_knowledge():
+    config = halo.HaloConfig(user_id="tester", model_id="mock:heavy", agents=["pubmed"])
+    first = halo.create_halo(config, session_id="first")
+    second = halo.create_halo(config, session_id="second")
+    template = halo.get_halo_template(config)
+
+    assert template.members[0].knowledge is not None
+    assert first.members[0] is not second.members[0]
+    assert first.model is not second.model
+    for team in (first, second):
+        assert team.members[0].db is template.members[0].db
+        assert team.members[0].knowledge is template.members[0].knowledge
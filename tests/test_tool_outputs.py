@@ -0,0 +1,29 @@
+import os
+import time
+
+import tools.tool_outputs as tool_outputs
+from tools.tool_outputs import ToolOutputStore
+
+
+def test_store_prunes_expired_outputs_when_opened(tmp_path):
+    handle = ToolOutputStore(tmp_path).put("a" * 100)
+    expired = time.time() - 3600
+    os.utime(tmp_path / f"{handle}.txt", (expired, expired))
+
+    store = ToolOutputStore(tmp_path, max_age=60)
+    assert store.get(handle) is None
+
+
+def test_puts_prune_the_oldest_outputs_over_the_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool_outputs, "PRUNE_EVERY", 3)
+    store = ToolOutputStore(tmp_path, max_bytes=250)
+    handles = []
+    for i in range(2):
+        handles.append(store.put(str(i) * 100))
+        written = time.time() - 100 + i
+        os.utime(tmp_path / f"{handles[-1]}.txt", (written, written))
+    # The third put goes over the limit and prunes the oldest output
+    handles.append(store.put("2" * 100))
+    assert store.get(handles[0]) is None
+    assert store.get(handles[1]) == "1" * 100
+    assert store.get(handles[2]) == "2" * 100
@@ -8,20 +8,50 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from agno.tools import Toolkit
 from agno.tools.file import FileTools
+from agno.tools.pubmed import PubmedTools
 from agno.tools.shell import ShellTools
+from pubmed_index import pubmed_index_exists
 from .gptimage1 import GPTImage1Tools
+from .local_pubmed import LocalPubmedTools
+from .pubmed_cache import CachedPubmedTools
+from .tool_outputs import ToolOutputTools, gate_tool_outputs
 
 cwd = Path(__file__).parent.parent.resolve()
-tmp_dir = cwd.joinpath("tmp")
+# HALO_TMP_DIR moves the local stores elsewhere, e.g. for tests
+tmp_dir = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp")))
 tmp_dir.mkdir(exist_ok=True, parents=True)
 
 
 def get_toolkit(tool_name: str) -> Optional[Toolkit]:
+    """Return a toolkit by name; oversized results go through the tool-output gateway."""
+    toolkit = None
     if tool_name == "file_tools":
-        return FileTools(base_dir=cwd)
+        toolkit = FileTools(base_dir=cwd)
     elif tool_name == "shell_tools":
-        return ShellTools()
+        toolkit = ShellTools()
     elif tool_name == "gptimage1":
-        return GPTImage1Tools()
+        toolkit = GPTImage1Tools()
+    elif tool_name == "local_pubmed":
+        toolkit = LocalPubmedTools()
 
-    return None
+    return gate_tool_outputs(toolkit)
+
+
+def get_pubmed_toolkit() -> CachedPubmedTools:
+    """Return the local PubMed toolkit if an index has been loaded, else the online one.
+
+    Either is wrapped in the shared search cache, which literature prefetching warms,
+    and in the tool-output gateway.
+    Set ``PUBMED_OFFLINE=true`` to force the local index, or ``false`` to force PubMed.
+    """
+    offline = os.getenv("PUBMED_OFFLINE", "").lower()
+    if offline in ("0", "false", "no"):
+        return gate_tool_outputs(CachedPubmedTools(PubmedTools()))
+
+    force_offline = offline in ("1", "true", "yes")
+    # Checked before opening, which would create an empty index
+    if force_offline or pubmed_index_exists():
+        local_tools = LocalPubmedTools()
+        if force_offline or local_tools.index.has_articles():
+            return gate_tool_outputs(CachedPubmedTools(local_tools))
+    return gate_tool_outputs(CachedPubmedTools(PubmedTools()))
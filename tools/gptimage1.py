@@ -7,6 +7,7 @@ import base64
 import os.path
 import sys
 import asyncio
+import weakref
 
 from agno.agent import Agent
 from agno.media import Image
@@ -22,7 +23,7 @@ if sys.platform == "win32":
 
 # Import OpenAI client safely
 try:
-    from openai import OpenAI
+    from openai import AsyncOpenAI
 
     # We don't need to import ImagesResponse directly to avoid pickling issues
 except ImportError:
@@ -31,6 +32,11 @@ except ImportError:
     )
 
 
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, "wb") as f:
+        f.write(data)
+
+
 class GPTImage1Tools(Toolkit):
     def __init__(
         self,
@@ -46,6 +52,11 @@ class GPTImage1Tools(Toolkit):
         self.n = n
         self.size = size
         self.api_key = api_key or getenv("OPENAI_API_KEY")
+        # One client per event loop: its connection pool is bound to the loop
+        # that first used it, and the toolkit is shared by concurrent runs
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+            weakref.WeakKeyDictionary()
+        )
 
         # Validations
         if model != "gpt-image-1":
@@ -69,6 +80,14 @@ class GPTImage1Tools(Toolkit):
         # - Add support for response_format
         # - Add support for saving images
 
+    def _client(self) -> AsyncOpenAI:
+        """Return the client of the running event loop, creating it on first use."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = AsyncOpenAI(api_key=self.api_key)
+        return client
+
     async def create_image(self, agent: Union[Agent, Team], prompt: str) -> str:
         """Use this function to generate an image for a prompt.
 
@@ -82,14 +101,13 @@ class GPTImage1Tools(Toolkit):
             return "Please set the OPENAI_API_KEY"
 
         try:
-            client = OpenAI(api_key=self.api_key)
             log_debug(f"Generating image using prompt: {prompt}")
             log_debug(
                 f"API parameters: model={self.model}, n={self.n}, size={self.size}"
             )
 
             # Call the OpenAI API with the supported parameters for gpt-image-1
-            response = client.images.generate(
+            response = await self._client().images.generate(
                 prompt=prompt,
                 model=self.model,
                 n=self.n,
@@ -159,8 +177,7 @@ class GPTImage1Tools(Toolkit):
 
                             # Decode and save the image
                             img_data = base64.b64decode(img.b64_json)
-                            with open(img_path, "wb") as f:
-                                f.write(img_data)
+                            await asyncio.to_thread(_write_file, img_path, img_data)
 
                             # Create URLs for the local file
                             file_url = f"file://{img_path}"
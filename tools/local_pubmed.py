@@ -0,0 +1,91 @@
+import json
+from typing import Optional
+
+from agno.tools import Toolkit
+from agno.utils.log import log_debug, logger
+
+from pubmed_index import PUBMED_INDEX_PATH, PubmedIndex, pubmed_vectors_exist
+
+
+class LocalPubmedTools(Toolkit):
+    """Offline drop-in replacement for ``PubmedTools`` backed by a local index."""
+
+    def __init__(
+        self,
+        index: Optional[PubmedIndex] = None,
+        max_results: Optional[int] = None,
+        **kwargs,
+    ):
+        # Keep the toolkit name of PubmedTools so agent instructions stay valid
+        super().__init__(name="pubmed", **kwargs)
+
+        self._index = index
+        self.max_results = max_results
+
+        self.register(self.search_pubmed)
+        self.register(self.fetch_pubmed_abstract)
+
+    @property
+    def index(self) -> PubmedIndex:
+        # Opened on first use, so building an agent does not create an index file
+        if self._index is None:
+            embedder = None
+            if pubmed_vectors_exist(PUBMED_INDEX_PATH):
+                # Same embedder as `load_pubmed.py --embed`, so the stored vectors are searched
+                from models import create_embedder
+
+                embedder = create_embedder()
+            self._index = PubmedIndex(embedder=embedder)
+        return self._index
+
+    def _format_article(self, article: dict) -> str:
+        pmid = article.get("pmid", "")
+        return (
+            f"PMID: {pmid}\n"
+            f"Published: {article.get('year') or 'No date available'}\n"
+            f"Title: {article.get('title') or 'No title available'}\n"
+            f"Authors: {article.get('authors') or 'Unknown'}\n"
+            f"Journal: {article.get('journal') or 'Unknown Journal'}\n"
+            f"Publication Type: {article.get('publication_types') or 'Not specified'}\n"
+            f"DOI: {article.get('doi') or 'No DOI available'}\n"
+            f"PubMed URL: https://pubmed.ncbi.nlm.nih.gov/{pmid}/\n"
+            f"MeSH Terms: {article.get('mesh_terms') or 'No MeSH terms available'}\n"
+            f"Summary:\n{article.get('abstract') or 'No abstract available'}"
+        )
+
+    def search_pubmed(self, query: str, max_results: Optional[int] = 10) -> str:
+        """Use this function to search PubMed for articles.
+
+        Args:
+            query (str): The search query.
+            max_results (int): The maximum number of results to return (default 10).
+
+        Returns:
+            str: A JSON string containing the search results.
+        """
+        try:
+            log_debug(f"Searching local PubMed index for: {query}")
+            max_results = max_results or self.max_results or 10
+            articles = self.index.search(query, limit=max_results)
+            return json.dumps([self._format_article(article) for article in articles])
+        except Exception as e:
+            logger.error(f"Local PubMed search failed: {e}")
+            return f"Could not fetch articles. Error: {e}"
+
+    def fetch_pubmed_abstract(self, pmid: str) -> str:
+        """Use this function to fetch the full abstract of a PubMed article by its PMID.
+
+        Args:
+            pmid (str): The PubMed identifier of the article.
+
+        Returns:
+            str: The article details and abstract, or an error message.
+        """
+        try:
+            article = self.index.get(str(pmid).strip())
+            if article is None:
+                return f"No article found for PMID {pmid}"
+            return self._format_article(article)
+        except Exception as e:
+            logger.error(f"Local PubMed lookup failed: {e}")
+            return f"Could not fetch article. Error: {e}"
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+from agno.run.agent import RunEvent
+from agno.team.team import Team
+from agno.tools import Toolkit
+from agno.utils.log import log_debug, logger
+
+from async_runtime import run_async
+
+
+def _normalize(name: str) -> str:
+    return name.lower().replace("_", " ").replace("-", " ").strip()
+
+
+class ParallelDelegationTools(Toolkit):
+    """Fan independent member tasks out concurrently and collect their results.
+
+    The tool is synchronous so that it works in ``run`` as well as ``arun``:
+    the member runs are multiplexed on the shared event loop. Each of them
+    runs on its own copy of the member, since agno mutates agents during a run.
+    """
+
+    def __init__(self, member_timeout: float = 120.0, **kwargs):
+        super().__init__(name="parallel_delegation", **kwargs)
+        self.member_timeout = member_timeout
+        self.register(self.delegate_tasks_in_parallel)
+
+    def _find_member(self, team: Team, member_name: str) -> Optional[Any]:
+        wanted = _normalize(member_name)
+        for member in team.members or []:
+            if wanted in (
+                _normalize(getattr(member, "name", "") or ""),
+                _normalize(getattr(member, "id", "") or ""),
+            ):
+                return member
+        return None
+
+    async def _run_member(
+        self, team: Team, member: Any, task: str, timeout: float
+    ) -> Dict[str, Any]:
+        """Stream one member run, keeping partial content if it times out."""
+        chunks: List[str] = []
+        start = time.perf_counter()
+
+        async def consume() -> None:
+            async for event in member.arun(
+                input=task,
+                stream=True,
+                session_id=team.session_id,
+                user_id=team.user_id,
+            ):
+                if getattr(event, "event", None) == RunEvent.run_content.value:
+                    content = getattr(event, "content", None)
+                    if isinstance(content, str):
+                        chunks.append(content)
+
+        status = "completed"
+        try:
+            await asyncio.wait_for(consume(), timeout=timeout)
+        except asyncio.TimeoutError:
+            status = "timed_out"
+            logger.warning(f"Member {member.name} timed out after {timeout}s")
+        except Exception as e:
+            status = f"error: {e}"
+            logger.error(f"Member {member.name} failed: {e}")
+
+        return {
+            "member": member.name,
+            "status": status,
+            "duration": round(time.perf_counter() - start, 2),
+            "content": "".join(chunks),
+        }
+
+    async def _delegate(self, team: Team, tasks: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        # Tasks of the same member are merged into one run
+        member_tasks: Dict[int, Any] = {}
+        for entry in tasks:
+            member_name = entry.get("member_name", "")
+            member = self._find_member(team, member_name)
+            if member is None:
+                results.append(
+                    {"member": member_name, "status": "error: member not found"}
+                )
+                continue
+            member_tasks.setdefault(id(member), (member, []))[1].append(entry.get("task", ""))
+
+        runs = [
+            self._run_member(
+                team,
+                member.deep_copy(),
+                "\n\n".join(task for task in member_task_list if task),
+                self.member_timeout,
+            )
+            for member, member_task_list in member_tasks.values()
+        ]
+        log_debug(f"Delegating {len(runs)} tasks in parallel")
+        results.extend(await asyncio.gather(*runs))
+        return results
+
+    def delegate_tasks_in_parallel(
+        self, team: Team, tasks: List[Dict[str, str]]
+    ) -> str:
+        """Use this function to run independent tasks on several team members at the same time.
+
+        Only use it when the tasks do not depend on each other's results.
+
+        Args:
+            tasks (List[Dict[str, str]]): One entry per member, each with the keys
+                "member_name" (name of the team member) and "task" (the full, self-contained task for that member).
+
+        Returns:
+            str: A JSON list with each member's status ("completed", "timed_out" or an error) and its (possibly partial) response.
+        """
+        # Member runs time out on their own; the margin covers setting them up
+        return json.dumps(run_async(self._delegate(team, tasks), timeout=self.member_timeout + 30))
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from typing import Callable, Optional, Tuple
+
+from agno.tools import Toolkit
+from agno.utils.log import log_debug, logger
+
+from deadlines import hedged_call, stage_timeout
+
+SearchFunction = Callable[[str, int], str]
+
+# Returned instead of results when PubMed does not answer within the deadline
+LITERATURE_UNAVAILABLE = "Literature unavailable"
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _is_error(result: str) -> bool:
+    # PubmedTools reports failures as text instead of raising
+    return not isinstance(result, str) or result.startswith(("Could not fetch", LITERATURE_UNAVAILABLE))
+
+
+class PubmedSearchCache:
+    """Bounded, time-limited cache of PubMed search results.
+
+    Entries are futures, so a tool call for a query that is still being
+    prefetched waits for that fetch instead of issuing a duplicate request.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, int, Future]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: str, max_results: int) -> Optional[Future]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created, cached_results, future = entry
+        expired = time.monotonic() - created > self.ttl
+        if expired or future.cancelled() or cached_results < max_results:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return future
+
+    def _store(self, key: str, max_results: int, future: Future) -> None:
+        self._entries[key] = (time.monotonic(), max_results, future)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            evicted.cancel()
+
+    @staticmethod
+    def _trim(result: str, max_results: int) -> str:
+        # Results are JSON lists; serve a smaller request from a larger cached one
+        try:
+            articles = json.loads(result)
+        except (TypeError, ValueError):
+            return result
+        if isinstance(articles, list):
+            return json.dumps(articles[:max_results])
+        return result
+
+    def search(
+        self, query: str, max_results: int, search_fn: SearchFunction, timeout: float = 60.0
+    ) -> str:
+        """Return a cached (or in-flight) result, or run the search and cache it."""
+        key = _normalize_query(query)
+        with self._lock:
+            future = self._lookup(key, max_results)
+            owner = future is None
+            if owner:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._store(key, max_results, future)
+
+        if not owner:
+            try:
+                result = future.result(timeout=timeout)
+                if not _is_error(result):
+                    log_debug(f"PubMed cache hit: {query}")
+                    return self._trim(result, max_results)
+                self.discard(query)
+            except TimeoutError:
+                # The in-flight search already used up the time of this one
+                raise
+            except Exception as e:
+                logger.debug(f"Cached PubMed search unavailable, fetching again: {e}")
+            return search_fn(query, max_results)
+
+        try:
+            result = search_fn(query, max_results)
+        except Exception as e:
+            future.set_exception(e)
+            self.discard(query)
+            raise
+        future.set_result(result)
+        if _is_error(result):
+            # Never serve failures from the cache
+            self.discard(query)
+        return result
+
+    def prefetch(
+        self,
+        query: str,
+        max_results: int,
+        search_fn: SearchFunction,
+        executor: Executor,
+    ) -> Optional[Future]:
+        """Schedule a search on the executor unless it is already cached."""
+        key = _normalize_query(query)
+        with self._lock:
+            if self._lookup(key, max_results) is not None:
+                return None
+            future = executor.submit(search_fn, query, max_results)
+            self._store(key, max_results, future)
+        return future
+
+    def discard(self, query: str) -> None:
+        with self._lock:
+            self._entries.pop(_normalize_query(query), None)
+
+
+# Process-wide cache shared by all sessions
+pubmed_search_cache = PubmedSearchCache()
+
+
+class CachedPubmedTools(Toolkit):
+    """Wraps a PubMed toolkit so searches are served from the shared cache."""
+
+    def __init__(
+        self,
+        pubmed_tools: Toolkit,
+        cache: PubmedSearchCache = pubmed_search_cache,
+        **kwargs,
+    ):
+        # Keep the toolkit name of PubmedTools so agent instructions stay valid
+        super().__init__(name="pubmed", **kwargs)
+        self.pubmed_tools = pubmed_tools
+        self.cache = cache
+
+        self.register(self.search_pubmed)
+        # Expose the PMID lookup of the local index unchanged
+        if hasattr(pubmed_tools, "fetch_pubmed_abstract"):
+            self.register(pubmed_tools.fetch_pubmed_abstract)
+
+    def _search(self, query: str, max_results: int) -> str:
+        return self.pubmed_tools.search_pubmed(query, max_results=max_results)
+
+    def search_pubmed(self, query: str, max_results: Optional[int] = 10) -> str:
+        """Use this function to search PubMed for articles.
+
+        Args:
+            query (str): The search query.
+            max_results (int): The maximum number of results to return (default 10).
+
+        Returns:
+            str: A JSON string containing the search results.
+        """
+        timeout = stage_timeout("pubmed")
+        try:
+            return self.cache.search(
+                query,
+                max_results or 10,
+                lambda q, n: hedged_call("pubmed", self._search, q, n, timeout=timeout),
+                timeout=timeout,
+            )
+        except TimeoutError:
+            return (
+                f"{LITERATURE_UNAVAILABLE}: PubMed did not respond within {timeout:.0f}s. "
+                "Continue without it and state that literature is unavailable."
+            )
+
+    def prefetch(
+        self, query: str, executor: Executor, max_results: int = 10
+    ) -> Optional[Future]:
+        """Warm the cache for a query in the background."""
+        return self.cache.prefetch(query, max_results, self._search, executor)
@@ -0,0 +1,228 @@
+"""
+Tool-output gateway.
+
+Large tool results (PubMed dumps, file contents, shell output) are stored
+out-of-band as content-addressed files in ``tmp/tool_outputs``. The model and
+the chat history only get a bounded view with a handle; ``read_tool_output``
+pages in more when it is actually needed. The store prunes itself when it
+is opened and every ``PRUNE_EVERY`` new outputs.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from agno.tools import Toolkit
+from agno.utils.log import log_debug, logger
+
+cwd = Path(__file__).parent.parent.resolve()
+TOOL_OUTPUT_DIR = Path(os.getenv("HALO_TMP_DIR", cwd.joinpath("tmp"))).joinpath("tool_outputs")
+
+# Results up to this length are passed through unchanged
+MAX_INLINE_CHARS = int(os.getenv("HALO_TOOL_OUTPUT_INLINE_CHARS", "4000"))
+# Largest page read_tool_output returns at once
+MAX_PAGE_CHARS = 8000
+# Outputs not written for this many seconds are pruned
+MAX_AGE = float(os.getenv("HALO_TOOL_OUTPUT_MAX_AGE", str(7 * 24 * 3600)))
+# Total size of the stored outputs; beyond it the oldest are pruned
+MAX_BYTES = int(os.getenv("HALO_TOOL_OUTPUT_MAX_BYTES", str(512 * 1024 * 1024)))
+# New outputs between two prunes
+PRUNE_EVERY = 100
+
+HANDLE_PATTERN = re.compile(r"tool_output:([0-9a-f]{16})")
+
+
+class ToolOutputStore:
+    """Content-addressed files holding full tool results.
+
+    Args:
+        directory: Where the outputs are stored
+        max_age: Outputs not written for this many seconds are pruned
+        max_bytes: Total size of the outputs; beyond it the oldest are pruned
+    """
+
+    def __init__(self, directory: Path = TOOL_OUTPUT_DIR, max_age: float = MAX_AGE, max_bytes: int = MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._puts_since_prune = 0
+        self.prune()
+
+    def _path(self, handle: str) -> Path:
+        if not re.fullmatch(r"[0-9a-f]{16}", handle):
+            raise ValueError(f"Invalid tool output handle: {handle!r}")
+        return self.directory.joinpath(f"{handle}.txt")
+
+    def put(self, text: str) -> str:
+        """Store a result and return its handle; identical results share one file."""
+        handle = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        path = self._path(handle)
+        if path.exists():
+            # Refresh the age, so pruning keeps outputs that are still produced
+            path.touch()
+            return handle
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._puts_since_prune += 1
+            due = self._puts_since_prune >= PRUNE_EVERY
+            if due:
+                self._puts_since_prune = 0
+        if due:
+            self.prune()
+        return handle
+
+    def get(self, handle: str) -> Optional[str]:
+        path = self._path(handle)
+        if not path.exists():
+            return None
+        return path.read_text(encoding="utf-8")
+
+    def prune(self) -> int:
+        """Delete outputs older than ``max_age``, then the oldest beyond ``max_bytes``.
+
+        Returns:
+            int: Number of deleted outputs
+        """
+        cutoff = time.time() - self.max_age
+        kept = []
+        deleted = 0
+        for path in self.directory.glob("*.txt"):
+            try:
+                stat = path.stat()
+                if stat.st_mtime < cutoff:
+                    path.unlink()
+                    deleted += 1
+                else:
+                    kept.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in kept)
+        for _, size, path in sorted(kept):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            deleted += 1
+        if deleted:
+            log_debug(f"Pruned {deleted} stored tool outputs")
+        return deleted
+
+
+tool_output_store = ToolOutputStore()
+
+
+def _json_preview(text: str, max_chars: int) -> Optional[str]:
+    # Keep whole items of JSON lists (e.g. PubMed results) instead of cutting one in half
+    try:
+        items = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(items, list):
+        return None
+    shown = []
+    for item in items:
+        if len(json.dumps(shown + [item], ensure_ascii=False)) > max_chars:
+            break
+        shown.append(item)
+    if not shown:
+        return None
+    return (
+        json.dumps(shown, ensure_ascii=False)
+        + f"\n[{len(shown)} of {len(items)} results shown]"
+    )
+
+
+def tool_output_view(text: str, handle: str, max_chars: int = MAX_INLINE_CHARS) -> str:
+    """Return the bounded view of a stored result the model gets to see."""
+    preview = _json_preview(text, max_chars)
+    if preview is None:
+        preview = text[:max_chars].rstrip() + "\n[...]"
+        offset = max_chars
+    else:
+        offset = 0
+    return (
+        f"{preview}\n[Output truncated: {len(text)} characters in total, stored as "
+        f'tool_output:{handle}. Call read_tool_output(handle="{handle}", offset={offset}) '
+        "only if you need more of it.]"
+    )
+
+
+def gate_tool_output(fc: Any) -> None:
+    """Post-hook replacing an oversized tool result by a bounded view."""
+    result = fc.result
+    if not isinstance(result, str) or len(result) <= MAX_INLINE_CHARS:
+        return
+    try:
+        handle = tool_output_store.put(result)
+    except OSError as e:
+        logger.warning(f"Could not store output of {fc.function.name}: {e}")
+        return
+    fc.result = tool_output_view(result, handle)
+    log_debug(f"Stored {len(result)} characters of {fc.function.name} as tool_output:{handle}")
+
+
+def gate_tool_outputs(toolkit: Optional[Toolkit]) -> Optional[Toolkit]:
+    """Route the results of all functions of a toolkit through the gateway."""
+    if toolkit is None:
+        return None
+    for function in toolkit.functions.values():
+        if function.post_hook is None:
+            function.post_hook = gate_tool_output
+    return toolkit
+
+
+def find_tool_output_handle(text: Any) -> Optional[str]:
+    """Return the handle of a gated tool result, if it is one."""
+    if not isinstance(text, str):
+        return None
+    match = HANDLE_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+class ToolOutputTools(Toolkit):
+    """Lets the model page through tool results stored by the gateway."""
+
+    def __init__(self, store: ToolOutputStore = tool_output_store, **kwargs):
+        super().__init__(name="tool_outputs", **kwargs)
+        self.store = store
+        self.register(self.read_tool_output)
+
+    def read_tool_output(self, handle: str, offset: int = 0, max_chars: int = MAX_INLINE_CHARS) -> str:
+        """Use this function to read more of a truncated tool result.
+
+        Args:
+            handle (str): The handle from the truncation note, e.g. "3f2a9c0d1b7e4a55".
+            offset (int): Character offset to start reading at.
+            max_chars (int): Maximum number of characters to return.
+
+        Returns:
+            str: The requested part of the stored result.
+        """
+        handle = handle.removeprefix("tool_output:")
+        try:
+            text = self.store.get(handle)
+        except ValueError as e:
+            return f"Error: {e}"
+        if text is None:
+            return f"Error: no stored tool output {handle}"
+        offset = max(offset, 0)
+        end = offset + min(max(max_chars, 1), MAX_PAGE_CHARS)
+        page = text[offset:end]
+        if end < len(text):
+            page += (
+                f"\n[Characters {offset}-{end} of {len(text)}. "
+                f'Call read_tool_output(handle="{handle}", offset={end}) for more.]'
+            )
+        return page
@@ -1,21 +1,18 @@
+import asyncio
 import json
 import os
-import importlib
-import inspect
 from typing import Any, Dict, List, Optional, Tuple
 
 import streamlit as st
 from agno.knowledge.document import Document
-from agno.knowledge.reader import Reader
-from agno.knowledge.reader.csv_reader import CSVReader
-from agno.knowledge.reader.docx_reader import DocxReader
-from agno.knowledge.reader.pdf_reader import PDFReader
-from agno.knowledge.reader.text_reader import TextReader
 from agno.knowledge.reader.website_reader import WebsiteReader
 from agno.memory import MemoryManager
 from agno.team import Team
 from agno.utils.log import logger
+from agents import list_agents
 from halo import HaloConfig, create_halo
+from parsing import SUPPORTED_FORMATS
+from tools.tool_outputs import find_tool_output_handle, tool_output_store
 from config import config
 
 
@@ -133,6 +130,10 @@ async def selected_model() -> str:
         except (json.JSONDecodeError, FileNotFoundError):
             pass
 
+    # Full provider:model ids (e.g. mock:fast) are used as they are
+    if ":" in default_model:
+        return default_model
+
     # Use the default model from configuration
     model_id = model_options.get(default_model, model_options["gpt-5.2"])
     return model_id
@@ -693,7 +694,9 @@ def display_tool_calls(tool_calls_container, tools):
                         tool_args = tool_call.get("tool_args") or tool_call.get(
                             "args", {}
                         )
-                        content = tool_call.get("content", None)
+                        content = tool_call.get("content", None) or tool_call.get(
+                            "result", None
+                        )
                         metrics = tool_call.get("metrics", None)
                     else:
                         # New style: ToolExecution object in Agno 1.5.5
@@ -703,7 +706,9 @@ def display_tool_calls(tool_calls_container, tools):
                         tool_args = getattr(tool_call, "tool_args", None) or getattr(
                             tool_call, "args", {}
                         )
-                        content = getattr(tool_call, "content", None)
+                        content = getattr(tool_call, "content", None) or getattr(
+                            tool_call, "result", None
+                        )
                         metrics = getattr(tool_call, "metrics", None)
 
                     # Ensure tool_name is a string
@@ -917,8 +922,28 @@ def display_tool_calls(tool_calls_container, tools):
                             try:
                                 st.markdown("**Results:**")
 
+                                # Gated results: the full body is read from disk only on request
+                                handle = find_tool_output_handle(content)
+                                if handle is not None:
+                                    st.code(content)
+                                    call_id = (
+                                        tool_call.get("tool_call_id")
+                                        if hasattr(tool_call, "get")
+                                        else getattr(tool_call, "tool_call_id", None)
+                                    )
+                                    if st.toggle(
+                                        "Show full output",
+                                        key=f"tool_output_{handle}_{call_id}",
+                                    ):
+                                        full_output = tool_output_store.get(handle)
+                                        if full_output is None:
+                                            st.info("The full output is no longer stored.")
+                                        elif is_json(full_output):
+                                            st.json(json.loads(full_output))
+                                        else:
+                                            st.code(full_output)
                                 # Handle different content types
-                                if isinstance(content, str):
+                                elif isinstance(content, str):
                                     if is_json(content):
                                         try:
                                             parsed_json = json.loads(content)
@@ -998,7 +1023,7 @@ async def knowledge_widget(halo: Team) -> None:
         if "file_uploader_key" not in st.session_state:
             st.session_state["file_uploader_key"] = 100
         uploaded_file = st.sidebar.file_uploader(
-            "Add a Document (.pdf, .csv, .txt, or .docx)",
+            "Add a Document (.pdf, .csv, .txt, .md, or .docx)",
             key=st.session_state["file_uploader_key"],
         )
         if uploaded_file is not None:
@@ -1006,23 +1031,20 @@ async def knowledge_widget(halo: Team) -> None:
             document_name = uploaded_file.name.split(".")[0]
             if f"{document_name}_uploaded" not in st.session_state:
                 file_type = uploaded_file.name.split(".")[-1].lower()
-
-                reader: Reader
-                if file_type == "pdf":
-                    reader = PDFReader()
-                elif file_type == "csv":
-                    reader = CSVReader()
-                elif file_type == "txt":
-                    reader = TextReader()
-                elif file_type == "docx":
-                    reader = DocxReader()
-                else:
+                if f".{file_type}" not in SUPPORTED_FORMATS:
                     st.sidebar.error("Unsupported file type")
                     return
-                uploaded_file_documents: List[Document] = reader.read(uploaded_file)
-                if uploaded_file_documents:
-                    halo.knowledge.load_documents(uploaded_file_documents, upsert=True)
-                else:
+                # Parsed in worker processes, not in the Streamlit thread
+                try:
+                    report = await asyncio.to_thread(
+                        halo.knowledge.add_file, uploaded_file.name, uploaded_file.getvalue()
+                    )
+                except ValueError as e:
+                    # E.g. the knowledge table was embedded with another embedder
+                    alert.empty()
+                    st.sidebar.error(str(e))
+                    return
+                if report.failed or not (report.added or report.updated or report.unchanged):
                     st.sidebar.error("Could not read document")
                 st.session_state[f"{document_name}_uploaded"] = True
             alert.empty()
@@ -1147,49 +1169,11 @@ def restart_halo():
 
 def discover_available_agents() -> Dict[str, str]:
     """
-    Dynamically discover available agents from the agents directory.
+    Discover available agents from the agent manifest.
+
+    Agent modules are not imported here; the manifest is read once per process.
 
     Returns:
         Dict[str, str]: Dictionary mapping display names to agent IDs
     """
-    agent_options = {}
-
-    # Get the agents directory path
-    agents_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "agents")
-
-    # Find all potential agent modules (files ending with _agent.py)
-    for filename in os.listdir(agents_dir):
-        if filename.endswith("_agent.py") and filename != "__init__.py":
-            module_name = filename[:-3]  # Remove .py extension
-
-            # Skip commented out modules
-            if module_name == "crawler_agent":
-                continue
-
-            try:
-                # Import the module
-                module = importlib.import_module(f"agents.{module_name}")
-
-                # Find factory functions (those starting with create_)
-                for name, obj in inspect.getmembers(module):
-                    if name.startswith("create_") and inspect.isfunction(obj):
-                        # Extract agent name from function name (remove 'create_' and '_agent' if present)
-                        agent_id = name.replace("create_", "", 1)
-                        if agent_id.endswith("_agent"):
-                            agent_id = agent_id[:-6]
-
-                        # Create a display name (convert snake_case to Title Case)
-                        display_name = " ".join(
-                            word.capitalize() for word in agent_id.split("_")
-                        )
-
-                        # Special case for gptimage1
-                        if agent_id == "gptimage1":
-                            display_name = "Image Agent"
-
-                        # Add to agent options
-                        agent_options[display_name] = agent_id
-            except ImportError as e:
-                logger.warning(f"Could not import agent module {module_name}: {e}")
-
-    return agent_options
+    return list_agents()